@@ -0,0 +1,90 @@
+import base64
+import json
+
+
+#1 Format of a stored answer vector
+# version byte, number of answers, bits per answer, then the alternative indices packed
+# big-endian with that many bits each (4 or fewer when every index fits, one byte otherwise).
+# Stored base64-encoded in the existing user_answer column: 20 answers take 16 characters
+# instead of about 100 for the JSON list, and the column type doesn't change.
+CODEC_VERSION = 1
+MAX_PACKED_BITS = 4  # up to 16 alternatives are packed, more take one byte per answer
+
+def alternative_label(index):
+    """
+    Label of the alternative at a zero-based position: 'a)' to 'z)', then '27)', '28)', ...
+    """
+    return f"{chr(ord('a') + index)})" if index < 26 else f"{index + 1})"
+
+def label_index(label):
+    """
+    Zero-based position of an alternative label, the inverse of alternative_label.
+    """
+    label = str(label).strip()
+    if len(label) == 2 and label[1] == ")" and "a" <= label[0] <= "z":
+        return ord(label[0]) - ord("a")
+    if label.endswith(")") and label[:-1].isdigit() and int(label[:-1]) > 26:
+        return int(label[:-1]) - 1
+    raise ValueError(f"Not an alternative label: {label!r}")
+
+#2 Binary form
+def pack_answers(answers):
+    """
+    Pack a list of labels (e.g. ["a)", "e)", ...]) into the versioned binary form.
+    """
+    indices = [label_index(answer) for answer in answers]
+    if len(indices) > 255 or any(index > 255 for index in indices):
+        raise ValueError("At most 255 answers with 256 alternatives each can be packed")
+    width = max([index.bit_length() for index in indices] + [1])
+    width = width if width <= MAX_PACKED_BITS else 8
+    packed = 0
+    for index in indices:
+        packed = packed << width | index
+    return bytes([CODEC_VERSION, len(indices), width]) + packed.to_bytes((len(indices) * width + 7) // 8, "big")
+
+def unpack_answers(data):
+    """
+    Labels of a packed answer vector. Raises ValueError for an unknown version or a truncated value.
+    """
+    if len(data) < 3 or data[0] != CODEC_VERSION:
+        raise ValueError(f"Unsupported answer encoding version: {data[0] if data else None!r}")
+    count, width = data[1], data[2]
+    payload = data[3:]
+    if width not in (1, 2, 3, 4, 8) or len(payload) != (count * width + 7) // 8:
+        raise ValueError("Corrupt packed answers")
+    packed = int.from_bytes(payload, "big")
+    mask = (1 << width) - 1
+    return [alternative_label(packed >> (width * (count - 1 - position)) & mask) for position in range(count)]
+
+#3 Column form, used for every read and write of answers.user_answer
+def dump_answers(answers):
+    """
+    Value to store in answers.user_answer.
+    """
+    return base64.b64encode(pack_answers(answers)).decode("ascii")
+
+def load_answers(value):
+    """
+    Answer labels from an answers.user_answer value in any format it was ever stored in:
+    packed (dump_answers), a legacy JSON string, or a list.
+    """
+    if isinstance(value, list):
+        return [str(answer) for answer in value]
+    if not isinstance(value, str):
+        raise ValueError(f"Unreadable answers value of type {type(value).__name__}")
+    if value.lstrip().startswith("["):  # legacy json.dumps(list)
+        answers = json.loads(value)
+        if not isinstance(answers, list):
+            raise ValueError("Legacy answers value is not a list")
+        return [str(answer) for answer in answers]
+    try:
+        data = base64.b64decode(value, validate=True)
+    except ValueError:
+        raise ValueError("Answers value is neither packed nor JSON") from None
+    return unpack_answers(data)
+
+def is_legacy(value):
+    """
+    Whether a stored value predates the packed format (and is rewritten by migrate_answers.py).
+    """
+    return isinstance(value, list) or (isinstance(value, str) and value.lstrip().startswith("["))
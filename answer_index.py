@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+
+
+#1 Settings for the answer index
+MAX_ENTRIES = 50_000  # answer vectors kept, the oldest are replaced; a lookup over all of them takes about 1 ms
+INITIAL_ENTRIES = 1024
+
+_M1, _M2, _M4 = np.uint64(0x5555555555555555), np.uint64(0x3333333333333333), np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def hamming_distances(bits, query):
+    """
+    Bits that differ between query and each column of bits, a (words, n) uint64 array.
+    SWAR popcount done in place, word by word, so numpy 1.x needs no per-byte lookup table.
+    """
+    total = None
+    scratch = np.empty(bits.shape[1], dtype=np.uint64)
+    for word in range(bits.shape[0]):
+        x = np.bitwise_xor(bits[word], query[word])
+        np.right_shift(x, np.uint64(1), out=scratch)
+        scratch &= _M1
+        x -= scratch
+        np.right_shift(x, np.uint64(2), out=scratch)
+        scratch &= _M2
+        x &= _M2
+        x += scratch
+        np.right_shift(x, np.uint64(4), out=scratch)
+        x += scratch
+        x &= _M4  # each byte now holds the bit count of its byte, at most 8
+        if total is None:
+            total = x
+        else:
+            total += x  # byte counts stay below 256 for up to 31 words
+    total *= _H01  # sums every byte into the top one
+    total >>= np.uint64(56)
+    return total.astype(np.intp)
+
+#2 Bit-packed index over answer vectors with Hamming distance search
+class HammingIndex:
+    """
+    Every answer vector is stored one-hot: one bit per (question, option) pair, packed into
+    uint64 words (20 questions x 6 options fit in two words). Two vectors that differ in n
+    questions differ in 2n bits, so the distance in questions is popcount(a xor b) / 2,
+    computed for the whole index in one vectorized pass. Words are stored word-major, so each
+    pass runs over one contiguous array.
+
+    Parameters:
+    - question_total (int): Length of the answer vectors.
+    - option_slots (int): Options per question, including the slot for unknown answers.
+    - encode (callable): Answer list -> array of option indices, e.g. functions.encode_answers.
+    - capacity (int): Maximum number of vectors kept, the oldest are replaced when it is full.
+    """
+
+    def __init__(self, question_total, option_slots, encode, capacity=MAX_ENTRIES):
+        self.question_total = question_total
+        self.option_slots = option_slots
+        self.encode = encode
+        self.capacity = capacity
+        self.words = -(-question_total * option_slots // 64)
+        self.bits = np.zeros((self.words, min(INITIAL_ENTRIES, capacity)), dtype=np.uint64)  # one column per vector
+        self.vectors = []  # answer tuples, by row
+        self.rows = {}  # answer tuple -> row
+        self.size = 0
+        self.next_row = 0  # where the next vector goes, wraps around once the index is full
+        self.last_id = 0  # highest answers.id loaded, so a refresh only reads newer rows
+        self._lock = threading.Lock()
+
+    def pack(self, answer):
+        """
+        One-hot bits of an answer vector as a row of uint64 words.
+        """
+        ones = np.zeros(self.words * 64, dtype=bool)
+        ones[np.arange(self.question_total) * self.option_slots + self.encode(answer)] = True
+        return np.packbits(ones).view(np.uint64)
+
+    def add(self, answer):
+        """
+        Add an answer vector. Returns False if it was already in the index.
+        """
+        vector = tuple(answer)
+        bits = self.pack(vector)
+        with self._lock:
+            if vector in self.rows:
+                return False
+            allocated = self.bits.shape[1]
+            if self.next_row == allocated and allocated < self.capacity:
+                grown = np.zeros((self.words, min(allocated * 2, self.capacity)), dtype=np.uint64)
+                grown[:, :allocated] = self.bits
+                self.bits = grown
+            row = self.next_row
+            if row < len(self.vectors):  # full: replace the oldest vector
+                del self.rows[self.vectors[row]]
+                self.vectors[row] = vector
+            else:
+                self.vectors.append(vector)
+            self.bits[:, row] = bits
+            self.rows[vector] = row
+            self.size = len(self.vectors)
+            self.next_row = (row + 1) % self.capacity
+            return True
+
+    def nearest(self, answer, max_distance, limit=4):
+        """
+        The closest indexed vectors, at most max_distance questions away.
+
+        Returns:
+        - neighbors (list): Up to limit (answer list, distance in questions) pairs, closest first.
+        """
+        bits = self.pack(answer)
+        with self._lock:
+            distances = hamming_distances(self.bits[:, :self.size], bits) // 2
+            close = np.flatnonzero(distances <= max_distance)
+            if len(close) > limit:
+                close = close[np.argpartition(distances[close], limit - 1)[:limit]]
+            close = close[np.argsort(distances[close], kind="stable")]
+            return [(list(self.vectors[row]), int(distances[row])) for row in close]
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
@@ -1,76 +1,138 @@
 from filecmp import clear_cache
 from inspect import cleandoc
 import streamlit as st
-from supabase import create_client, Client
-from functions import insert_user, question_count, get_last_email, send_answers, get_user_id_by_email, get_formatted_questions_and_answers, analyze_answers, QA, generate_user_scores, stardardize_scores, radar_data
-import json
-import plotly.graph_objects as go
+from database import get_client, execute_read, health_check
+from query_budget import begin_rerun, end_rerun
+from functions import insert_user, get_catalog, send_answers, find_submission, send_feedback, get_user_id_by_email, get_formatted_questions_and_answers, question_buttons, get_cached_analysis, stream_analyze_answers, finish_analysis, start_analysis, local_analysis, neighbor_analysis, generate_user_scores, stardardize_scores, get_population_stats
+import time
+import concurrent.futures
 
 
 #1 Page configuration has to be on the first streamlit function call
 st.set_page_config(layout="wide")
+begin_rerun()  # count the database queries of this rerun, logged by end_rerun at the bottom
 #2 Title of the page
 st.title("Moral-Personality Test")
 #3 First guidelines
 st.write("There are 20 questions that shall decide your moral personality. Think well before answering.")
 st.write("") # I add some space in some places for better experience
 
-#4 Set up your Supabase URL and API Key using Streamlit Secrets
+#4 Settings from Streamlit Secrets
 # the secrets have to be set on secrets.toml file or (in case of deploying) in your streamlit app website settings
-supabase_url = st.secrets["SUPABASE_URL"] 
-supabase_key = st.secrets["SUPABASE_KEY"] 
-
-#5 Create the Supabase client
-supabase: Client = create_client(supabase_url, supabase_key)
-#6 Check for errors
-response = supabase.table("users").select("*").execute()
-if response.data is None:  # if no data is returned, there might be an error
-    st.write(":red[An error occurred with the connection to the database. Please contact Bruno at @bruno.vieiraaaa .]", "response: ", response)
+# (SUPABASE_URL and SUPABASE_KEY are read by database.py when the shared client is first needed)
+# "self" scales each user against their own scores, "population" ranks them against everyone who took the test
+standardization_mode = st.secrets.get("STANDARDIZATION_MODE", "self")
+# stream the analysis token by token instead of waiting for the whole pipeline behind a spinner
+stream_analysis = st.secrets.get("STREAM_ANALYSIS", True)
+# "three_stage" runs analysis, QA and radar as three calls, "structured" gets the analysis and grades from one call
+pipeline_mode = st.secrets.get("PIPELINE_MODE", "three_stage")
+# analysis written locally from the scores: "fallback" shows it when the LLM misses LLM_DEADLINE (a stream: goes
+# that long without a chunk) or fails, "first" shows it right away and replaces it with the LLM's, "off" always waits for the LLM
+local_analysis_mode = st.secrets.get("LOCAL_ANALYSIS", "fallback")
+llm_deadline = st.secrets.get("LLM_DEADLINE", 20)  # seconds
+# once the local analysis is on screen, keep waiting for the LLM's and swap it in when it arrives
+swap_in_llm_analysis = st.secrets.get("SWAP_IN_LLM_ANALYSIS", True)
+# seconds the whole LLM pipeline may take: slow calls are cancelled and QA is skipped when time runs short
+llm_budget = st.secrets.get("LLM_BUDGET", 30)
+# send a duplicate request when an LLM call runs past the usual p95 of its stage
+hedge_llm_calls = st.secrets.get("HEDGE_LLM_CALLS", False)
+# reuse the analysis of answers this many questions away as it is, or patch it with one QA call (0 turns either off)
+neighbor_reuse_distance = st.secrets.get("NEIGHBOR_REUSE_DISTANCE", 1)
+neighbor_patch_distance = st.secrets.get("NEIGHBOR_PATCH_DISTANCE", 2)
+# "list" shows the 20 questions on one page, "wizard" one question at a time. With st.fragment (Streamlit 1.33+)
+# a click only redraws that question; on the pinned 1.32 it still reruns the whole script, drawing one question and doing no I/O
+questionnaire_mode = st.secrets.get("QUESTIONNAIRE_MODE", "list")
+# log a warning when a rerun makes more database queries than this (None: only log what each rerun made)
+query_budget_per_rerun = st.secrets.get("QUERY_BUDGET_PER_RERUN")
+
+#5 The Supabase client is shared by the whole process and created once, see database.py
+#6 Check for errors with a cheap probe, once per session so answering the questions touches no network,
+# and again on every rerun while it failed (health_check reuses its result for a few seconds), so a short outage clears
+if not st.session_state.get("database_healthy", False):
+    st.session_state.database_healthy = health_check()
+if not st.session_state.database_healthy:
+    st.write(":red[An error occurred with the connection to the database. Please contact Bruno at @bruno.vieiraaaa .]")
 
 st.write("")
 st.write("")
 
-#7 Initialize user_selections in session_state if not already present
+#7 Get the question catalog (questions, alternatives and counts), shared by every session and only fetched when stale
+try:
+    catalog = get_catalog()  # imported from functions.py
+except Exception as error:  # only happens if the catalog was never loaded in this process
+    st.error(f"Error retrieving questions: {error}")
+    st.stop()
+
+#8 Initialize user_selections in session_state if not already present
 if 'user_selections' not in st.session_state:
-    st.session_state.user_selections = [None] * question_count()  # imported from functions.py
+    st.session_state.user_selections = [None] * catalog.question_total
                                            # ^initialize as a list with none for each question
 
-#8 Get the total number of questions from the table 'questions'
-question_number = question_count()  
-#9 Fetch actual questions from the 'questions' table
-questions_response = supabase.table("questions").select("question_text").order("id").execute()
-questions_list = [question["question_text"] for question in questions_response.data]
-#10 Fetch alternatives from the 'possible_answers' table
-answers_response = supabase.table("possible_answers").select("*").execute()
-
-#11 Create a list of letters for labeling alternatives
-letters = ['a)', 'b)', 'c)', 'd)', 'e)', 'f)', 'g)', 'h)', 'i)', 'j)']  # extend this list as needed
-
-#12 Iterate through the questions and display the question number
-for i in range(1, question_number + 1):
-    st.write(f"**Question {i}. {questions_list[i-1]}**")
-
-    # fetch the alternatives for the current question
-    alternatives = [answer["Alternatives"] for answer in answers_response.data if answer["Question"] == i]
-
-    # display each alternative with corresponding letter and a button for selection
-    for index, alternative in enumerate(alternatives):
-        if index < len(letters):  # check to avoid IndexError
-            button_label = f"{letters[index]} {alternative}"
-        else:
-            button_label = f"{index + 1}) {alternative}"  # fallback for more than 10 alternatives
-        
-        # check if this alternative was previously selected
-        if st.session_state.user_selections[i - 1] == button_label.split(" ")[0]:  # using i - 1 for zero-based index
-            # use markdown to style the selected button
+#9 Get the total number of questions
+question_number = catalog.question_total
+#10 Get the actual questions
+questions_list = catalog.questions
+
+#11 Show the questions, with the alternatives indexed by question once per catalog
+buttons = question_buttons(catalog)
+
+def select_alternative(question_index, label):
+    # runs before the rerun the click causes, so the rerun already shows the new state
+    st.session_state.user_selections[question_index] = label
+    st.session_state.answer_changed = True
+    if question_index + 1 < question_number:
+        st.session_state.question_page = question_index + 1
+
+def go_to_question(question_index):
+    st.session_state.question_page = question_index
+
+# st.fragment reruns only the question when one of its buttons is clicked (Streamlit 1.33+, not the pinned 1.32);
+# without it the whole script reruns, but draws one question instead of twenty
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+@(fragment or (lambda function: function))
+def question_page():
+    page = st.session_state.question_page
+    answered = sum(selection is not None for selection in st.session_state.user_selections)
+    st.progress(answered / question_number, text=f"{answered} of {question_number} answered")
+    st.write(f"**Question {page + 1}. {questions_list[page]}**")
+    for index, (label, button_label) in enumerate(buttons[page]):
+        if st.session_state.user_selections[page] == label:
             st.markdown(f"<span style='color: white; background-color: red; padding: 10px; border-radius: 5px;'>{button_label}</span>", unsafe_allow_html=True)
         else:
-            # create a button for each alternative
-            if st.button(button_label, key=f"question_{i}_alternative_{index}"):
-                # store the selection in the list
-                st.session_state.user_selections[i - 1] = button_label.split(" ")[0]  # Store only the letter
+            st.button(button_label, key=f"question_{page + 1}_alternative_{index}", on_click=select_alternative, args=(page, label))
+    st.write("")
+    back, forward = st.columns(2)
+    back.button("Previous question", key="previous_question", disabled=page == 0, on_click=go_to_question, args=(page - 1,))
+    forward.button("Next question", key="next_question", disabled=page + 1 == question_number, on_click=go_to_question, args=(page + 1,))
+    # the name and email fields and the results are outside the fragment, so the whole page
+    # reruns when an answer changes once everything is answered
+    if st.session_state.pop("answer_changed", False) and fragment is not None and answered == question_number:
+        st.rerun()
+
+if questionnaire_mode == "wizard":
+    if "question_page" not in st.session_state:
+        st.session_state.question_page = 0
+    question_page()
+else:
+    # Iterate through the questions and display the question number
+    for i in range(1, question_number + 1):
+        st.write(f"**Question {i}. {questions_list[i-1]}**")
 
-    st.write("")  # add space between questions
+        # display each alternative with corresponding letter and a button for selection
+        for index, (label, button_label) in enumerate(buttons[i - 1]):  # a) to z), then numbers
+
+            # check if this alternative was previously selected
+            if st.session_state.user_selections[i - 1] == label:  # using i - 1 for zero-based index
+                # use markdown to style the selected button
+                st.markdown(f"<span style='color: white; background-color: red; padding: 10px; border-radius: 5px;'>{button_label}</span>", unsafe_allow_html=True)
+            else:
+                # create a button for each alternative
+                if st.button(button_label, key=f"question_{i}_alternative_{index}"):
+                    # store the selection in the list
+                    st.session_state.user_selections[i - 1] = label  # Store only the letter
+
+        st.write("")  # add space between questions
 
 #13 Display the user selections in the sidebar
 # st.sidebar.write("User selections:", st.session_state.user_selections)
@@ -92,43 +154,46 @@ provide_answer = False # initialize trigger for providing analysis
 
 if email[0] != "":
     if name[0] != "":
-        # check if the email already exists in the database
-        response = supabase.table('users').select('email').eq('email', email[0]).execute()
+        # rows written by this session may still be in the write-behind spool, so they are remembered here
+        submitted = st.session_state.get("submitted")
+        if submitted and submitted["email"] == email[0]:
+            response = None
+            user_id = submitted["user_id"]  # database id, or the spool key of a user still being written
+            answer = submitted["answer"] if submitted["answer"] == st.session_state.user_selections else False
+        else:
+            # check if the email already exists in the database, fetching its id in the same query
+            response = execute_read(get_client().table('users').select('id, email').eq('email', email[0]))
         # if the email does not exist, insert new user
-        if not response.data:
-            insert_user(name[0], email[0])  # insert user if email is not found
+        if response is None:
+            pass
+        elif not response.data:
+            user_id = insert_user(name[0], email[0])  # insert user if email is not found, returns its spool key
             print("########### New user created. ###########")
-            response.data = [{'email': email[0]}] # collapsing 'response' possibilities for further use
             answer = False # initialize trigger for skipping another insertion
         else: 
             print("This email already exists: ", response.data[0]['email'])
-            user_id = get_user_id_by_email()
-            # retrieve ONLY THE FIRST past answer from the database. it doesn't search for other matches
-            answer = supabase.table('answers').select('user_answer').eq('user_id', user_id).execute()
-            answer = answer.data[0]['user_answer']
-            if isinstance(answer, str): # If answer is a JSON string, convert it to a list
-                answer = json.loads(answer)
-            if answer == st.session_state.user_selections: answer = answer
+            user_id = response.data[0]['id']
+            # one indexed lookup on (user_id, fingerprint): were these exact answers submitted before?
+            submission = find_submission(user_id, st.session_state.user_selections)
+            if submission is not None:
+                answer = list(st.session_state.user_selections)
+                # remembered like a new submission, so the next reruns (and the feedback) don't look it up again
+                st.session_state.submitted = {"email": email[0], "user_id": user_id, "answer": answer}
             else: answer = False
 
-        # retrieve the last email from the 'users' table
-        last_email = get_last_email()  # why? I don't know
-
-        # check if the input email is in the database, if yes, submit and return success
-        if response.data[0]["email"] == email[0]:
-            # send the answers to the database
-            user_id = get_user_id_by_email()
-            if answer == False:     # if the current answers don't match existing answers, input new answers
-                if user_id:
-                    print(f"########### User ID retrieved: {user_id} #############")
-                    answer = st.session_state.user_selections
-                    send_answers(answer, user_id)
-                    st.success(f"**Your test was submitted, {name[0]}!**", icon="✅")
-                    provide_answer = True # trigger for providing analysis 
-                else:
-                    st.warning("Error: user ID not found. Please input a name and a new email.")
-            else:
+        # send the answers to the database
+        if answer == False:     # if the current answers don't match existing answers, input new answers
+            if user_id:
+                print(f"########### User ID retrieved: {user_id} #############")
+                answer = list(st.session_state.user_selections)
+                send_answers(answer, user_id)  # returns once the answers are safely spooled
+                st.session_state.submitted = {"email": email[0], "user_id": user_id, "answer": answer}
+                st.success(f"**Your test was submitted, {name[0]}!**", icon="✅")
                 provide_answer = True # trigger for providing analysis 
+            else:
+                st.warning("Error: user ID not found. Please input a name and a new email.")
+        else:
+            provide_answer = True # trigger for providing analysis 
 
     else:
         st.write(":red[This won't work if you don't input your name...]")
@@ -146,35 +211,71 @@ categories = ['How Much You Value Life', 'Utilitarianism', 'Altruism', 'Pessimis
 # answer = ["a)", "e)", "d)", "b)", "a)", "b)", "e)", "b)", "a)", "c)", "a)", "e)", "e)", "b)", "c)", "d)", "d)", "a)", "d)", "a)"]
 
 #18 Get questions and answers in a single string for LLM analysis
-@st.cache_data()  # cache was messing with format, so if it's not working just take it out
-def analyze_cached(questions, answers):
-    feedback = analyze_answers(questions, answers)
-    content = QA(feedback,questions,answers)  # with the QA
-    radar = radar_data(content,categories)
-    return  content, radar 
- 
-
-# call the cached function
+# results are cached on disk by content (catalog, prompts, model and answers), shared by every session and restart
 if provide_answer:
-    with st.spinner('Analysing Results...'):
-        analysis, radar = analyze_cached(get_formatted_questions_and_answers(), answer)  # using 'answer' variable
-
+    questions = get_formatted_questions_and_answers()
     st.write("**Your Analysis:**")
-    st.write(analysis)
+    result = get_cached_analysis(questions, answer, categories, mode=pipeline_mode)
+    if result is not None:  # seen these answers before, no LLM call at all
+        analysis, radar = result["qa"], result["radar"]
+        st.write(analysis)
+    else:
+        analysis_placeholder = st.empty()
+        fallback = local_analysis(answer, catalog)  # no I/O, ready before any LLM call
+        if local_analysis_mode == "first":
+            analysis_placeholder.write(fallback)
+        try:
+            # answers close to ones analysed before: reuse that analysis instead of the whole pipeline
+            with st.spinner('Analysing Results...'):
+                result = neighbor_analysis(questions, answer, categories, pipeline_mode, neighbor_reuse_distance, neighbor_patch_distance, timeout=llm_budget)
+            if result is not None:
+                print(f"########### Reused the analysis of answers {result['neighbor_distance']} question(s) away ###########")
+            elif stream_analysis and pipeline_mode == "three_stage":  # a JSON reply can't be shown while it streams
+                # show the analysis while it is being written, then swap in the reviewed version
+                stream_started = time.monotonic()
+                # a stream that stalls for LLM_DEADLINE, or runs past the analysis stage's share of the budget, is cancelled
+                with analysis_placeholder.container():
+                    draft = st.write_stream(stream_analyze_answers(questions, answer, budget=llm_budget,
+                                                                   idle_timeout=None if local_analysis_mode == "off" else llm_deadline))
+                with st.spinner('Reviewing the analysis...'):
+                    remaining = max(llm_budget - (time.monotonic() - stream_started), 0)  # what the stream left of the budget
+                    result = finish_analysis(questions, answer, categories, draft, budget=remaining, hedge=hedge_llm_calls)
+            else:
+                future = start_analysis(questions, answer, categories, mode=pipeline_mode, budget=llm_budget, hedge=hedge_llm_calls)
+                try:
+                    with st.spinner('Analysing Results...'):
+                        result = future.result(timeout=None if local_analysis_mode == "off" else llm_deadline)
+                except concurrent.futures.TimeoutError:
+                    print("########### LLM missed the deadline, showing the local analysis ###########")
+                    analysis_placeholder.write(fallback)
+                    if swap_in_llm_analysis:
+                        with st.spinner('Writing a more detailed analysis...'):
+                            result = future.result()
+                    # otherwise the call still finishes in the background and is cached for the next visit
+        except Exception as error:
+            if local_analysis_mode == "off":
+                raise
+            print("LLM analysis failed, showing the local analysis:", error)
+        if result is not None:
+            analysis, radar = result["qa"], result["radar"]
+            analysis_placeholder.write(analysis)
+        else:
+            analysis, radar = fallback, None
+            analysis_placeholder.write(fallback)
         
 
 #19 Create personality dashboard
 # Check if answers are to be provided
 if provide_answer:  
 
-    analysis, radar = analyze_cached(get_formatted_questions_and_answers(), answer)  # using 'answer' variable
+    # analysis and radar were already computed (and cached) above
 
     # Simulated scores based on the answers (this should reflect real data from the 'answers' variable)
         
     # Ensure radar[0] contains the actual user scores and is a list
     user_scores = generate_user_scores(answer, categories)  # Generate actual scores
     # Standardize scores for representation
-    sd_scores = stardardize_scores(user_scores)
+    sd_scores = stardardize_scores(user_scores, mode=standardization_mode)
 
 
     # Log the output to confirm it's a single list
@@ -187,7 +288,8 @@ if provide_answer:
         st.error("Mismatch between user scores and categories length.")
     else:
 
-        #21 Create radar chart using Plotly
+        #21 Create radar chart using Plotly, imported here so the questions don't wait for it
+        import plotly.graph_objects as go
         fig = go.Figure()
 
         # Add trace for user scores
@@ -227,6 +329,13 @@ if provide_answer:
         st.write(f"**Individualism:** 5 means you are very individualist, 0 means you are very collectivist.  **Your score: {round(sd_scores[6],1)}**")
         st.write(f"**Universalism:** 5 means you believe that there is a universal set of truths and rights/wrongs, 0 means you believe that everything is relative, dependant on the point of view.  **Your score: {round(sd_scores[7],1)}**")
 
+    #20 How the user's choices compare with everyone else's, from the in-memory population counters
+    population = get_population_stats()
+    if population.total:
+        with st.expander(f"How others answered ({population.total} tests)"):
+            for number, (label, share) in enumerate(zip(answer, population.answer_shares(answer)), start=1):
+                st.write(f"**Question {number}:** {share:.0%} also picked {label}")
+
 
 #21 Get Feedback from user
 st.write("")
@@ -235,38 +344,39 @@ st.write("**Any suggestions? Tell us what you think.**")
 feedback1 = st.text_input("", key="feedback")
 
 # initialize variables and catch mismatchs
-user_id = None
-try: user_id = get_user_id_by_email()
-except: user_id = None
 try:            # I don't really know why this is here...
     if email == None: email = [""]
     if name == None: name = [""]
 except NameError:
     email = [""]
     name = [""]
+user_id = None
+if st.session_state.get("submitted"):
+    user_id = st.session_state.submitted["user_id"]  # the user who submitted in this session
+elif feedback1 != "" and email[0] != "":  # the typed email's user, only looked up when there is feedback to send
+    try: user_id = get_user_id_by_email(email[0])
+    except Exception: user_id = None
 
 #22 Insert feedback into 'feedback' table
 if feedback1 != "" and email[0] != "" and name[0] != "":
     # only insert feedback if user_id is found
     if user_id is not None:
-        response = supabase.table("feedback").insert({
-            "suggestions": feedback1,
-            "user_id": user_id
-        }).execute()
-
-        # check for success
-        if response.data:
+        # spooled to disk and written in the background, the same text is only stored once per user
+        try:
+            send_feedback(feedback1, user_id)
             st.success("Thank you for the most useful feedback! No, seriously!")
             st.balloons()
-        elif response.error:
-            st.write(":red[An error occurred:]", response.error)
+        except Exception as error:
+            st.write(":red[An error occurred:]", error)
     else:
         st.write(":red[Cannot submit feedback without a valid user ID. Try filling your name and email address.]")
 elif feedback1 != "":
     st.write(":red[Please fill in your name and email to submit.]")
 
+#23 Log the database queries this rerun made (see query_budget.py)
+end_rerun(budget=query_budget_per_rerun)
+
 
 # Spinner Functionality: st.spinner()
 # Waiting Functionality: time.sleep(1)
 # Streaming strings Functionality: st.write_stream() and st.stream()
-
@@ -0,0 +1,60 @@
+"""
+Fill in answers.fingerprint for the rows written before the column existed (migration 002).
+
+    python backfill_fingerprints.py --page-size 500
+
+Only rows without a fingerprint are read, in id order, and each page is written back with
+one upsert on id, so the job can be stopped and run again at any time and picks up where it stopped.
+"""
+import argparse
+import json
+import time
+
+from answer_codec import load_answers
+from database import execute_write, get_client, iter_rows
+from functions import answer_fingerprint
+
+
+#1 Settings for the backfill
+PAGE_SIZE = 500
+
+def backfill_fingerprints(page_size=PAGE_SIZE):
+    """
+    Returns:
+    - report (dict): Rows updated and rows skipped because their answers couldn't be read.
+    """
+    started = time.perf_counter()
+    report = {"updated": 0, "skipped": 0}
+    batch = []
+
+    def write(batch):
+        # every row exists, so the upsert only updates them; user_id and user_answer are sent as they were read,
+        # because Postgres checks the NOT NULL columns of the would-be insert before it finds the conflict
+        execute_write(get_client().table("answers").upsert(batch, on_conflict="id"))
+        report["updated"] += len(batch)
+        print(f"{report['updated']} rows updated, last id {batch[-1]['id']}")
+
+    for row in iter_rows("answers", "id, user_id, user_answer", page_size, where=lambda query: query.is_("fingerprint", "null")):
+        try:
+            answer = load_answers(row["user_answer"])
+        except ValueError as error:
+            print(f"Skipping answers row {row['id']}:", error)
+            report["skipped"] += 1
+            continue
+        batch.append(dict(row, fingerprint=answer_fingerprint(answer)))
+        if len(batch) == page_size:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+    print(json.dumps(backfill_fingerprints(args.page_size), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+End-to-end benchmark of app.py against local Supabase and OpenAI stand-ins.
+
+    python benchmarks/app_e2e.py --sessions 3 --db-latency 0.02 --llm-latency 0.3 --tokens-per-second 200
+    python benchmarks/app_e2e.py --output bench.json    # keep the report to compare with another commit
+
+Drives the app through Streamlit's AppTest the way a test-taker does (twenty answer clicks,
+name, email) and times every rerun, then measures the throughput of the scoring and
+formatting functions. Prints a JSON report, tagged with the current commit.
+"""
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+from stand_ins import ROOT, alternative_total, percentile, stand_ins as installed_stand_ins, write_report
+
+from streamlit.testing.v1 import AppTest
+import functions
+
+
+#1 One simulated test-taker
+def run_session(fake, server, number, secrets, rng):
+    """
+    Returns:
+    - timings (dict): Seconds for the first render, each click and the submission (email to
+      results), plus the Supabase queries and OpenAI requests the session caused.
+    """
+    db_calls, llm_calls = len(fake.calls), len(server.requests)
+    app = AppTest.from_file(f"{ROOT}/app.py", default_timeout=120)
+    for key, value in secrets.items():
+        app.secrets[key] = value
+
+    started = time.perf_counter()
+    app.run()
+    timings = {"first_render": time.perf_counter() - started, "clicks": []}
+    for question in range(1, len(app.session_state.user_selections) + 1):
+        alternative = rng.randrange(alternative_total(fake.tables, question))
+        started = time.perf_counter()
+        app.button(key=f"question_{question}_alternative_{alternative}").click().run()
+        timings["clicks"].append(time.perf_counter() - started)
+    app.text_input(key="NAME").input(f"Benchmark {number}").run()
+    started = time.perf_counter()
+    app.text_input(key="EMAIL").input(f"benchmark{number}@example.com").run()
+    timings["submission"] = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(f"app.py raised: {app.exception[0].message}")
+    timings["db_calls"] = len(fake.calls) - db_calls
+    timings["llm_calls"] = len(server.requests) - llm_calls
+    return timings
+
+def summarize(values):
+    return {"mean": statistics.mean(values), "p50": percentile(values, 50), "p95": percentile(values, 95), "max": max(values)}
+
+#2 Throughput of the pure functions the app calls on every results render
+def throughput(function, seconds=0.5):
+    """
+    Calls per second of function(), run repeatedly for about the given seconds.
+    """
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        function()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+def benchmark_functions(rng):
+    categories = functions.load_score_weights().categories
+    options = functions.load_score_weights().options
+    answers = [rng.choice(options) for _ in range(functions.get_catalog().question_total)]
+    scores = functions.generate_user_scores(answers, categories)
+    functions.get_formatted_questions_and_answers()  # warm the catalog, the benchmark measures the formatting
+    return {
+        "generate_user_scores_per_second": throughput(lambda: functions.generate_user_scores(answers, categories)),
+        "stardardize_scores_per_second": throughput(lambda: functions.stardardize_scores(scores)),
+        "get_formatted_questions_and_answers_per_second": throughput(functions.get_formatted_questions_and_answers),
+    }
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3, help="test-takers run one after the other, each with random answers")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="seconds per Supabase query")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before each OpenAI reply starts")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--stream", action="store_true", help="run with STREAM_ANALYSIS on (the app's default)")
+    parser.add_argument("--questionnaire-mode", choices=("list", "wizard"), default="list")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    secrets = {"STREAM_ANALYSIS": args.stream, "QUESTIONNAIRE_MODE": args.questionnaire_mode}
+    # the app logs with print(), kept off stdout so the report can be piped
+    with installed_stand_ins(args.db_latency, args.llm_latency, args.tokens_per_second) as (fake, server), redirect_stdout(sys.stderr):
+        sessions = [run_session(fake, server, number, secrets, rng) for number in range(args.sessions)]
+        report = {
+            "commit": current_commit(),
+            "settings": vars(args),
+            "app": {
+                "first_render_seconds": summarize([session["first_render"] for session in sessions]),
+                "click_seconds": summarize([click for session in sessions for click in session["clicks"]]),
+                "submission_seconds": summarize([session["submission"] for session in sessions]),
+                "db_calls_per_session": statistics.mean(session["db_calls"] for session in sessions),
+                "llm_calls_per_session": statistics.mean(session["llm_calls"] for session in sessions),
+            },
+            "functions": benchmark_functions(rng),
+        }
+    write_report(report, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure the cold-start cost of the app's modules, each imported in a fresh interpreter.
+
+    python benchmarks/import_time.py --runs 5
+    python benchmarks/import_time.py core functions --output imports.json
+
+Reports the median wall time of each import, and the time to build a radar chart with plotly
+(deferred by app.py until the results render), so the numbers can be compared across commits.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+#1 What is measured
+MODULES = ("core", "functions", "database", "llm_gateway", "streamlit", "numpy")
+SNIPPETS = {
+    "radar_chart": "import plotly.graph_objects as go; go.Figure(go.Scatterpolar(r=[1, 2, 3], theta=['a', 'b', 'c']))",
+}
+
+def app_imports():
+    """
+    The import statements at the top of app.py, which run before the first question is drawn.
+    """
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    statements = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        statements.append(ast.unparse(node))
+    return "; ".join(statements)
+
+def time_snippet(code, runs):
+    """
+    Median seconds, over runs fresh interpreters, to execute code (the interpreter's own start-up excluded).
+    """
+    timer = f"import time; started = time.perf_counter(); {code}; print(time.perf_counter() - started)"
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", timer], cwd=ROOT, capture_output=True, text=True, check=True,
+                                env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=list(MODULES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {"runs": args.runs, "seconds": {}}
+    for module in args.modules:
+        report["seconds"][module] = time_snippet(f"import {module}", args.runs)
+    for name, code in {"app_imports": app_imports(), **SNIPPETS}.items():
+        report["seconds"][name] = time_snippet(code, args.runs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Load test: many simultaneous test-takers against local Supabase and OpenAI stand-ins.
+
+    python benchmarks/load_test.py --sessions 1 2 4 8 16 --think-time 0.5
+    python benchmarks/load_test.py --sessions 10 --think-time 3 --llm-latency 1 --output load.json
+
+Every simulated session runs app.py in its own AppTest on its own thread and follows the path
+of a real test-taker: first page, twenty answers with think-time between clicks, name, email
+(submission and results) and feedback. Each step is timed, and the Supabase queries and
+OpenAI requests are counted per session. The levels run one after the other against the same
+stand-ins, and the saturation point is the first level where adding sessions stops adding
+throughput.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from unittest.mock import MagicMock
+
+from stand_ins import ROOT, alternative_total, percentile, stand_ins as installed_stand_ins, write_report
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import ScriptRunner
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+
+#1 Settings for the load test
+STEPS = ("first_render", "answer", "name", "submit", "feedback")
+SATURATION_GAIN = 1.1  # a level saturates when it completes less than 10% more sessions per second than the one before
+
+#2 Streamlit test runtime shared by the simulated sessions
+@contextmanager
+def shared_test_runtime(secrets):
+    """
+    Let AppTest runs overlap the way sessions do on one server. Out of the box each run
+    installs a mock Runtime and its secrets globally and removes them when it ends (breaking
+    the runs still going on other threads), compiles app.py again (and CPython 3.11 can fail
+    to parse on several threads at once) and uses the same session id as every other run (so
+    the LLM gateway would queue all sessions as one). For the whole load test every run gets
+    one shared mock runtime, set of secrets and script cache, and the session id of its thread.
+    """
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+    runner_init = ScriptRunner.__init__
+
+    def init_with_thread_session(runner, **kwargs):
+        runner_init(runner, **{**kwargs, "session_id": threading.current_thread().name})
+
+    saved = Runtime.__dict__["instance"], Runtime.__dict__["exists"], st.secrets, local_script_runner.ScriptCache
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    st.secrets = Secrets([])
+    st.secrets._secrets = dict(secrets)
+    local_script_runner.ScriptCache = lambda: script_cache
+    ScriptRunner.__init__ = init_with_thread_session
+    try:
+        yield runtime
+    finally:
+        Runtime.instance, Runtime.exists, st.secrets, local_script_runner.ScriptCache = saved
+        ScriptRunner.__init__ = runner_init
+
+#3 One simulated test-taker
+class Session:
+    """
+    Parameters:
+    - number (int): Makes the session's name, email and answers unique.
+    - think_time (float): Mean seconds between two actions (exponentially distributed).
+    """
+
+    def __init__(self, number, think_time, fake, seed):
+        self.number = number
+        self.think_time = think_time
+        self.fake = fake
+        self.rng = random.Random(seed * 100_003 + number)
+        self.timings = {step: [] for step in STEPS}
+        self.error = None
+
+    def _think(self):
+        if self.think_time:
+            time.sleep(self.rng.expovariate(1 / self.think_time))
+
+    def _step(self, step, action):
+        started = time.perf_counter()
+        app = action()
+        self.timings[step].append(time.perf_counter() - started)
+        if app.exception:
+            raise RuntimeError(f"app.py raised during {step}: {app.exception[0].message}")
+
+    def run(self):
+        try:
+            app = AppTest.from_file(f"{ROOT}/app.py", default_timeout=300)  # secrets come from shared_test_runtime
+            self._step("first_render", app.run)
+            for question in range(1, len(app.session_state.user_selections) + 1):
+                self._think()
+                alternative = self.rng.randrange(alternative_total(self.fake.tables, question))
+                self._step("answer", app.button(key=f"question_{question}_alternative_{alternative}").click().run)
+            self._think()
+            self._step("name", app.text_input(key="NAME").input(f"Load {self.number}").run)
+            self._think()
+            self._step("submit", app.text_input(key="EMAIL").input(f"load{self.number}@example.com").run)
+            self._think()
+            self._step("feedback", app.text_input(key="feedback").input(f"Feedback from session {self.number}").run)
+        except Exception as error:
+            self.error = repr(error)
+
+#4 One load level: N sessions started together
+def run_level(session_total, first_number, args, fake, server):
+    db_calls, llm_calls = len(fake.calls), len(server.requests)
+    sessions = [Session(first_number + number, args.think_time, fake, args.seed) for number in range(session_total)]
+    threads = [threading.Thread(target=session.run, name=f"load-session-{session.number}") for session in sessions]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    completed = [session for session in sessions if session.error is None]
+    steps = {}
+    for step in STEPS:
+        values = [value for session in completed for value in session.timings[step]]
+        if values:
+            steps[step] = {"p50": percentile(values, 50), "p99": percentile(values, 99), "max": max(values)}
+    return {
+        "sessions": session_total,
+        "completed": len(completed),
+        "errors": [session.error for session in sessions if session.error is not None][:5],
+        "seconds": seconds,
+        "sessions_per_second": len(completed) / seconds,
+        "steps": steps,
+        # background writes (the write-behind spool) land in the totals too, so these are per-session averages
+        "db_calls_per_session": (len(fake.calls) - db_calls) / session_total,
+        "llm_calls_per_session": (len(server.requests) - llm_calls) / session_total,
+    }
+
+def saturation_point(levels):
+    """
+    Sessions at the first level that completed less than SATURATION_GAIN times the sessions per
+    second of the level before it, or None if throughput still grew at the last level.
+    """
+    for previous, level in zip(levels, levels[1:]):
+        if level["sessions_per_second"] < previous["sessions_per_second"] * SATURATION_GAIN:
+            return level["sessions"]
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="simultaneous sessions at each level")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between actions, real users take several")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="seconds per Supabase query")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before each OpenAI reply starts")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--stream", action="store_true", help="run with STREAM_ANALYSIS on (the app's default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    secrets = {"STREAM_ANALYSIS": args.stream}
+    levels = []
+    # the app logs with print(), kept off stdout so the report can be piped
+    with installed_stand_ins(args.db_latency, args.llm_latency, args.tokens_per_second) as (fake, server), \
+            shared_test_runtime(secrets), redirect_stdout(sys.stderr):
+        # one session on its own first, so lazy imports (plotly loads orjson on its first chart)
+        # and the catalog are loaded before the timed levels, as on a server that is already up
+        warm_up = Session(0, 0, fake, args.seed)
+        warm_up.run()
+        if warm_up.error is not None:
+            raise RuntimeError(f"Warm-up session failed: {warm_up.error}")
+        for session_total in args.sessions:
+            levels.append(run_level(session_total, 1 + sum(level["sessions"] for level in levels), args, fake, server))
+            level = levels[-1]
+            print(f"{session_total} sessions: {level['completed']} completed in {level['seconds']:.1f}s, "
+                  f"submit p99 {level['steps'].get('submit', {}).get('p99', float('nan')):.2f}s", file=sys.stderr)
+
+    write_report({
+        "settings": vars(args),
+        "levels": levels,
+        "saturation_sessions": saturation_point(levels),
+    }, args.output)
+
+if __name__ == "__main__":
+    main()
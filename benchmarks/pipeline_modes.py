@@ -0,0 +1,69 @@
+"""
+Compare the three-stage and the structured analysis pipelines against a local OpenAI stub.
+
+    python benchmarks/pipeline_modes.py --runs 5 --latency 0.3 --tokens-per-second 200
+
+Prints a JSON report with latency, LLM calls and output tokens per mode.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+import functions
+import llm_gateway
+from fake_openai import FakeOpenAIServer
+
+
+CATEGORIES = ['How Much You Value Life', 'Utilitarianism', 'Altruism', 'Pessimism vs Hopefulness', 'Devotion', 'Knowledge-Based','Individualism vs Collectivism','Universalism']
+
+def benchmark_mode(server, mode, runs, questions):
+    pipeline = functions.three_stage_analysis if mode == "three_stage" else functions.structured_analysis
+    timings = []
+    first_request = len(server.requests)
+    first_token_count = server.completion_tokens
+    for run in range(runs):
+        answers = [functions.alternative_label(run % 4)] * 20
+        start = time.perf_counter()
+        pipeline(questions, answers, CATEGORIES)  # called directly, the result cache would hide the cost
+        timings.append(time.perf_counter() - start)
+    requests = server.requests[first_request:]
+    return {
+        "runs": runs,
+        "mean_seconds": statistics.mean(timings),
+        "max_seconds": max(timings),
+        "llm_calls_per_run": len(requests) / runs,
+        "output_tokens_per_run": (server.completion_tokens - first_token_count) / runs,
+        "prompt_words_per_run": sum(len(message["content"].split()) for request in requests for message in request["messages"]) / runs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before each reply starts")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    questions = "\n".join(f"Question {number}: question text\n   a) one\n   b) two\n   c) three\n   d) four" for number in range(1, 21))
+    with FakeOpenAIServer(latency=args.latency, tokens_per_second=args.tokens_per_second) as server:
+        llm_gateway.configure(lambda: AsyncOpenAI(base_url=server.base_url, api_key="benchmark", max_retries=0))
+        report = {
+            "settings": vars(args),
+            "modes": {mode: benchmark_mode(server, mode, args.runs, questions) for mode in functions.PIPELINE_MODES},
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
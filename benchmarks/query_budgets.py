@@ -0,0 +1,88 @@
+"""
+Check the database query budget of each step a test-taker goes through.
+
+    python benchmarks/query_budgets.py            # exits with status 1 if a step is over budget
+    python benchmarks/query_budgets.py --output budgets.json
+
+Drives app.py through AppTest against the local stand-ins (a new user, then the same user
+coming back with the same answers in a new session, reported as return_*) and counts the Supabase queries of every step with
+query_budget.QueryCounter. Writes made later by the write-behind thread are not counted,
+they don't hold up the page. tests/test_query_budgets.py asserts the same budgets under pytest.
+"""
+import argparse
+import sys
+from contextlib import redirect_stdout
+
+from stand_ins import ROOT, stand_ins as installed_stand_ins, write_report
+
+from streamlit.testing.v1 import AppTest
+from functions import get_write_queue
+from query_budget import QueryBudgetExceeded, QueryCounter
+
+
+#1 Budgets per step, in queries
+BUDGETS = {
+    "first_render": 4,  # health probe, then the catalog (its version and the rows of two tables) the first time the process needs it
+    "answer": 0,  # answering only redraws from the session and the cached catalog
+    "name": 0,
+    "submit": 3,  # the users lookup, plus the submission lookup of a returning user (the answer index refreshes in the background)
+    "feedback": 0,  # the user id is remembered from the submission
+}
+RETURN_BUDGETS = dict(BUDGETS, first_render=1)  # a second session: only its health probe, the catalog is cached
+
+#2 The path of one test-taker, with the queries of each step
+def run_steps(email, secrets, prefix=""):
+    """
+    Returns:
+    - steps (list): (prefix + step, QueryCounter) pairs in the order they ran.
+    """
+    steps = []
+    app = AppTest.from_file(f"{ROOT}/app.py", default_timeout=120)
+    for key, value in secrets.items():
+        app.secrets[key] = value
+
+    def step(name, action):
+        with QueryCounter() as counter:
+            action()
+        if app.exception:
+            raise RuntimeError(f"app.py raised during {name}: {app.exception[0].message}")
+        steps.append((prefix + name, counter))
+
+    step("first_render", app.run)
+    for question in range(1, len(app.session_state.user_selections) + 1):
+        step("answer", app.button(key=f"question_{question}_alternative_0").click().run)
+    step("name", app.text_input(key="NAME").input("Budget").run)
+    step("submit", app.text_input(key="EMAIL").input(email).run)
+    step("feedback", app.text_input(key="feedback").input("Budget check").run)
+    return steps
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    secrets = {"STREAM_ANALYSIS": False}
+    report, failures = {"steps": {}}, []
+    # the app logs with print(), kept off stdout so the report can be piped
+    with installed_stand_ins() as (fake, server), redirect_stdout(sys.stderr):
+        steps = run_steps("budget@example.com", secrets)
+        get_write_queue().flush()  # the new user reaches the database, so the second visit finds them
+        steps += run_steps("budget@example.com", secrets, prefix="return_")  # same user and answers in a new session
+
+    budgets = {**BUDGETS, **{f"return_{name}": budget for name, budget in RETURN_BUDGETS.items()}}
+    for name, counter in steps:
+        entry = report["steps"].setdefault(name, {"budget": budgets[name], "max_queries": 0, "runs": 0})
+        entry["runs"] += 1
+        entry["max_queries"] = max(entry["max_queries"], counter.usage.queries)
+        try:
+            counter.assert_budget(queries=budgets[name], label=f"Step '{name}'")
+        except QueryBudgetExceeded as error:
+            failures.append(str(error))
+    report["failures"] = failures
+    write_report(report, args.output)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
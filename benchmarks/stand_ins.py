@@ -0,0 +1,83 @@
+"""
+Local stand-ins for Supabase and OpenAI shared by the benchmarks, so the app runs end to end
+without secrets or network.
+
+Import this module before functions.py: it points PERSONA_STATE_DIR at a fresh temporary
+folder (unless it is already set), so the result cache, spool and counters start empty and
+the real ones are left alone.
+"""
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PERSONA_STATE_DIR", tempfile.mkdtemp(prefix="persona-benchmark-"))
+
+from openai import AsyncOpenAI
+import database
+import llm_gateway
+from fake_openai import FakeOpenAIServer
+from fake_supabase import FakeSupabase
+
+
+#1 Tables the app reads, built from the bundled score weights so every option is scored
+SCORE_WEIGHTS_PATH = os.path.join(ROOT, "data", "score_weights.json")
+
+def seed_tables(path=SCORE_WEIGHTS_PATH):
+    """
+    A question per entry of the weights file, with one alternative per weighted option (at least three).
+
+    Returns:
+    - tables (dict): Rows per table name, for FakeSupabase.
+    """
+    with open(path, encoding="utf-8") as file:
+        weights = json.load(file)
+    questions, alternatives = [], []
+    for question in weights["questions"]:
+        questions.append({"id": question["id"], "question_text": f"Question text {question['id']}"})
+        for number in range(max(len(question["weights"]), 3)):
+            alternatives.append({"id": len(alternatives) + 1, "Question": question["id"], "Alternatives": f"Alternative {number + 1}"})
+    return {"questions": questions, "possible_answers": alternatives, "catalog_version": [{"id": 1, "version": 1}],
+            "users": [], "answers": [], "feedback": []}
+
+def alternative_total(tables, question_id):
+    return sum(1 for row in tables["possible_answers"] if row["Question"] == question_id)
+
+#2 Context manager installing both stand-ins for the whole process
+@contextmanager
+def stand_ins(db_latency=0.0, llm_latency=0.0, tokens_per_second=None):
+    """
+    Route database.py to a FakeSupabase and llm_gateway.py to a FakeOpenAIServer.
+
+    Parameters:
+    - db_latency (float): Seconds every Supabase query takes.
+    - llm_latency (float): Seconds before the first token of every OpenAI reply.
+    - tokens_per_second (float or None): OpenAI output speed, None sends each reply at once.
+
+    Returns:
+    - (fake, server): The FakeSupabase (fake.calls logs every query) and the running server
+      (server.requests logs every completion request).
+    """
+    fake = FakeSupabase(seed_tables(), latency=db_latency)
+    database.configure(client_factory=lambda: fake)
+    with FakeOpenAIServer(latency=llm_latency, tokens_per_second=tokens_per_second) as server:
+        llm_gateway.configure(lambda: AsyncOpenAI(base_url=server.base_url, api_key="benchmark", max_retries=0))
+        yield fake, server
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile (q between 0 and 100) of a non-empty list.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+def write_report(report, output=None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
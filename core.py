@@ -0,0 +1,417 @@
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+from answer_codec import alternative_label
+from settings import STATE_DIR
+
+
+# Pure logic of the test: the question catalog, scoring, standardization and formatting.
+# Nothing here talks to Streamlit, Supabase or OpenAI, or reads secrets, so importing it only
+# costs numpy: workers and batch jobs can score answers without credentials or network.
+# functions.py re-exports everything, so the app keeps importing from there.
+
+#1 Question catalog, as loaded and shared by functions.get_catalog
+class QuestionCatalog(NamedTuple):
+    version: int  # bumped by the database on every change to the catalog, see functions._fetch_catalog_version
+    questions: tuple  # question texts, ordered by id
+    alternatives: tuple  # one tuple of alternative texts per question, in the same order
+    loaded_at: float
+
+    @property
+    def question_total(self):
+        return len(self.questions)
+
+#2 Functions to format the catalog for the LLM prompts and the question buttons
+@lru_cache(maxsize=8)
+def format_catalog(catalog):
+    """
+    Format a QuestionCatalog as a string where each question is numbered, followed by its
+    labelled possible answers. Memoized, so each catalog is only formatted once.
+
+    Parameters:
+    - catalog (QuestionCatalog): The catalog to format.
+
+    Returns:
+    - formatted_questions (str): Formatted string with numbered questions and answers.
+    """
+    formatted_questions = []
+    for question_number, (question_text, alternatives) in enumerate(zip(catalog.questions, catalog.alternatives), start=1):
+        formatted_questions.append(f"Question {question_number}: {question_text}")
+        for index, alternative in enumerate(alternatives):
+            formatted_questions.append(f"   {alternative_label(index)} {alternative}")
+
+    # Join all formatted questions and answers into a single string with new lines separating them
+    return "\n".join(formatted_questions)
+
+@lru_cache(maxsize=8)
+def question_buttons(catalog):
+    """
+    Labels and button texts of every alternative, indexed by question, built once per catalog
+    so rendering a question is a plain lookup.
+
+    Returns:
+    - buttons (tuple): One tuple of (label, button text) pairs per question, e.g. ("a)", "a) Save them").
+    """
+    return tuple(
+        tuple((alternative_label(index), f"{alternative_label(index)} {alternative}") for index, alternative in enumerate(alternatives))
+        for alternatives in catalog.alternatives
+    )
+
+#3 Fingerprint of an answer vector, stored next to each submission to find repeats
+def answer_fingerprint(answers):
+    """
+    Short, stable hash of an answer vector: the first 8 bytes of the sha256 of its labels, in hex.
+    Equal vectors always get the same fingerprint, whatever format the row stores them in.
+    """
+    canonical = "\x1f".join(str(answer).strip() for answer in answers)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+#4 Function to load the scoring weights from the versioned data file
+SCORE_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "score_weights.json")
+SCORE_WEIGHTS_VERSION = 1  # schema version this module knows how to read
+
+class ScoreWeights(NamedTuple):
+    version: int
+    categories: list
+    options: list  # option labels, in the order of the tensor's option axis
+    tensor: np.ndarray  # (questions, options + 1, categories), the extra slot scores unknown answers
+
+@lru_cache(maxsize=None)
+def load_score_weights(path=SCORE_WEIGHTS_PATH):
+    """
+    Load the scoring weights and compile them into a (questions x options x categories) tensor.
+    The file is validated here so a bad edit fails at load time instead of producing wrong scores.
+
+    Parameters:
+    - path (str): Path to the JSON weights file.
+
+    Returns:
+    - weights (ScoreWeights): The compiled weights. Cached, so the file is only read once per path.
+    """
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    if data.get("version") != SCORE_WEIGHTS_VERSION:
+        raise ValueError(f"Unsupported score weights version: {data.get('version')!r}")
+    categories = data.get("categories")
+    if not categories or not all(isinstance(category, str) for category in categories):
+        raise ValueError("Score weights must list the category names")
+    questions = data.get("questions")
+    if not questions:
+        raise ValueError("Score weights must contain at least one question")
+
+    options = sorted({option for question in questions for option in question.get("weights", {})})
+    tensor = np.zeros((len(questions), len(options) + 1, len(categories)))
+
+    for index, question in enumerate(questions):
+        if question.get("id") != index + 1:
+            raise ValueError(f"Questions must be numbered 1..n in order, found id {question.get('id')!r} at position {index + 1}")
+        # answers without their own row fall back to 'default' (the old 'else' branch), or add nothing
+        rows = dict(question["weights"])
+        rows[None] = question.get("default", [0] * len(categories))
+        for option, row in rows.items():
+            if len(row) != len(categories) or not all(isinstance(value, (int, float)) and np.isfinite(value) for value in row):
+                raise ValueError(f"Question {index + 1}, option {option}: expected {len(categories)} finite weights, got {row!r}")
+        for column, option in enumerate(options + [None]):
+            tensor[index, column] = rows.get(option, rows[None])
+
+    tensor.setflags(write=False)
+    return ScoreWeights(data["version"], categories, options, tensor)
+
+#5 Function to turn a list of answer labels into option indices for the weights tensor
+def encode_answers(answer, weights=None):
+    """
+    Map each answer label (e.g. 'c)') to its index on the option axis of the weights tensor.
+    Labels without weights for the question map to the last slot, like the old 'else' branches.
+
+    Parameters:
+    - answer (list): One label per question.
+    - weights (ScoreWeights or None): Weights to encode against, defaults to the bundled file.
+
+    Returns:
+    - indices (np.ndarray): Integer array with one option index per question.
+    """
+    weights = weights or load_score_weights()
+    lookup = {option: column for column, option in enumerate(weights.options)}
+    unknown = len(weights.options)
+    return np.array([lookup.get(answer[i], unknown) for i in range(weights.tensor.shape[0])], dtype=np.intp)
+
+#6 Function to generate user scores for each category
+def generate_user_scores(answer, categories):
+    """
+    Score an answer list by gathering one weight row per question and summing them.
+
+    Parameters:
+    - answer (list): One label per question, e.g. ["a)", "e)", ...].
+    - categories (list): Category names. Kept for compatibility, the order comes from the weights file.
+
+    Returns:
+    - user_scores (list): One score per category.
+    """
+    weights = load_score_weights()
+    indices = encode_answers(answer, weights)
+    return weights.tensor[np.arange(len(indices)), indices].sum(axis=0).tolist()
+
+def stardardize_scores(userScores, mode="self", histogram=None):
+    """
+    Put raw category scores on the 0.5-5 scale used by the radar chart.
+
+    Parameters:
+    - userScores (list): Raw scores from generate_user_scores.
+    - mode (str): "self" rescales the user against their own min and max (fails when they are all equal),
+      "population" places each score at its percentile in histogram.
+    - histogram (ScoreHistogram or None): Needed by "population" (functions.stardardize_scores passes the
+      process-wide one).
+
+    Returns:
+    - normalized_scores (list): One value between 0.5 and 5 per category.
+    """
+    if mode == "population":
+        if histogram is None:
+            raise ValueError("The population standardization needs a score histogram")
+        return (histogram.percentiles(userScores) * 4.5 + 0.5).tolist()
+    if mode != "self":
+        raise ValueError(f"Unknown standardization mode: {mode!r}")
+
+    userScores = [min(score, 5) for score in userScores]
+   
+    # Normalize the scores to range from 1 to 5
+    normalized_scores = [(score - min(userScores)) / (max(userScores) - min(userScores)) * 4.5 + 0.5 for score in userScores]
+    
+    return normalized_scores
+
+#7 Function to turn many answer lists into a matrix of option indices
+def encode_answer_matrix(answers, weights=None):
+    """
+    Vectorized version of encode_answers for a whole table of answer lists.
+
+    Parameters:
+    - answers (list or np.ndarray): N answer lists, each with one label per question.
+    - weights (ScoreWeights or None): Weights to encode against, defaults to the bundled file.
+
+    Returns:
+    - indices (np.ndarray): N x questions integer matrix of option indices.
+    """
+    weights = weights or load_score_weights()
+    question_total = weights.tensor.shape[0]
+    labels = np.asarray(answers, dtype=object).reshape(-1, question_total)
+    lookup = {option: column for column, option in enumerate(weights.options)}.get
+    unknown = len(weights.options)
+    indices = np.array([lookup(label, unknown) for label in labels.ravel().tolist()], dtype=np.intp)
+    return indices.reshape(labels.shape)
+
+#8 Function to score and standardize many encoded answer lists at once
+def score_answers_batch(encoded_answers, weights=None):
+    """
+    Batch entry point for backfills and analytics: scores an N x questions matrix of option
+    indices (see encode_answer_matrix) with vectorized operations instead of a loop over rows.
+
+    Parameters:
+    - encoded_answers (np.ndarray): N x questions integer matrix of option indices.
+    - weights (ScoreWeights or None): Weights to score with, defaults to the bundled file.
+
+    Returns:
+    - raw_scores (np.ndarray): N x categories matrix, same values as generate_user_scores per row.
+    - sd_scores (np.ndarray): N x categories matrix, same values as stardardize_scores per row
+      (rows where every score is equal come back as NaN instead of raising).
+    """
+    weights = weights or load_score_weights()
+    encoded_answers = np.asarray(encoded_answers, dtype=np.intp)
+    question_total, option_total, category_total = weights.tensor.shape
+    if encoded_answers.ndim != 2 or encoded_answers.shape[1] != question_total:
+        raise ValueError(f"Expected an N x {question_total} matrix, got shape {encoded_answers.shape}")
+    if encoded_answers.size and (encoded_answers.min() < 0 or encoded_answers.max() >= option_total):
+        raise ValueError(f"Option indices must be between 0 and {option_total - 1}")
+
+    # one gather per question keeps the working set at N x categories instead of N x questions x categories
+    raw_scores = np.zeros((encoded_answers.shape[0], category_total))
+    for question in range(question_total):
+        raw_scores += weights.tensor[question, encoded_answers[:, question]]
+
+    return raw_scores, stardardize_scores_batch(raw_scores)
+
+#9 Function to standardize a matrix of scores row by row
+def stardardize_scores_batch(scores):
+    """
+    Vectorized stardardize_scores: caps each score at 5 and rescales every row to 0.5-5.
+
+    Parameters:
+    - scores (np.ndarray): N x categories matrix of raw scores.
+
+    Returns:
+    - normalized_scores (np.ndarray): N x categories matrix, NaN for rows with no spread.
+    """
+    scores = np.minimum(np.asarray(scores, dtype=float), 5)
+    lowest = scores.min(axis=1, keepdims=True)
+    spread = scores.max(axis=1, keepdims=True) - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (scores - lowest) / spread * 4.5 + 0.5
+
+#10 Population distribution of raw scores, for ranking a user against everyone else
+POPULATION_HISTOGRAM_PATH = os.path.join(STATE_DIR, "population_histogram.json")
+SCORE_BIN_WIDTH = 0.5  # every weight is a multiple of 0.5, so bins this wide are exact
+
+class ScoreHistogram:
+    """
+    Per-category histogram of raw scores, updated one submission at a time and saved to disk.
+    The bins span every score the weights can produce, and a percentile table is kept next to
+    the counts so a lookup is a single index per category.
+    """
+
+    def __init__(self, weights, path=POPULATION_HISTOGRAM_PATH):
+        self.path = path
+        self.weights_version = weights.version
+        self.lowest = weights.tensor.min(axis=1).sum(axis=0)
+        highest = weights.tensor.max(axis=1).sum(axis=0)
+        bin_total = int(round((highest - self.lowest).max() / SCORE_BIN_WIDTH)) + 1
+        self.counts = np.zeros((len(self.lowest), bin_total), dtype=np.int64)
+        self._lock = threading.Lock()
+        self._refresh_percentiles()
+
+    def _refresh_percentiles(self):
+        # mid-rank percentile of each bin: everyone below it plus half of the ties
+        totals = self.counts.sum(axis=1, keepdims=True)
+        below = np.cumsum(self.counts, axis=1) - self.counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._percentiles = np.where(totals > 0, (below + self.counts / 2) / totals, 0.5)
+
+    def _bins(self, raw_scores):
+        bins = np.rint((np.asarray(raw_scores, dtype=float) - self.lowest) / SCORE_BIN_WIDTH)
+        return np.clip(bins, 0, self.counts.shape[1] - 1).astype(np.intp)
+
+    def add(self, raw_scores, save=True):
+        """
+        Count one row (or an N x categories matrix) of raw scores and save the histogram, unless
+        save is False because the caller persists the counts itself (see PopulationStats).
+        """
+        bins = self._bins(np.atleast_2d(raw_scores))
+        with self._lock:
+            for category in range(self.counts.shape[0]):
+                self.counts[category] += np.bincount(bins[:, category], minlength=self.counts.shape[1])
+            self._refresh_percentiles()
+            if save:
+                self.save()
+
+    def percentiles(self, raw_scores):
+        """
+        Return the population percentile (0-1) of each category score, 0.5 while the population is empty.
+        """
+        return self._percentiles[np.arange(self.counts.shape[0]), self._bins(raw_scores)]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "weights_version": self.weights_version,
+            "lowest": self.lowest.tolist(),
+            "bin_width": SCORE_BIN_WIDTH,
+            "counts": self.counts.tolist(),
+        }
+        # write to a temporary file first so a crash never leaves a half-written histogram
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary_path, self.path)
+
+    def load(self):
+        """
+        Read the saved counts, if any. A file built for other weights is ignored since its bins don't line up.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return self
+        counts = np.asarray(data.get("counts", []), dtype=np.int64)
+        if (data.get("weights_version") != self.weights_version or data.get("bin_width") != SCORE_BIN_WIDTH
+                or data.get("lowest") != self.lowest.tolist() or counts.shape != self.counts.shape):
+            print("Ignoring population histogram built for different score weights:", self.path)
+            return self
+        with self._lock:
+            self.counts = counts
+            self._refresh_percentiles()
+        return self
+
+#11 Local analysis written from the scores, shown when the LLM is slow or down
+LOCAL_ANALYSIS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "local_analysis.json")
+LOCAL_ANALYSIS_VERSION = 1
+
+@lru_cache(maxsize=None)
+def load_local_analysis_text(path=LOCAL_ANALYSIS_PATH):
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    if data.get("version") != LOCAL_ANALYSIS_VERSION:
+        raise ValueError(f"Unsupported local analysis version: {data.get('version')!r}")
+    return data
+
+def _band(position, bands):
+    return "low" if position < bands[0] else "high" if position > bands[1] else "mid"
+
+def local_analysis(answer, catalog=None, weights=None):
+    """
+    Deterministic analysis in the same bullet structure as analyze_answers, built in a few
+    microseconds from the category scores and the text fragments in data/local_analysis.json.
+    Each score is placed between the lowest and highest score the weights allow and picks the
+    low, mid or high fragment; with the catalog, the answer that pushed it the most is quoted.
+
+    Parameters:
+    - answer (list): One label per question, e.g. ["a)", "e)", ...].
+    - catalog (QuestionCatalog or None): Used to quote the chosen alternatives, skipped when None.
+    - weights (ScoreWeights or None): Weights to score against, defaults to the bundled file.
+
+    Returns:
+    - analysis (str): Markdown bullets, like the LLM's analysis.
+    """
+    text = load_local_analysis_text()
+    weights = weights or load_score_weights()
+    indices = encode_answers(answer, weights)
+    contributions = weights.tensor[np.arange(len(indices)), indices]  # (questions, categories)
+    scores = contributions.sum(axis=0)
+    lowest = weights.tensor.min(axis=1).sum(axis=0)
+    highest = weights.tensor.max(axis=1).sum(axis=0)
+    positions = np.divide(scores - lowest, highest - lowest, out=np.full(len(scores), 0.5), where=highest > lowest)
+
+    # how much each category's answers cancel out: 0 when they all agree, 1 when they pull evenly both ways
+    pulls = np.stack([np.clip(contributions, 0, None).sum(axis=0), np.clip(-contributions, 0, None).sum(axis=0)])
+    conflict = float(np.mean(np.divide(pulls.min(axis=0), pulls.max(axis=0), out=np.zeros(len(scores)), where=pulls.max(axis=0) > 0)))
+
+    def chosen_alternative(question):
+        if catalog is None or question >= len(catalog.alternatives):
+            return None
+        alternatives = catalog.alternatives[question]
+        index = next((index for index in range(len(alternatives)) if alternative_label(index) == answer[question]), None)
+        return alternatives[index] if index is not None else None
+
+    def evidence(category, band, invert=False):
+        if band == "mid":
+            return ""
+        column = contributions[:, category] * (-1 if (band == "low") != invert else 1)
+        question = int(np.argmax(column))
+        alternative = chosen_alternative(question)
+        if column[question] <= 0 or alternative is None:
+            return ""
+        return text["evidence"].format(question=question + 1, alternative=alternative)
+
+    lines = []
+    for section in text["sections"]:
+        if section.get("conflict"):
+            band = _band(conflict, section.get("bands", text["bands"]))
+            lines.append(f"- **{section['title']}:** {section[band]}")
+            continue
+        position = positions[section["category"]]
+        invert = section.get("invert", False)
+        band = _band(1 - position if invert else position, section.get("bands", text["bands"]))
+        lines.append(f"- **{section['title']}:** {section[band]}{evidence(section['category'], band, invert)}")
+
+    conclusion = text["conclusion"]
+    band = _band(positions[conclusion["category"]], conclusion.get("bands", text["bands"]))
+    closing = conclusion[band]
+    love = chosen_alternative(conclusion["love_question"] - 1)
+    if love and conclusion["love_keyword"] in love.lower():
+        closing += conclusion["love_remark"]
+    lines.append("")
+    lines.append(f"**Conclusion:** {closing}")
+    return "\n".join(lines)
@@ -0,0 +1,222 @@
+import random
+import threading
+import time
+from typing import TYPE_CHECKING
+from query_budget import record_query
+# supabase (with httpx and postgrest) and streamlit are imported where they are first needed,
+# so importing this module, or functions.py, doesn't pay for them up front
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+#1 Settings for the shared Supabase connection
+QUERY_TIMEOUT = 10  # seconds allowed for each request to Supabase
+READ_RETRIES = 3  # extra attempts for a read that failed with a transient error
+RETRY_BASE_DELAY = 0.2  # seconds, doubled on every attempt and jittered
+FAILURE_THRESHOLD = 5  # consecutive transient failures that open the circuit breaker
+RESET_TIMEOUT = 30  # seconds the breaker stays open before letting one request through
+HEALTH_TTL = 5  # seconds a health probe result is reused
+# PostgREST errors carry a PostgREST or Postgres (SQLSTATE) code, not the HTTP status
+TRANSIENT_POSTGREST_CODES = {
+    "PGRST000", "PGRST001", "PGRST002",  # PostgREST can't reach the database or load its schema (503)
+    "PGRST003",  # timed out waiting for a pooled connection (504)
+}
+TRANSIENT_SQLSTATES = {
+    "57014",  # query_canceled, e.g. by statement_timeout
+    "57P01", "57P02", "57P03",  # the server is shutting down, crashed or is starting up
+    "53300",  # too_many_connections
+    "40001", "40P01",  # serialization failure, deadlock: the same statement succeeds when run again
+}
+TRANSIENT_SQLSTATE_CLASSES = ("08",)  # connection exceptions
+
+class DatabaseUnavailable(RuntimeError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+def is_transient(error):
+    """
+    Whether an error is worth retrying: network problems, timeouts, an unavailable database
+    and the transient codes above. Anything else (bad query, constraint violation) will fail
+    the same way again.
+    """
+    import httpx
+    from postgrest.exceptions import APIError
+    if isinstance(error, httpx.TransportError):
+        return True
+    if not isinstance(error, APIError):
+        return False
+    if isinstance(error.code, int):  # a body that wasn't JSON (e.g. a proxy's 502 page): postgrest puts the HTTP status there
+        return error.code >= 500
+    code = str(error.code or "")
+    return (code in TRANSIENT_POSTGREST_CODES or code in TRANSIENT_SQLSTATES
+            or (len(code) == 5 and code.startswith(TRANSIENT_SQLSTATE_CLASSES)))
+
+#2 Circuit breaker that fails fast while the database is down
+class CircuitBreaker:
+    """
+    Closed: requests go through. After FAILURE_THRESHOLD transient failures in a row it opens
+    and every request raises DatabaseUnavailable straight away. After RESET_TIMEOUT one trial
+    request is let through (half-open): success closes it again, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._trial_running):
+                raise DatabaseUnavailable("The database is unavailable, try again in a few seconds.")
+            if state == "half-open":
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+#3 Connection manager owning the one Supabase client of the process
+def _create_supabase_client():
+    # the client keeps one httpx session, so connections are pooled and kept alive between calls
+    import streamlit as st
+    from supabase import create_client
+    from supabase.lib.client_options import ClientOptions
+    options = ClientOptions(postgrest_client_timeout=QUERY_TIMEOUT)
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], options)
+
+class ConnectionManager:
+    """
+    Lazily creates a single Supabase client and runs queries through the circuit breaker,
+    retrying reads with jittered exponential backoff.
+
+    Parameters:
+    - client_factory (callable): Builds the client, e.g. lambda: FakeSupabase() in tests.
+    """
+
+    def __init__(self, client_factory=_create_supabase_client, retries=READ_RETRIES, breaker=None, health_ttl=HEALTH_TTL):
+        self.client_factory = client_factory
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.health_ttl = health_ttl
+        self._client = None
+        self._health = (0.0, False)  # (checked at, healthy)
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> "Client":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+        return self._client
+
+    def _run(self, query):
+        self.breaker.before_call()
+        started = time.perf_counter()
+        try:
+            response = query.execute()
+        except Exception as error:
+            record_query(None, time.perf_counter() - started, failed=True)
+            if is_transient(error):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # the database answered, it just didn't like the query
+            raise
+        record_query(response, time.perf_counter() - started)  # per-rerun accounting, see query_budget.py
+        self.breaker.record_success()
+        return response
+
+    def read(self, query):
+        """
+        Execute a select, retrying transient failures. Query builders can be executed more than once.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return self._run(query)
+            except Exception as error:
+                if attempt == self.retries or not is_transient(error):
+                    raise
+                time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+
+    def write(self, query):
+        """
+        Execute an insert or update once. Writes are not retried here, a retry could duplicate the row.
+        """
+        return self._run(query)
+
+    def health_check(self):
+        """
+        Cheap probe (a HEAD request on 'questions'), cached for health_ttl seconds.
+        """
+        checked_at, healthy = self._health
+        if time.monotonic() - checked_at < self.health_ttl:
+            return healthy
+        try:
+            self._run(self.client.table("questions").select("id", head=True).limit(1))
+            healthy = True
+        except Exception as error:
+            print("Database health check failed:", error)
+            healthy = False
+        self._health = (time.monotonic(), healthy)
+        return healthy
+
+_manager = ConnectionManager()
+
+#4 Functions used by the rest of the app
+def get_manager():
+    return _manager
+
+def configure(client_factory=None, **settings):
+    """
+    Replace the process-wide connection manager, e.g. configure(client_factory=FakeSupabase) in tests.
+    """
+    global _manager
+    _manager = ConnectionManager(client_factory or _create_supabase_client, **settings)
+    return _manager
+
+def get_client() -> "Client":
+    return _manager.client
+
+def execute_read(query):
+    return _manager.read(query)
+
+def execute_write(query):
+    return _manager.write(query)
+
+def health_check():
+    return _manager.health_check()
+
+def iter_rows(table_name, columns="*", page_size=1000, after_id=0, where=None):
+    """
+    Yield every row of a table in id order, one page at a time (keyset pagination on id,
+    so each page is an index range scan however far in the table it is).
+    The columns must include id. Pass the last id seen as after_id to resume, and a function
+    adding filters to the query as where, e.g. lambda query: query.is_("fingerprint", "null").
+    """
+    while True:
+        query = get_client().table(table_name).select(columns).gt("id", after_id)
+        if where is not None:
+            query = where(query)
+        page = execute_read(query.order("id").limit(page_size)).data
+        yield from page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
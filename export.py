@@ -0,0 +1,188 @@
+"""
+Export the users, answers and feedback tables to chunked Parquet or CSV files.
+
+    python export.py --out exports --format parquet
+    python export.py --out exports --format csv --tables answers --page-size 5000
+    python export.py --out exports --full    # ignore the checkpoint and export everything again
+
+Each table is read page by page in id order (keyset pagination, see database.iter_rows) and
+every page becomes one file, e.g. exports/answers/answers-000000000001-000000005000.parquet,
+so memory stays flat however big the tables get. The answers are decoded (answer_codec.py)
+into one column per question and scored with the app's weights, raw and standardized.
+The last id written per table is checkpointed after every file, so the next run only
+exports the rows added since, which keeps nightly snapshots incremental.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from answer_codec import load_answers
+from database import iter_rows
+from core import encode_answer_matrix, load_score_weights, score_answers_batch
+
+
+#1 Settings for the export
+TABLES = ("users", "answers", "feedback")
+FORMATS = ("parquet", "csv")
+PAGE_SIZE = 5000  # rows per request and per file
+CHECKPOINT_NAME = "export_checkpoint.json"  # kept in the output folder, next to the files it describes
+# pandas dtypes of the known columns, the same in every file: left to inference, a page where a nullable
+# column is all empty gets Parquet's null type, and the folder can't be read back as one dataset
+COLUMN_TYPES = {
+    "id": "Int64", "user_id": "Int64", "name": "string", "email": "string", "suggestions": "string",
+    "fingerprint": "string", "idempotency_key": "string", "created_at": "string",
+}
+
+#2 Function to turn a page of answers rows into one column per question and the category scores
+def expand_answers(frame, weights=None):
+    """
+    Parameters:
+    - frame (pd.DataFrame): Rows of the 'answers' table, with the user_answer column as stored.
+    - weights (ScoreWeights or None): Weights to score with, defaults to the bundled file.
+
+    Returns:
+    - frame (pd.DataFrame): The same rows with user_answer replaced by q1..qN label columns and
+      one raw and one standardized score column per category. Rows whose answers can't be read
+      or don't have one answer per question keep empty labels and scores.
+    """
+    weights = weights or load_score_weights()
+    question_total = weights.tensor.shape[0]
+    labels = []
+    readable = []
+    for value in frame["user_answer"]:
+        try:
+            answers = load_answers(value)
+        except ValueError:
+            answers = []
+        readable.append(len(answers) == question_total)
+        labels.append(answers if readable[-1] else [None] * question_total)
+    readable = np.asarray(readable, dtype=bool)
+
+    raw_scores = np.full((len(frame), len(weights.categories)), np.nan)
+    sd_scores = np.full_like(raw_scores, np.nan)
+    if readable.any():
+        encoded = encode_answer_matrix([row for row, ok in zip(labels, readable) if ok], weights)
+        raw_scores[readable], sd_scores[readable] = score_answers_batch(encoded, weights)
+
+    columns = {f"q{number}": [row[number - 1] for row in labels] for number in range(1, question_total + 1)}
+    columns.update({f"{category} (raw)": raw_scores[:, index] for index, category in enumerate(weights.categories)})
+    columns.update({f"{category} (0-5)": sd_scores[:, index] for index, category in enumerate(weights.categories)})
+    return pd.concat([frame.drop(columns="user_answer").reset_index(drop=True), pd.DataFrame(columns)], axis=1)
+
+#3 Checkpoint with the last id exported per table
+class ExportCheckpoint:
+    """
+    JSON file rewritten after every file written. A file is written before the checkpoint moves
+    past its rows, so a crash in between only means the next run writes that file again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.last_ids = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.last_ids = json.load(file).get("last_ids", {})
+
+    def last_id(self, table_name):
+        return self.last_ids.get(table_name, 0)
+
+    def advance(self, table_name, last_id):
+        self.last_ids[table_name] = last_id
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"last_ids": self.last_ids}, file)
+        os.replace(temporary_path, self.path)
+
+#4 The export itself
+def with_stable_types(frame):
+    """
+    Cast every column to a dtype that doesn't depend on the values of the page: COLUMN_TYPES for
+    the known ones, otherwise nullable integers and booleans, floats, and strings for the rest
+    (an all-empty column included).
+    """
+    types = {}
+    for column, dtype in frame.dtypes.items():
+        if column in COLUMN_TYPES:
+            types[column] = COLUMN_TYPES[column]
+        elif pd.api.types.is_bool_dtype(dtype):
+            types[column] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[column] = "Int64"
+        elif not pd.api.types.is_float_dtype(dtype):
+            types[column] = "string"
+    return frame.astype(types)
+
+def write_chunk(frame, folder, table_name, file_format):
+    """
+    Write one page of rows to its own file, named after the id range it holds.
+    """
+    frame = with_stable_types(frame)
+    path = os.path.join(folder, f"{table_name}-{frame['id'].iloc[0]:012d}-{frame['id'].iloc[-1]:012d}.{file_format}")
+    temporary_path = f"{path}.tmp"
+    if file_format == "parquet":
+        frame.to_parquet(temporary_path, index=False)
+    else:
+        frame.to_csv(temporary_path, index=False)
+    os.replace(temporary_path, path)
+    return path
+
+def export_tables(out_dir, tables=TABLES, file_format="parquet", page_size=PAGE_SIZE, full=False):
+    """
+    Export the rows of each table added since the last run (every row with full=True).
+
+    Returns:
+    - report (dict): Per table, the rows and files written and the last id exported.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {file_format!r}")
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = ExportCheckpoint(os.path.join(out_dir, CHECKPOINT_NAME))
+    weights = load_score_weights()
+    started = time.perf_counter()
+    report = {}
+
+    for table_name in tables:
+        after_id = 0 if full else checkpoint.last_id(table_name)
+        folder = os.path.join(out_dir, table_name)
+        os.makedirs(folder, exist_ok=True)
+        report[table_name] = {"rows": 0, "files": 0, "after_id": after_id, "last_id": after_id}
+        page = []
+        # iter_rows yields page_size rows per request, collected back into one frame per request
+        for row in iter_rows(table_name, "*", page_size, after_id):
+            page.append(row)
+            if len(page) == page_size:
+                _export_page(page, folder, table_name, file_format, weights, checkpoint, report[table_name])
+                page = []
+        if page:
+            _export_page(page, folder, table_name, file_format, weights, checkpoint, report[table_name])
+        print(f"{table_name}: {report[table_name]['rows']} rows in {report[table_name]['files']} files")
+
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+def _export_page(rows, folder, table_name, file_format, weights, checkpoint, table_report):
+    frame = pd.DataFrame(rows)
+    if table_name == "answers" and "user_answer" in frame:
+        frame = expand_answers(frame, weights)
+    write_chunk(frame, folder, table_name, file_format)
+    checkpoint.advance(table_name, rows[-1]["id"])
+    table_report["rows"] += len(rows)
+    table_report["files"] += 1
+    table_report["last_id"] = rows[-1]["id"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="exports", help="output folder, one subfolder per table")
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=list(TABLES))
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--full", action="store_true", help="export every row, not only those added since the last run")
+    args = parser.parse_args()
+    print(json.dumps(export_tables(args.out, args.tables, args.format, args.page_size, args.full), indent=2))
+
+if __name__ == "__main__":
+    main()
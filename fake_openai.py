@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+#1 Local stand-in for the OpenAI chat completions endpoint
+def default_responder(body):
+    """
+    Canned replies shaped like the real ones for each of the app's prompts.
+    """
+    system = body["messages"][0]["content"]
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        grades = response_format["json_schema"]["schema"]["properties"]["grades"]["properties"]
+        return json.dumps({"analysis": "- **How You Value Life:** The student values life.", "grades": {category: 3 for category in grades}})
+    if "list of integers" in system:
+        return "[3,3,3,3,3,3,3,3]"
+    return "\n".join(f"- **{topic}:** The student's answers show a consistent position on this theme." for topic in (
+        "How You Value Life", "Utilitarianism", "Altruism vs Ego", "Nihilism and Pessimism", "Skepticism vs Hope",
+        "Morality and Hypocrisy", "Knowledge", "Freedom vs Collectivism", "Universalism vs Relativism"))
+
+class FakeOpenAIServer:
+    """
+    HTTP server speaking enough of the chat completions API for the openai client
+    (OpenAI(base_url=server.base_url, api_key="test")), streamed and not streamed.
+
+    Parameters:
+    - latency (float): Seconds before the first token (or the whole reply when not streaming).
+    - tokens_per_second (float or None): Output speed, None sends everything at once.
+    - responder (callable): Request body -> reply text.
+    """
+
+    def __init__(self, latency=0.0, tokens_per_second=None, responder=default_responder, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.responder = responder
+        self.requests = []  # request bodies, in arrival order
+        self.completion_tokens = 0  # tokens sent back so far, over all requests
+        self._failures = []  # (status, retry_after) to answer the next requests with
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def fail_next(self, count=1, status=429, retry_after=None):
+        """
+        Answer the next count requests with an error, e.g. 429 with a Retry-After header.
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client cancelled the call, e.g. past its deadline
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests.append(body)
+                failure = fake._next_failure()
+                if failure:
+                    status, retry_after = failure
+                    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+                    self._send_json(status, {"error": {"message": "fake failure", "type": "rate_limit_error", "code": str(status)}}, headers)
+                    return
+
+                text = fake.responder(body)
+                tokens = [word + " " for word in text.split(" ")]
+                tokens[-1] = tokens[-1][:-1]
+                prompt_tokens = sum(len(message["content"].split()) for message in body["messages"])
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+                with fake._lock:
+                    fake.completion_tokens += len(tokens)
+                time.sleep(fake.latency)
+                created = int(time.time())
+
+                if not body.get("stream"):
+                    if fake.tokens_per_second:
+                        time.sleep(len(tokens) / fake.tokens_per_second)
+                    self._send_json(200, {
+                        "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": body.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send_event(payload):
+                    data = f"data: {payload}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                for token in tokens:
+                    send_event(json.dumps({
+                        "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }))
+                    if fake.tokens_per_second:
+                        time.sleep(1 / fake.tokens_per_second)
+                send_event(json.dumps({
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+                }))
+                send_event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,176 @@
+import copy
+import threading
+import time
+import httpx
+
+
+#1 In-memory stand-in for the parts of the Supabase client this app uses
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class FakeQuery:
+    """
+    Mimics a postgrest request builder: filters are collected by the chained calls and
+    applied when execute() runs, so the same query can be executed more than once.
+    """
+
+    def __init__(self, database, table_name):
+        self.database = database
+        self.table_name = table_name
+        self.operation = "select"
+        self.columns = ["*"]
+        self.count = None
+        self.head = False
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+        self.payload = None
+
+    def select(self, *columns, count=None, head=None):
+        self.columns = [column.strip() for joined in columns for column in joined.split(",")] or ["*"]
+        self.count = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, json, **kwargs):
+        self.operation = "insert"
+        self.payload = json if isinstance(json, list) else [json]
+        return self
+
+    def upsert(self, json, on_conflict="", **kwargs):
+        self.operation = "upsert"
+        self.payload = json if isinstance(json, list) else [json]
+        self.conflict_columns = [column for column in on_conflict.split(",") if column] or ["id"]
+        return self
+
+    def update(self, json, **kwargs):
+        self.operation = "update"
+        self.payload = json
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        self.filters.append(lambda row: row.get(column) is expected if expected is None else row.get(column) == expected)
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self.row_limit = size
+        return self
+
+    def execute(self):
+        return self.database.execute(self)
+
+class FakeSupabase:
+    """
+    Thread-safe in-memory database with auto-increment 'id' columns.
+
+    Parameters:
+    - tables (dict or None): Initial rows per table name.
+    - latency (float): Seconds every execute() sleeps, to imitate the network round trip.
+    - down (bool): While True every execute() raises httpx.ConnectError, like an outage.
+    """
+
+    def __init__(self, tables=None, latency=0.0, down=False):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.down = down
+        self.calls = []  # (table, operation) of every executed query
+        self.failures = []  # errors raised by the next execute() calls, see fail_next
+        self._lock = threading.Lock()
+
+    def table(self, table_name):
+        return FakeQuery(self, table_name)
+
+    from_ = table
+
+    def fail_next(self, error, times=1):
+        """
+        Make the next `times` execute() calls raise error (e.g. an APIError with code "PGRST000") instead of running.
+        """
+        with self._lock:
+            self.failures.extend([error] * times)
+
+    def _next_id(self, rows):
+        return max((row.get("id") or 0 for row in rows), default=0) + 1
+
+    def _insert(self, rows, row):
+        row = dict(row)
+        row.setdefault("id", self._next_id(rows))
+        rows.append(row)
+        return row
+
+    def execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.down:
+            raise httpx.ConnectError("fake Supabase is down")
+
+        with self._lock:
+            if self.failures:
+                self.calls.append((query.table_name, "failed"))
+                raise self.failures.pop(0)
+            self.calls.append((query.table_name, query.operation))
+            rows = self.tables.setdefault(query.table_name, [])
+
+            if query.operation == "insert":
+                return FakeResponse([copy.deepcopy(self._insert(rows, row)) for row in query.payload])
+
+            if query.operation == "upsert":
+                written = []
+                for row in query.payload:
+                    key = tuple(row.get(column) for column in query.conflict_columns)
+                    match = next((existing for existing in rows if tuple(existing.get(column) for column in query.conflict_columns) == key), None)
+                    if match is None:
+                        match = self._insert(rows, row)
+                    else:
+                        match.update(row)
+                    written.append(copy.deepcopy(match))
+                return FakeResponse(written)
+
+            matched = [row for row in rows if all(condition(row) for condition in query.filters)]
+            if query.operation == "update":
+                for row in matched:
+                    row.update(query.payload)
+                return FakeResponse(copy.deepcopy(matched))
+
+            for column, desc in reversed(query.ordering):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            count = len(matched) if query.count else None
+            if query.row_limit is not None:
+                matched = matched[:query.row_limit]
+            if query.head:
+                return FakeResponse([], count)
+            if query.columns != ["*"]:
+                matched = [{column: row.get(column) for column in query.columns} for row in matched]
+            return FakeResponse(copy.deepcopy(matched), count)
@@ -1,167 +1,279 @@
+import hashlib
 import json
-import streamlit as st
-import supabase
-from supabase import create_client, Client
-from openai import OpenAI
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+import numpy as np
+from database import get_client, execute_read, iter_rows
+from write_behind import WriteBehindQueue
+from result_cache import ResultCache, cache_key
+from llm_gateway import DeadlineExceeded, get_gateway, current_session_id
+from llm_metrics import get_recorder
+from answer_index import HammingIndex
+from answer_codec import alternative_label, dump_answers, load_answers  # alternative_label is re-exported for app.py
+from settings import STATE_DIR
+# the pure logic lives in core.py (cheap to import, no clients or secrets) and is re-exported here;
+# streamlit, supabase and openai are only imported where first used, so importing this module stays cheap
+from core import (QuestionCatalog, format_catalog, question_buttons, answer_fingerprint,
+                  SCORE_WEIGHTS_PATH, SCORE_WEIGHTS_VERSION, ScoreWeights, load_score_weights, encode_answers,
+                  generate_user_scores, encode_answer_matrix, score_answers_batch, stardardize_scores_batch,
+                  POPULATION_HISTOGRAM_PATH, SCORE_BIN_WIDTH, ScoreHistogram,
+                  LOCAL_ANALYSIS_PATH, LOCAL_ANALYSIS_VERSION, load_local_analysis_text, local_analysis)
+import core
+
+
+#1 OpenAI calls go through one gateway per process (concurrency cap, rate limits, fair queue, retries), see llm_gateway.py
+# every call is timed and its tokens and cost recorded under its stage, see llm_metrics.py
+def llm_complete(stage, timeout=None, hedge_after=None, **request):
+    return get_gateway().complete(current_session_id(), stage, timeout=timeout, hedge_after=hedge_after, **request)
+
+def llm_stream(stage, timeout=None, idle_timeout=None, **request):
+    return get_gateway().stream(current_session_id(), stage, timeout=timeout, idle_timeout=idle_timeout, **request)
+
+#2 Supabase client: one shared, pooled client per process, see database.py
+# inserts are spooled to disk and written in the background, see write_behind.py
+WRITE_SPOOL_PATH = os.path.join(STATE_DIR, "write_spool.sqlite3")
+
+def process_singleton(factory):
+    """
+    Like lru_cache on a getter without arguments, but safe when several sessions call it at once:
+    the object is built exactly once per process. cache_clear() drops it.
+    """
+    lock = threading.Lock()
+    cached = lru_cache(maxsize=None)(factory)
 
+    @wraps(factory)
+    def getter():
+        with lock:
+            return cached()
 
-#1 Setting openai client
-OPENAI = st.secrets["OPENAI_API_KEY"]
-client = OpenAI(api_key = OPENAI)
+    getter.cache_clear = cached.cache_clear
+    return getter
 
-#2 Setting supabase client
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+@process_singleton
+def get_write_queue():
+    # two sessions can spool the same new email before either is written: the second one becomes the first's user
+    return WriteBehindQueue(WRITE_SPOOL_PATH, natural_keys={"users": ("email",)})
+
+def user_reference(user_id):
+    """
+    Split a user id as returned by insert_user into (database id, spool key): a still-spooled
+    user is only known by its idempotency key, which the writer turns into the id later.
+    """
+    return (None, user_id) if isinstance(user_id, str) else (user_id, None)
 
 #3 Function to insert a new user into 'users' table
 def insert_user(name: str, email: str):
-  # insert data into the users table
-  response = supabase.table("users").insert({"name": name, "email": email}).execute()
-  # check for errors in the response and raise an exception if needed
-  if response.data:
-    print("User inserted successfully:", response.data)
-  else:
-    # raise an error if the insertion was not successful
-    error_message = response.error.get("message") if response.error else st.write("Try using a different email.")
-    raise RuntimeError(f"Failed to insert user: {error_message}")
-
-#4 Function to get the value of the last inserted email  
-def get_last_email():
+  """
+  Spool a new user for insertion. Returns as soon as the row is safely on disk.
+
+  Returns:
+  - user_key (str): Idempotency key of the user, accepted as user_id by send_answers and send_feedback.
+  """
+  user_key = get_write_queue().enqueue("users", {"name": name, "email": email})
+  print("User spooled for insertion:", user_key)
+  return user_key
+
+#4 Question catalog shared by every session in the process, and the number of questions in it
+CATALOG_TTL = 300  # seconds a catalog is served before its version is checked again
+CATALOG_MAX_AGE = 3600  # seconds after which the catalog is reloaded even if the version didn't change
+
+def _fetch_catalog_version():
+    # one row, bumped by a trigger on every insert, update or delete of the catalog (migrations/003_catalog_version.sql)
+    response = execute_read(get_client().table("catalog_version").select("version").eq("id", 1))
+    if not response.data:
+        raise RuntimeError("The 'catalog_version' table has no row, apply migrations/003_catalog_version.sql")
+    return response.data[0]["version"]
+
+def _fetch_catalog():
+    version = _fetch_catalog_version()
+    questions_response = execute_read(get_client().table("questions").select("question_text").order("id"))
+    answers_response = execute_read(get_client().table("possible_answers").select("Question", "Alternatives"))
+    if not questions_response.data:
+        raise RuntimeError("The 'questions' table returned no rows")
+
+    questions = tuple(question["question_text"] for question in questions_response.data)
+    # alternatives are matched to the position of the question, like the page always did
+    grouped = [[] for _ in questions]
+    for answer in answers_response.data or []:
+        if 1 <= answer["Question"] <= len(grouped):
+            grouped[answer["Question"] - 1].append(answer["Alternatives"])
+    return QuestionCatalog(version, questions, tuple(tuple(group) for group in grouped), time.time())
+
+class CatalogCache:
+    """
+    Holds the last good QuestionCatalog. Once it is older than the TTL it keeps being served
+    while a background thread checks the version and reloads it if needed (stale-while-revalidate).
+    If the database can't be reached the old copy simply stays in place.
+    """
+
+    def __init__(self, ttl=CATALOG_TTL, max_age=CATALOG_MAX_AGE, fetch=_fetch_catalog, fetch_version=_fetch_catalog_version):
+        self.ttl = ttl
+        self.max_age = max_age
+        self._fetch = fetch
+        self._fetch_version = fetch_version
+        self._catalog = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        catalog = self._catalog
+        if catalog is None:
+            with self._lock:
+                if self._catalog is None:  # only the first caller loads, the others wait for it
+                    self._catalog = self._fetch()
+                    self._checked_at = time.monotonic()
+                return self._catalog
+        if time.monotonic() - self._checked_at >= self.ttl:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self.refresh, daemon=True).start()
+        return catalog
+
+    def refresh(self):
+        try:
+            catalog = self._catalog
+            if catalog is None or time.time() - catalog.loaded_at >= self.max_age or self._fetch_version() != catalog.version:
+                catalog = self._fetch()
+            with self._lock:
+                self._catalog = catalog
+                self._checked_at = time.monotonic()
+        except Exception as error:  # keep serving the last good copy, try again after the next TTL
+            print("Could not refresh the question catalog, serving the cached copy:", error)
+            with self._lock:
+                self._checked_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+
+_catalog_cache = CatalogCache()
+
+def get_catalog():
     """
-    Retrieve the most recent email from the 'users' table.
+    Return the process-wide QuestionCatalog. Only the very first call (or a call after the TTL
+    with the refresh happening in the background) talks to the database.
 
     Returns:
-    - email (str or None): The most recent email if found, otherwise None.
+    - catalog (QuestionCatalog): Questions, alternatives and counts.
     """
-    response = supabase.table("users").select("email").order("id", desc=True).limit(1).execute()
-    
-    # check if the response contains data and extract the email
-    if response.data and len(response.data) > 0:  # ensure there's at least one email
-        return response.data[0]['email']  # return the email from the first row
-    else:
-        print("No email found in the response.")
-        return None  # return None if no email is found
+    return _catalog_cache.get()
 
-#5 Function to get the number of rows in the 'questions' table
 def question_count():
-    response = supabase.table("questions").select("*", count="exact").execute()
-
-    # check for errors
-    if response.data:
-        return len(response.data)  # count of rows in the 'questions' table
-    else:
-        st.error(f"Error retrieving questions: {response.error}")
+    try:
+        return get_catalog().question_total
+    except Exception as error:
+        import streamlit as st
+        st.error(f"Error retrieving questions: {error}")
         return 0  # return 0 if there was an error
 
-#6 Function to get the user ID from the 'users' table using the last email
-def get_user_id_by_email():
+#5 Function to get the user ID from the 'users' table using their email
+def get_user_id_by_email(email):
     """
-    Retrieve the user ID from the 'users' table using the last email.
+    Retrieve the user ID from the 'users' table for an email.
 
     Returns:
     - user_id (int or None): The ID of the user if found, otherwise None.
     """
-    # get the last email using the existing function
-    last_email = get_last_email()  # now returns a string or None
-
-    if last_email:
-        # query the 'users' table to find the user with the specified email
-        response = supabase.table('users').select('id').eq('email', last_email).execute()
+    response = execute_read(get_client().table('users').select('id').eq('email', email).limit(1))
 
-        # check if the response contains data
-        if response.data and len(response.data) > 0:
-            return response.data[0]['id']  # get the 'id' from the first row of data
-        else:
-            print("No user found with the specified email.")
-            return None  # return None if user not found
-    else:
-        print("Last email is None or invalid.")
-        return None  # return None if no last email is available
+    # check if the response contains data
+    if response.data:
+        return response.data[0]['id']  # get the 'id' from the first row of data
+    print("No user found with the specified email.")
+    return None  # return None if user not found
 
-#7 Function to send answers to database
+#6 Functions to send answers and feedback to database
 def send_answers(user_selections, user_id):
     """
-    Send user selections as a single row to the 'answers' table.
+    Send user selections as a single row to the 'answers' table. The row is spooled to disk
+    and inserted by the background writer, so this returns once the submission is durable.
 
     Parameters:
     - user_selections (list): The list of user selections to be sent to the 'user_answer' column.
-    - user_id (int): The ID of the user to be sent to the 'user_id' column.
+    - user_id (int or str): The ID of the user, or the key returned by insert_user for a user still being written.
+
+    Returns:
+    - answer_key (str): Idempotency key of the spooled row.
     """
     # ensure that user_selections is not empty and user_id is provided
     if not user_selections or user_id is None:
         return
-    # convert the user_selections list to a JSON string (or comma-separated string if preferred)
-    user_answer_str = json.dumps(user_selections)
+    # pack the user_selections list into a few bytes, see answer_codec.py
+    user_answer_str = dump_answers(user_selections)
+    user_id, user_key = user_reference(user_id)
     # prepare the data for insertion
     data_to_insert = {
-        "user_answer": user_answer_str,  # store the list as a JSON string in the database
-        "user_id": user_id
+        "user_answer": user_answer_str,  # stored packed and base64-encoded, load_answers reads it back
+        "user_id": user_id,
+        "fingerprint": answer_fingerprint(user_selections),  # indexed with user_id, see find_submission
     }
-    # insert the data into the 'answers' table as a single row
-    response = supabase.table("answers").insert(data_to_insert).execute()
-    # Check if the response contains data
-    if response.data:
-        print("Answers inserted successfully:", response.data)
-    else:
-        # Handle the case where insertion failed (no data in response)
-        error_message = response.get("message", "Unknown error occurred during insertion")
-        print("Error inserting answers:", error_message)
-        raise RuntimeError(f"Failed to insert answers: {error_message}")
-    # Return response for further handling or logging (optional)
-    return response
-
-#8 Function to collect questions and answers from the database in string format
-def get_formatted_questions_and_answers():
+    # spool the row, the background writer inserts it into the 'answers' table
+    answer_key = get_write_queue().enqueue("answers", data_to_insert, refs={"user_id": user_key} if user_key else None)
+    print("Answers spooled for insertion:", answer_key)
+    # count the submission in the population counters (option shares and the score distribution
+    # used by stardardize_scores(mode="population")), see PopulationStats
+    try:
+        get_population_stats().record(user_selections)
+    except OSError as error:
+        print("Could not log the population counters:", error)
+    return answer_key
+
+def find_submission(user_id, answers):
     """
-    Fetches questions and corresponding answers from the database, formats them,
-    and returns a string where each question is numbered, followed by its possible answers
-    ranked from a) to h).
+    Whether this user already submitted exactly these answers: one lookup on the
+    (user_id, fingerprint) index instead of reading and decoding their rows.
+    Its analysis, if stored, is served by get_cached_analysis when the results are shown.
 
     Returns:
-    - formatted_questions (str): Formatted string with numbered questions and answers.
+    - row (dict or None): The id and user_id of the answers row, or None if not submitted.
     """
+    response = execute_read(
+        get_client().table("answers").select("id, user_id")
+        .eq("user_id", user_id).eq("fingerprint", answer_fingerprint(answers)).limit(1)
+    )
+    return response.data[0] if response.data else None
 
-    # Initialize the list that will store the formatted string
-    formatted_questions = []
-
-    # Get the total number of questions
-    total_questions = question_count()
+def send_feedback(suggestions, user_id):
+    """
+    Spool a row for the 'feedback' table.
 
-    # Loop through each question
-    for question_number in range(1, total_questions + 1):
-        # Fetch the question text from the 'questions' table
-        question_response = supabase.table('questions').select('question_text').eq('id', question_number).execute()
-        
-        if question_response.data:
-            question_text = question_response.data[0]['question_text']
-            # Append the question number and text to the formatted list
-            formatted_questions.append(f"Question {question_number}: {question_text}")
+    Parameters:
+    - suggestions (str): The feedback text.
+    - user_id (int or str): Database id of the user, or the key returned by insert_user.
 
-            # Fetch the possible answers corresponding to the current question
-            answer_response = supabase.table('possible_answers').select('Alternatives').eq('Question', question_number).execute()
+    Returns:
+    - feedback_key (str): Idempotency key of the spooled row.
+    """
+    # the key comes from the content, so the same feedback sent again on a rerun is only stored once
+    feedback_key = hashlib.sha256(f"feedback:{user_id}:{suggestions}".encode()).hexdigest()
+    user_id, user_key = user_reference(user_id)
+    return get_write_queue().enqueue("feedback", {"suggestions": suggestions, "user_id": user_id}, refs={"user_id": user_key} if user_key else None, key=feedback_key)
 
-            if answer_response.data:
-                # Generate letter labels (a), b), c), etc.)
-                letter_labels = 'abcdefgh'
+#7 Function to collect questions and answers from the database in string format
+def get_formatted_questions_and_answers():
+    """
+    Returns the questions and their possible answers as one string for the LLM prompts,
+    built from the shared catalog (two bulk queries when it loads, none afterwards).
 
-                # Append each alternative answer with the corresponding letter
-                for index, answer in enumerate(answer_response.data):
-                    formatted_questions.append(f"   {letter_labels[index]}) {answer['Alternatives']}")
+    Returns:
+    - formatted_questions (str): Formatted string with numbered questions and answers.
+    """
+    return format_catalog(get_catalog())
 
-    # Join all formatted questions and answers into a single string with new lines separating them
-    return "\n".join(formatted_questions)
 
+#8 Prompts and model used for the analysis, part of the result cache key so editing them invalidates old results
+LLM_MODEL = "gpt-4o"
 
-#9 Function to send user answers to openai and return the personality analysis 
-def analyze_answers(questions, answers):
-    # philosophy professor's role 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system",
-              "content": (
-                  f"""You are a philosophy professor analyzing a student's moral and personality. Focus on their decision-making process, moral reasoning and tendencies such as pacifism, collectivism, altruism, egoism, etc. Analyze their response to the following questions, along with the other alternatives, and provide constructive feedback. Highlight any inconsistencies or traits that emerge from their response. The structure should be as follows, with each bullet point between 1 and 3 lines:
+ANALYSIS_PROMPT = """You are a philosophy professor analyzing a student's moral and personality. Focus on their decision-making process, moral reasoning and tendencies such as pacifism, collectivism, altruism, egoism, etc. Analyze their response to the following questions, along with the other alternatives, and provide constructive feedback. Highlight any inconsistencies or traits that emerge from their response. The structure should be as follows, with each bullet point between 1 and 3 lines:
                   - **How You Value Life:** your thoughts based on the answers
                   - **Utilitarianism:** your thoughts on how utilitarian they were and a brief explanation of what it means
                   - **Altruism vs Ego:** your thoughts on 'goody' vs egocentric
@@ -181,8 +293,31 @@ Here are the questions and answers:
 {questions}
 
 Now, analyze the student's answer based on the given context, and provide insights into their moral outlook and personality. Write everything on the third-person."""
-                )
-            },
+
+QA_PROMPT = """You are a Quality Analyst with strong logical and philosophical skills. Your task is to review the feedback of a test based on the questions and answers. Focus on whether the analysis makes sense and remains consistent with the context provided. Be neutral and objective in your corrections to ensure the quality of the feedback, and return the same format as the input feedback. For instance, if the feedback says that the user values individual freedom, check that against question 14 to see if it makes sense. If the user actually answered they value colectivism more, then correct the feedback by deleting the part that is wrong and rewriting it correctly. The same goes for other answers, check Altruism with question 3 (and maybe others), universalism with question 20, and etc.
+                  
+Here are the questions and answers:
+
+Questions: {questions}
+
+Answers: {answers}
+"""
+
+RADAR_PROMPT = """You are a computer, and you have to create a list of integers between 1 and 5 that represent the grades for each category based on a specific feedback. The categories are the following: {categories}, and the format must be as such: [4,3,5,3,1,2], where each number represents the grade for each category, respectively.
+
+                  For example, you see that the feedback claimed that the student is not pessimist at all, so for that category, you must return 1. If the next category is Hopefullness, analyze what the feedback says about skepticism and hope, and grade it accordingly.
+
+                  **Remember:** You should only return the list, i.e. '[1,2,1,4,3,...]'. DON'T RETURN ANYTHING ELSE.
+                  """
+
+# Function to send user answers to openai and return the personality analysis 
+def analyze_answers(questions, answers, timeout=None, hedge_after=None):
+    # philosophy professor's role 
+    response = llm_complete(
+        "analysis", timeout, hedge_after,
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": ANALYSIS_PROMPT.format(questions=questions)},
             {"role": "user", "content": f"{answers}"}],
         stream=False,
     )
@@ -190,24 +325,15 @@ Now, analyze the student's answer based on the given context, and provide insigh
 
     return content
     
-#10 QA function to stop halucinations
-def QA(analysis,questions,answers):
+#9 QA function to stop halucinations
+def QA(analysis,questions,answers, timeout=None, hedge_after=None):
 
     # assistant's QA role
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = llm_complete(
+        "qa", timeout, hedge_after,
+        model=LLM_MODEL,
         messages=[
-            {"role": "system",
-              "content": (f"""You are a Quality Analyst with strong logical and philosophical skills. Your task is to review the feedback of a test based on the questions and answers. Focus on whether the analysis makes sense and remains consistent with the context provided. Be neutral and objective in your corrections to ensure the quality of the feedback, and return the same format as the input feedback. For instance, if the feedback says that the user values individual freedom, check that against question 14 to see if it makes sense. If the user actually answered they value colectivism more, then correct the feedback by deleting the part that is wrong and rewriting it correctly. The same goes for other answers, check Altruism with question 3 (and maybe others), universalism with question 20, and etc.
-                  
-Here are the questions and answers:
-
-Questions: {questions}
-
-Answers: {answers}
-"""
-                )
-            },
+            {"role": "system", "content": QA_PROMPT.format(questions=questions, answers=answers)},
             {"role": "user", "content": f"{analysis}"}],
         stream=False,
     )
@@ -216,22 +342,14 @@ Answers: {answers}
 
     return content
 
-#11 Function to create a list of grades for each category
-def radar_data(QA_response, categories):
+#10 Function to create a list of grades for each category
+def radar_data(QA_response, categories, timeout=None, hedge_after=None):
     #simple data scientist role 
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = llm_complete(
+        "radar", timeout, hedge_after,
+        model=LLM_MODEL,
         messages=[
-            {"role": "system",
-              "content": (
-                  f"""You are a computer, and you have to create a list of integers between 1 and 5 that represent the grades for each category based on a specific feedback. The categories are the following: {categories}, and the format must be as such: [4,3,5,3,1,2], where each number represents the grade for each category, respectively.
-
-                  For example, you see that the feedback claimed that the student is not pessimist at all, so for that category, you must return 1. If the next category is Hopefullness, analyze what the feedback says about skepticism and hope, and grade it accordingly.
-
-                  **Remember:** You should only return the list, i.e. '[1,2,1,4,3,...]'. DON'T RETURN ANYTHING ELSE.
-                  """
-                )
-            },
+            {"role": "system", "content": RADAR_PROMPT.format(categories=categories)},
             {"role": "user", "content": f"The feedback is this: {QA_response}, create the list."}],
         stream=False,
     )
@@ -247,1075 +365,640 @@ def radar_data(QA_response, categories):
         content = split_content[0].strip()  # If splitting fails, fallback to the original content
 
     # Output the result
-    return content, st.write('lengthed content: ', content)
-
-#12 Function to generate user scores for each question and category
-
-def generate_user_scores(answer,categories):
-    # Initialize empty dictionary to store user scores
-    user_scores = []
-    for category in categories:
-        user_scores.append(0)
-
-    # Iterate over each question and category
-    #Question 1. You unsheath your sword…
-    if answer[0]=='b)':
-        user_scores[0] += 2
-        user_scores[1] += 0
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += -1
-        user_scores[7] += 0
-        
-    elif answer[0]=='c)':
-        user_scores[0] += 1
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 1
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    else:
-        user_scores[0] += -1
-        user_scores[1] += 0.5
-        user_scores[2] += -1
-        user_scores[3] += 0.5   
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += -1
-    #Question 2. Your little sibling is suddenly recognized by the whole world as the new Savior, but he/she has to sacrifice himself/herself…
-    if answer[1]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 2
-        user_scores[3] += 1
-        user_scores[4] += 1
-        user_scores[5] += -0.5
-        user_scores[6] += -1
-        user_scores[7] += 1
-        
-    elif answer[1]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 2
-        user_scores[2] += 0
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += -2
-        user_scores[7] += 0
-    
-    elif answer[1]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += -2
-        user_scores[2] += -1
-        user_scores[3] += -0.5
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 2
-        user_scores[7] += 1
-    
-    elif answer[1]=='d)':
-        user_scores[0] += -2
-        user_scores[1] += -2
-        user_scores[2] += -1
-        user_scores[3] += 2
-        user_scores[4] += -1
-        user_scores[5] += -1
-        user_scores[6] += 2
-        user_scores[7] += -1
-
-    else: #e)
-        user_scores[0] += 1
-        user_scores[1] += -1
-        user_scores[2] += 0
-        user_scores[3] += 1   
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += 0
-    #Question 3. You go back in time to the most vulnerable moment of the world's greatest villain's infancy for a brief moment…
-    if answer[2]=='a)':
-        user_scores[0] += 1
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 1
-        user_scores[6] += -1
-        user_scores[7] += 0
-        
-    elif answer[2]=='b)':
-        user_scores[0] += -1
-        user_scores[1] += 2
-        user_scores[2] += -1
-        user_scores[3] += 1
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += -1
-        user_scores[7] += -1
-    
-    elif answer[2]=='c)':
-        user_scores[0] += 2
-        user_scores[1] += -1
-        user_scores[2] += 1
-        user_scores[3] += -2
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 1
-
-    else: #d)
-        user_scores[0] += 1
-        user_scores[1] += -0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -2   
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0.5
-        user_scores[7] += 0
-    #Question 4. You become the owner of half of the world's money and military power, your priority, the first thing you do is...
-    if answer[3]=='a)':
-        user_scores[0] += 1
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += -1
-        
-    elif answer[3]=='b)':
-        user_scores[0] += 1
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[3]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += -1
-        user_scores[7] += 0
-    
-    elif answer[3]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 1
-        user_scores[3] += -1
-        user_scores[4] += 1
-        user_scores[5] += -0.5
-        user_scores[6] += 1
-        user_scores[7] += 1
-    
-    elif answer[3]=='e)':
-        user_scores[0] += -1
-        user_scores[1] += -2
-        user_scores[2] += -1
-        user_scores[3] += 2
-        user_scores[4] += -1
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += 0
-    
-    else: #f)
-        user_scores[0] += -1
-        user_scores[1] += -1
-        user_scores[2] += -2
-        user_scores[3] += 1   
-        user_scores[4] += -1
-        user_scores[5] += 0
-        user_scores[6] += 2
-        user_scores[7] += 0
-
-    #Question 5. The love of your life, the one you hoped to spend an eternity with, is found to be a villain...
-    if answer[4]=='a)':
-        user_scores[0] += -1
-        user_scores[1] += 1
-        user_scores[2] += -1
-        user_scores[3] += 1
-        user_scores[4] += -1
-        user_scores[5] += -0.5
-        user_scores[6] += -0.5
-        user_scores[7] += 1
-        
-    elif answer[4]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += 1
-        user_scores[6] += 0.5
-        user_scores[7] += -0.5
-    
-    elif answer[4]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 2
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += 0
-    
-    elif answer[4]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 0.5
-        user_scores[7] += 1
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0.5
-        user_scores[3] += 0.5   
-        user_scores[4] += -1
-        user_scores[5] += 0
-        user_scores[6] += -1
-        user_scores[7] += 0
-    
-    #Question 6. You are a leader in a democratic country on the brink of civil war. You have the power to prevent it, but it would require using harsh and undemocratic methods.
-
-    if answer[5]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 2
-        user_scores[2] += 0.5
-        user_scores[3] += 0.5
-        user_scores[4] += -1
-        user_scores[5] += 0.5
-        user_scores[6] += -1
-        user_scores[7] += 0
-        
-    elif answer[5]=='b)':
-        user_scores[0] += -0.5
-        user_scores[1] += 1
-        user_scores[2] += -1
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 1
-        user_scores[7] += -0.5
-    
-    elif answer[5]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += -1
-        user_scores[7] += 1
-    
-    elif answer[5]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 1
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += -0.5   
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += -1
-        user_scores[7] += 0
-
-    #Question 7. You live with a spouse and two small children on a house you worked hard to afford. You notice someone breaking through your door at night...
-
-    if answer[6]=='a)':
-        user_scores[0] += -1
-        user_scores[1] += 0.5
-        user_scores[2] += -1
-        user_scores[3] += 0.5
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += -1
-        
-    elif answer[6]=='b)':
-        user_scores[0] += 1
-        user_scores[1] += 0
-        user_scores[2] += 0.5
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0.5
-    
-    elif answer[6]=='c)':
-        user_scores[0] += 1
-        user_scores[1] += -1
-        user_scores[2] += 1
-        user_scores[3] += -2
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += -0.5
-        user_scores[7] += 0
-    
-    elif answer[6]=='d)':
-        user_scores[0] += 1
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #e)
-        user_scores[0] += -1
-        user_scores[1] += 0.5
-        user_scores[2] += -1
-        user_scores[3] += 0   
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 0.5
-        user_scores[7] += 0
-
-    #Question 8. You find out that a beloved public figure has committed a serious crime...
-    
-    if answer[7]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 1
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[7]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 1
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += -0.5
-        user_scores[7] += -0.5
-    
-    elif answer[7]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += -1
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[7]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 1
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += -1
-        user_scores[3] += 1   
-        user_scores[4] += -1
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += -1
-
-    #Question 9. You have the opportunity to gain immense knowledge and wisdom, but it will isolate you from human contact for a decade or more.
-    
-    if answer[8]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 1
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 1
-        user_scores[6] += -1
-        user_scores[7] += 0
-        
-    elif answer[8]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += -0.5
-        user_scores[3] += 0
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[8]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 1
-        user_scores[6] += 1
-        user_scores[7] += 0
-    
-    else: # d)
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += -0.5
-        user_scores[3] += 0.5
-        user_scores[4] += -1
-        user_scores[5] += -1
-        user_scores[6] += 1
-        user_scores[7] += 0
-
-    #Question 10. Think about your religion for a moment...
-    
-    if answer[9]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += -0.5
-        user_scores[3] += 0
-        user_scores[4] += 1
-        user_scores[5] += 0
-        user_scores[6] += 0.5
-        user_scores[7] += 1
-        
-    elif answer[9]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += -1
-        user_scores[3] += 1
-        user_scores[4] += 1
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0.5
-    
-    elif answer[9]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0.5
-    
-    elif answer[9]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -0.5
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += -0.5
-        user_scores[7] += -1
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -0.5   
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += -1
-
-    #Question 11. How much is a life worth?
-    
-    if answer[10]=='a)':
-        user_scores[0] += 1
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[10]=='b)':
-        user_scores[0] += 1
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[10]=='c)':
-        user_scores[0] += -1
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += -0.5
-    
-    elif answer[10]=='d)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #e)
-        user_scores[0] += -1
-        user_scores[1] += -0.5
-        user_scores[2] += 0
-        user_scores[3] += 0   
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += -0.5
-
-    #Question 12. What is your life worth?
-
-    if answer[11]=='a)':
-        user_scores[0] += -0.5
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 1
-        user_scores[4] += -0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += -0.5
-        
-    elif answer[11]=='b)':
-        user_scores[0] += 1
-        user_scores[1] += -1
-        user_scores[2] += -1
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += -0.5
-        user_scores[6] += 1
-        user_scores[7] += -1
-    
-    elif answer[11]=='c)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0.5
-        user_scores[2] += -0.5
-        user_scores[3] += -0.5
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0.5
-        user_scores[7] += -1
-    
-    elif answer[11]=='d)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += -0.5
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += -0.5
-        user_scores[3] += -0.5   
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0.5
-        user_scores[7] += -0.5
-
-    #Question 13. Knowing that the average statistical value of a life worldwide is about 1 million dollars, how much is your life worth?
-    
-    if answer[12]=='a)':
-        user_scores[0] += -1
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 1
-        user_scores[4] += -0.5
-        user_scores[5] += 0
-        user_scores[6] += -0.5
-        user_scores[7] += -0.5
-        
-    elif answer[12]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[12]=='c)':
-        user_scores[0] += 1
-        user_scores[1] += -0.5
-        user_scores[2] += -1
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 1
-        user_scores[7] += 0
-    
-    elif answer[12]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += -0.5
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += -0.5
-        user_scores[7] += -0.5
-
-    else: #e)
-        user_scores[0] += 1
-        user_scores[1] += -1
-        user_scores[2] += -1
-        user_scores[3] += -1   
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    #Question 14. For you, what is more important: individual freedom or the greater good of the collective?
-    
-    if answer[13]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += -1
-        user_scores[7] += 0
-        
-    elif answer[13]=='b)':
-        user_scores[0] += -0.5
-        user_scores[1] += -0.5
-        user_scores[2] += 0
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 1.5
-        user_scores[7] += 0
-    
-    elif answer[13]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += -0.5
-        user_scores[6] += 1
-        user_scores[7] += 0
-    
-    elif answer[13]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 1
-        user_scores[3] += -1
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #e)
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0.5   
-        user_scores[4] += -1.5
-        user_scores[5] += 1
-        user_scores[6] += -1.5
-        user_scores[7] += 0
-
-    #Question 15. How important is filial piety to you? How much thicker is blood compared to water?
-    
-    if answer[14]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 1
-        user_scores[3] += -0.5
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[14]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[14]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[14]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    elif answer[14]=='e)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0.5
-        user_scores[4] += -0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[14]=='f)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #g)
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += -1
-        user_scores[3] += 1   
-        user_scores[4] += -1
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    #Question 16. What is love to you?
-    
-    if answer[15]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += -1.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[15]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += -0.5
-        user_scores[5] += 1
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[15]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 1
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[15]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += -0.5
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    elif answer[15]=='e)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 0
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[15]=='f)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #g)
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0   
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    #Question 17. What is ignorance to you?
-    
-    if answer[16]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[16]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += -0.5
-        user_scores[3] += 1
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[16]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[16]=='d)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += -0.5
-        user_scores[3] += 0
-        user_scores[4] += -0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    elif answer[16]=='e)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += -1
-        user_scores[3] += 1
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[16]=='f)':
-        user_scores[0] += 0
-        user_scores[1] += -1
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    else: #g)
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0   
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    #Question 18. Jarvis accidentally killed his friend Kloe when he hid her medicine as a prank. At what age, if any, would you consider him to be innocent?
-    
-    if answer[17]=='a)':
-        user_scores[0] += 1
-        user_scores[1] += -1
-        user_scores[2] += -0.5
-        user_scores[3] += 1
-        user_scores[4] += 1
-        user_scores[5] += -0.5
-        user_scores[6] += 0
-        user_scores[7] += 1.5
-        
-    elif answer[17]=='b)':
-        user_scores[0] += 0.5
-        user_scores[1] += -1
-        user_scores[2] += -1
-        user_scores[3] += -1
-        user_scores[4] += 0
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 1
-    
-    elif answer[17]=='c)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0
-        user_scores[2] += -0.5
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 1
-    
-    elif answer[17]=='d)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0.5
-        user_scores[2] += 0
-        user_scores[3] += 0.5
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0.5
-
-    elif answer[17]=='e)':
-        user_scores[0] += 0.5
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[17]=='f)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 1
-        user_scores[3] += -0.5
-        user_scores[4] += 0.5
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += -0.5
-
-    else: #g)
-        user_scores[0] += -0.5
-        user_scores[1] += -1
-        user_scores[2] += 1.5
-        user_scores[3] += -1   
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0.5
-        user_scores[7] += -1
-
-    #Question 19. How much do you trust others?
-    
-    if answer[18]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += -0.5
-        user_scores[3] += 1
-        user_scores[4] += -0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-        
-    elif answer[18]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0.5
-        user_scores[2] += 0.5
-        user_scores[3] += -1
-        user_scores[4] += 0.5
-        user_scores[5] += 0.5
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[18]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += -0.5
-        user_scores[2] += 1
-        user_scores[3] += 0.5
-        user_scores[4] += 1
-        user_scores[5] += -1
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[18]=='d)':
-        user_scores[0] += 0.5
-        user_scores[1] += 1
-        user_scores[2] += 0
-        user_scores[3] += -0.5
-        user_scores[4] += -1
-        user_scores[5] += 1
-        user_scores[6] += 0
-        user_scores[7] += 0
-
-    #Question 20. To what extent should culture influence morality? If you aren't sure, ask yourself whether you think killing is wrong regardless of someone's morals and culture (if yes, you are an universalist).
-    
-    if answer[19]=='a)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 2
-        
-    elif answer[19]=='b)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += 0
-    
-    elif answer[19]=='c)':
-        user_scores[0] += 0
-        user_scores[1] += 0
-        user_scores[2] += 0
-        user_scores[3] += 0
-        user_scores[4] += 0
-        user_scores[5] += 0
-        user_scores[6] += 0
-        user_scores[7] += -2
-    
+    return content
 
-    return user_scores
+#11 Function to run the whole analysis for a set of answers, cached by content
+RESULT_CACHE_PATH = os.path.join(STATE_DIR, "result_cache.sqlite3")
 
-def stardardize_scores(userScores):
-    userScores = [min(score, 5) for score in userScores]
-   
-    # Normalize the scores to range from 1 to 5
-    normalized_scores = [(score - min(userScores)) / (max(userScores) - min(userScores)) * 4.5 + 0.5 for score in userScores]
-    
-    return normalized_scores
\ No newline at end of file
+@process_singleton
+def get_result_cache():
+    return ResultCache(RESULT_CACHE_PATH)
+
+PIPELINE_MODES = ("three_stage", "structured")
+
+def analysis_cache_key(questions, answers, categories, mode="three_stage"):
+    """
+    Content address of an analysis: everything that can change what the LLM returns.
+    The formatted questions stand in for the catalog version, they change whenever the catalog does.
+    """
+    prompts = (ANALYSIS_PROMPT, QA_PROMPT, RADAR_PROMPT) if mode == "three_stage" else (ANALYSIS_PROMPT, STRUCTURED_PROMPT)
+    return cache_key("analysis", mode, LLM_MODEL, *prompts, questions, list(answers), list(categories))
+
+def three_stage_analysis(questions, answers, categories):
+    """
+    The original pipeline: analyze_answers, then QA on its output, then radar_data on the QA output.
+    """
+    analysis = analyze_answers(questions, answers)
+    content = QA(analysis, questions, answers)  # with the QA
+    return {"analysis": analysis, "qa": content, "radar": radar_data(content, categories)}
+
+def run_analysis(questions, answers, categories, mode="three_stage", budget=None, hedge=False):
+    """
+    Run the analysis pipeline, or return its stored outputs if these exact inputs were analysed
+    before (by this process, a previous run or another replica on the disk).
+    Identical requests arriving together share one set of LLM calls.
+
+    Parameters:
+    - mode (str): "three_stage" (analyze, QA, radar: three calls) or "structured" (one JSON call).
+    - budget (float or None): Seconds the whole pipeline may take, see scheduled_analysis. None waits as long as it takes.
+    - hedge (bool): Send a duplicate request when a call runs past the p95 of its stage.
+
+    Returns:
+    - result (dict): {"analysis": ..., "qa": ..., "radar": ...}, plus "stages" when scheduled.
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode: {mode!r}")
+    pipeline = three_stage_analysis if mode == "three_stage" else structured_analysis
+    computed = []
+
+    def compute():
+        computed.append(True)
+        if budget is None and not hedge:
+            return pipeline(questions, answers, categories)
+        return scheduled_analysis(questions, answers, categories, mode, budget, hedge)
+
+    # a result that skipped or lost a stage is shown once but not stored
+    result = get_result_cache().get_or_compute(analysis_cache_key(questions, answers, categories, mode), compute, cacheable=pipeline_completed)
+    get_recorder().record_lookup(mode, hit=not computed)
+    if computed and pipeline_completed(result):
+        get_answer_index().add(answers)
+    return result
+
+def get_cached_analysis(questions, answers, categories, mode="three_stage"):
+    """
+    Return the stored result for these inputs without calling the LLM, or None.
+    """
+    result = get_result_cache().get(analysis_cache_key(questions, answers, categories, mode))
+    if result is not None:  # a miss is recorded by whatever computes the result next
+        get_recorder().record_lookup(mode, hit=True)
+    return result
+
+def stream_analyze_answers(questions, answers, budget=None, idle_timeout=None):
+    """
+    Same request as analyze_answers, but streamed: yields the text chunks as the model writes them,
+    ready for st.write_stream (which also returns the full text once the stream ends).
+
+    Parameters:
+    - budget (float or None): Seconds for the whole pipeline; the stream gets the analysis stage's share of it, see stage_timeout.
+    - idle_timeout (float or None): Seconds to wait for each chunk.
+    Either running out cancels the call and raises DeadlineExceeded.
+    """
+    stream = llm_stream(
+        "analysis",
+        timeout=stage_timeout(budget, "analysis", ("qa", "radar")),
+        idle_timeout=idle_timeout,
+        model=LLM_MODEL,
+        messages=[
+            {"role": "system", "content": ANALYSIS_PROMPT.format(questions=questions)},
+            {"role": "user", "content": f"{answers}"}],
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def finish_analysis(questions, answers, categories, analysis, budget=None, hedge=False):
+    """
+    Second half of the pipeline for an analysis that was streamed: runs QA and radar_data on it
+    and stores the whole result, so the next request for these answers is served from the cache.
+    budget and hedge work as in run_analysis, for what is left of the pipeline.
+
+    Returns:
+    - result (dict): {"analysis": ..., "qa": ..., "radar": ...}
+    """
+    computed = []
+
+    def compute():
+        computed.append(True)
+        if budget is not None or hedge:
+            return scheduled_analysis(questions, answers, categories, "three_stage", budget, hedge, analysis=analysis)
+        content = QA(analysis, questions, answers)  # with the QA
+        return {"analysis": analysis, "qa": content, "radar": radar_data(content, categories)}
+
+    result = get_result_cache().get_or_compute(analysis_cache_key(questions, answers, categories), compute, cacheable=pipeline_completed)
+    get_recorder().record_lookup("three_stage", hit=not computed)
+    if computed and pipeline_completed(result):
+        get_answer_index().add(answers)
+    return result
+
+#12 Function to get the analysis and the category grades from a single structured call
+STRUCTURED_PROMPT = """
+
+Also grade the student from 1 to 5 in each of these categories, based on your analysis: {categories}.
+Reply with a JSON object with two keys: "analysis", the analysis above as markdown text, and "grades", an object with one integer from 1 to 5 per category."""
+
+STRUCTURED_RETRIES = 1  # extra attempts when the reply doesn't validate
+
+def structured_response_format(categories):
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "moral_analysis",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "analysis": {"type": "string"},
+                    "grades": {
+                        "type": "object",
+                        "properties": {category: {"type": "integer", "enum": [1, 2, 3, 4, 5]} for category in categories},
+                        "required": list(categories),
+                        "additionalProperties": False,
+                    },
+                },
+                "required": ["analysis", "grades"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+def parse_structured_analysis(content, categories):
+    """
+    Validate a structured reply locally. Raises ValueError describing the first problem found.
+
+    Returns:
+    - analysis (str), grades (list): The analysis text and one grade per category, in order.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError) as error:
+        raise ValueError(f"reply is not valid JSON: {error}")
+    if not isinstance(data, dict) or not isinstance(data.get("analysis"), str) or not data["analysis"].strip():
+        raise ValueError("'analysis' must be a non-empty string")
+    grades = data.get("grades")
+    if not isinstance(grades, dict):
+        raise ValueError("'grades' must be an object")
+    missing = [category for category in categories if category not in grades]
+    if missing:
+        raise ValueError(f"'grades' is missing {missing}")
+    values = [grades[category] for category in categories]
+    if not all(isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 5 for value in values):
+        raise ValueError(f"grades must be integers from 1 to 5, got {values}")
+    return data["analysis"], values
+
+def structured_analysis(questions, answers, categories, timeout=None, hedge_after=None):
+    """
+    One call that returns the analysis and the grades together as schema-validated JSON,
+    instead of the three sequential calls of three_stage_analysis. There is no QA pass,
+    so "qa" is the analysis itself; "radar" has the same '[4,3,5,...]' format as radar_data.
+    timeout covers the retry as well.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    messages = [
+        {"role": "system", "content": ANALYSIS_PROMPT.format(questions=questions) + STRUCTURED_PROMPT.format(categories=categories)},
+        {"role": "user", "content": f"{answers}"}]
+    for attempt in range(STRUCTURED_RETRIES + 1):
+        remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+        response = llm_complete(
+            "structured", remaining, hedge_after,
+            model=LLM_MODEL,
+            messages=messages,
+            response_format=structured_response_format(categories),
+            stream=False,
+        )
+        content = response.choices[0].message.content
+        try:
+            analysis, grades = parse_structured_analysis(content, categories)
+            return {"analysis": analysis, "qa": analysis, "radar": "[" + ",".join(str(grade) for grade in grades) + "]"}
+        except ValueError as error:
+            if attempt == STRUCTURED_RETRIES:
+                raise ValueError(f"Structured analysis failed validation: {error}")
+            print("Structured analysis failed validation, retrying:", error)
+            # show the model what was wrong with its reply
+            messages = messages + [
+                {"role": "assistant", "content": content or ""},
+                {"role": "user", "content": f"That reply was invalid ({error}). Reply again with only the JSON object."}]
+
+#13 Standardization against everyone who took the test in this process (the rest is in core.py)
+def get_population_histogram():
+    """
+    Process-wide population histogram, kept up to date by PopulationStats.
+    """
+    return get_population_stats().histogram
+
+def stardardize_scores(userScores, mode="self"):
+    """
+    core.stardardize_scores, with mode="population" ranking against the process-wide histogram.
+    """
+    return core.stardardize_scores(userScores, mode, get_population_histogram() if mode == "population" else None)
+
+#14 Function to run the analysis on a worker thread, so the page can stop waiting for it at a deadline
+ANALYSIS_WORKERS = 16
+
+@process_singleton
+def get_analysis_executor():
+    return ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+def start_analysis(questions, answers, categories, mode="three_stage", budget=None, hedge=False):
+    """
+    Start run_analysis in the background. The call keeps the Streamlit session's place in the
+    LLM gateway queue and finishes (and is cached) even if the page stops waiting for it.
+
+    Returns:
+    - future (concurrent.futures.Future): Resolves to the result of run_analysis.
+    """
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # already loaded by the app
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def task():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        try:
+            return run_analysis(questions, answers, categories, mode, budget, hedge)
+        finally:
+            add_script_run_ctx(threading.current_thread(), None)
+
+    return get_analysis_executor().submit(task)
+
+#15 Deadline-aware scheduling of the analysis stages, so one slow call can't hold the page for a minute
+ANALYSIS_BUDGET = 30  # seconds for the whole pipeline when the caller doesn't give one
+# share of the remaining budget a stage may use, against the stages still to run after it
+STAGE_SHARES = {"analysis": 0.6, "qa": 0.25, "radar": 0.15, "structured": 1.0}
+# seconds a stage usually takes, until the metrics have enough calls to say
+STAGE_TYPICAL_SECONDS = {"analysis": 12.0, "qa": 8.0, "radar": 1.5, "structured": 12.0}
+HEDGE_MIN_CALLS = 20  # calls of a stage needed before its p95 is trusted for hedging
+
+def typical_seconds(stage):
+    """
+    Median wall time of the stage over the metrics window, or its default.
+    """
+    median = get_recorder().wall_percentile(stage, 50, HEDGE_MIN_CALLS)
+    return median if median is not None else STAGE_TYPICAL_SECONDS[stage]
+
+def hedge_delay(stage, hedge):
+    """
+    Seconds after which a call of this stage is hedged: its p95, once enough calls were seen.
+    """
+    return get_recorder().wall_percentile(stage, 95, HEDGE_MIN_CALLS) if hedge else None
+
+def stage_timeout(remaining, stage, later=()):
+    """
+    Seconds a stage may take out of the remaining budget: its share against the stages still to run after it.
+    """
+    if remaining is None:
+        return None
+    return max(remaining, 0.0) * STAGE_SHARES[stage] / (STAGE_SHARES[stage] + sum(STAGE_SHARES[name] for name in later))
+
+def pipeline_completed(result):
+    """
+    Whether every stage of a result ran, i.e. it is as good as an unscheduled one and may be cached.
+    """
+    return all(outcome in ("ran", "given") for outcome in result.get("stages", {}).values())
+
+def scheduled_analysis(questions, answers, categories, mode="three_stage", budget=ANALYSIS_BUDGET, hedge=False, analysis=None):
+    """
+    Run the pipeline within an overall latency budget. Each stage gets a deadline, its share of
+    what is left (see STAGE_SHARES), and is cancelled when it runs past it. QA is skipped when the
+    time left is less than QA and radar usually take, and the unreviewed analysis is used instead.
+    A radar that fails or times out leaves "radar" as None. The analysis itself has to succeed,
+    otherwise DeadlineExceeded (or the call's error) is raised, so the caller can fall back.
+
+    Parameters:
+    - mode (str): "three_stage" or "structured".
+    - budget (float or None): Seconds for the whole pipeline, None for no deadline.
+    - hedge (bool): Send a duplicate request when a call runs past the p95 of its stage.
+    - analysis (str or None): An analysis already written (e.g. streamed), only QA and radar run.
+
+    Returns:
+    - result (dict): {"analysis", "qa", "radar", "stages"}, where "stages" maps every stage to
+      "ran", "given", "skipped", "timed_out" or "failed".
+    """
+    started = time.monotonic()
+    stages = {}
+
+    def timeout(stage, later=()):
+        return stage_timeout(None if budget is None else budget - (time.monotonic() - started), stage, later)
+
+    try:
+        if mode == "structured":
+            result = structured_analysis(questions, answers, categories, timeout("structured"), hedge_delay("structured", hedge))
+            stages["structured"] = "ran"
+            return dict(result, stages=stages)
+
+        if analysis is None:
+            analysis = analyze_answers(questions, answers, timeout("analysis", ("qa", "radar")), hedge_delay("analysis", hedge))
+            stages["analysis"] = "ran"
+        else:
+            stages["analysis"] = "given"
+
+        content = analysis
+        remaining = None if budget is None else budget - (time.monotonic() - started)
+        if remaining is not None and remaining < typical_seconds("qa") + typical_seconds("radar"):
+            stages["qa"] = "skipped"
+        else:
+            try:
+                content = QA(analysis, questions, answers, timeout("qa", ("radar",)), hedge_delay("qa", hedge))
+                stages["qa"] = "ran"
+            except DeadlineExceeded:
+                stages["qa"] = "timed_out"
+            except Exception as error:
+                print("QA stage failed, using the unreviewed analysis:", error)
+                stages["qa"] = "failed"
+
+        try:
+            radar = radar_data(content, categories, timeout("radar"), hedge_delay("radar", hedge))
+            stages["radar"] = "ran"
+        except DeadlineExceeded:
+            radar, stages["radar"] = None, "timed_out"
+        except Exception as error:
+            print("Radar stage failed:", error)
+            radar, stages["radar"] = None, "failed"
+        return {"analysis": analysis, "qa": content, "radar": radar, "stages": stages}
+    except DeadlineExceeded:
+        stages.setdefault("structured" if mode == "structured" else "analysis", "timed_out")
+        raise
+    except Exception:
+        stages.setdefault("structured" if mode == "structured" else "analysis", "failed")
+        raise
+    finally:
+        print(f"Analysis stages after {time.monotonic() - started:.1f}s:", stages)
+        get_recorder().record_stage_outcomes(stages)
+
+#16 Reuse of the analysis of a nearby answer set, see answer_index.py
+# run_analysis and finish_analysis add every answer set they analyse completely; the table is only
+# read for the sets analysed before this process started, or by another process sharing the result cache
+ANSWER_INDEX_REFRESH = 60  # seconds between reads of the new rows of 'answers'
+ANSWER_INDEX_PENDING_TTL = 600  # seconds a row read before its analysis was stored is checked again
+ANSWER_INDEX_PENDING_MAX = 1000  # rows waiting for their analysis, the oldest are dropped past this
+
+@process_singleton
+def get_answer_index():
+    weights = load_score_weights()
+    return HammingIndex(weights.tensor.shape[0], weights.tensor.shape[1], lambda answer: encode_answers(answer, weights))
+
+# "pending": answer sets read from the table whose analysis wasn't stored yet (often still running) -> when first seen,
+# oldest first. Old rows that were never analysed would stay there for good, so only the newest ANSWER_INDEX_PENDING_MAX are kept
+_index_refresh = {"at": 0.0, "lock": threading.Lock(), "pending": OrderedDict()}
+
+def refresh_answer_index(questions, categories, mode="three_stage", force=False):
+    """
+    Add the answer sets submitted since the last refresh that have a stored analysis. Only the rows
+    after the last id seen are read, at most every ANSWER_INDEX_REFRESH seconds, and never by two
+    threads at once (the second one just uses the index as it is). A set whose analysis isn't
+    stored yet is looked up in the result cache again on the next refreshes, for ANSWER_INDEX_PENDING_TTL
+    (only the newest ANSWER_INDEX_PENDING_MAX of them). The new rows and the pending sets are
+    looked up together, in a few queries over one connection.
+    """
+    index = get_answer_index()
+    if not force and time.monotonic() - _index_refresh["at"] < ANSWER_INDEX_REFRESH:
+        return index
+    if not _index_refresh["lock"].acquire(blocking=False):
+        return index
+    try:
+        pending, now = _index_refresh["pending"], time.monotonic()
+        for answer in [answer for answer in pending if answer in index.rows]:
+            del pending[answer]  # analysed by this process in the meantime
+        keys = {answer: analysis_cache_key(questions, answer, categories, mode) for answer in pending}
+        for row in iter_rows("answers", "id, user_answer", after_id=index.last_id):
+            index.last_id = row["id"]
+            try:
+                answer = tuple(load_answers(row["user_answer"]))
+            except ValueError:
+                continue
+            if len(answer) == index.question_total and answer not in index.rows and answer not in keys:
+                keys[answer] = analysis_cache_key(questions, answer, categories, mode)
+        stored = get_result_cache().contains_many(keys.values())
+
+        added = 0
+        for answer, key in keys.items():
+            if key in stored:
+                added += index.add(answer)
+                pending.pop(answer, None)
+            elif answer not in pending:
+                pending[answer] = now
+            elif now - pending[answer] >= ANSWER_INDEX_PENDING_TTL:
+                del pending[answer]
+        while len(pending) > ANSWER_INDEX_PENDING_MAX:
+            pending.popitem(last=False)
+        if added:
+            print(f"Answer index: {added} answer sets added, {len(index)} in total")
+        _index_refresh["at"] = time.monotonic()
+    except Exception as error:
+        print("Could not refresh the answer index:", error)
+    finally:
+        _index_refresh["lock"].release()
+    return index
+
+def refresh_answer_index_in_background(questions, categories, mode="three_stage"):
+    """
+    Start refresh_answer_index on a thread when it is due, so no request waits for the table
+    (the first refresh of a process reads all of it).
+    """
+    if time.monotonic() - _index_refresh["at"] >= ANSWER_INDEX_REFRESH and not _index_refresh["lock"].locked():
+        threading.Thread(target=refresh_answer_index, args=(questions, categories, mode), name="answer-index", daemon=True).start()
+    return get_answer_index()
+
+def neighbor_cache_key(questions, answers, categories, mode="three_stage"):
+    # a patched neighbor analysis is stored apart from the full one, which replaces it once it exists
+    return cache_key("neighbor", analysis_cache_key(questions, answers, categories, mode))
+
+def neighbor_analysis(questions, answers, categories, mode="three_stage", reuse_distance=1, patch_distance=2, timeout=None):
+    """
+    Find an analysed answer set at most patch_distance questions away from answers and reuse its
+    result: as it is up to reuse_distance, otherwise "patched" by one QA call that checks the
+    neighbor's analysis against these answers (cancelled after timeout), instead of the whole pipeline.
+    A patched result is stored under neighbor_cache_key, so reruns and later visits show the same
+    text without another call, while a full analysis of these answers still takes precedence.
+    The index is refreshed in the background, this call only uses what it already holds.
+
+    Returns:
+    - result (dict or None): {"analysis", "qa", "radar", "stages", "neighbor_distance"}, or None if no neighbor is close enough.
+    """
+    farthest = max(reuse_distance, patch_distance)
+    if farthest <= 0 or len(answers) != get_answer_index().question_total:
+        return None
+    patched = get_result_cache().get(neighbor_cache_key(questions, answers, categories, mode))
+    if patched is not None and patched["neighbor_distance"] <= farthest:
+        get_recorder().record_lookup("neighbor", hit=True)
+        return patched
+    index = refresh_answer_index_in_background(questions, categories, mode)
+    for neighbor, distance in index.nearest(answers, farthest):
+        result = get_result_cache().get(analysis_cache_key(questions, neighbor, categories, mode))
+        if result is None:  # analysed for another catalog or mode, or evicted
+            continue
+        get_recorder().record_lookup("neighbor", hit=True)
+        if distance <= reuse_distance:
+            stages = {"analysis": "reused", "qa": "reused", "radar": "reused"}
+            get_recorder().record_stage_outcomes(stages)
+            return {"analysis": result["analysis"], "qa": result["qa"], "radar": result["radar"], "stages": stages, "neighbor_distance": distance}
+        stages = {"analysis": "reused", "qa": "ran", "radar": "reused"}
+        try:
+            content = QA(result["qa"], questions, answers, timeout)  # corrects what the differing answers change
+        except Exception as error:
+            print("Could not patch the neighbor's analysis, reusing it as it is:", error)
+            content, stages["qa"] = result["qa"], "failed"
+        get_recorder().record_stage_outcomes(stages)
+        patched = {"analysis": result["analysis"], "qa": content, "radar": result["radar"], "stages": stages, "neighbor_distance": distance}
+        if stages["qa"] == "ran":
+            get_result_cache().put(neighbor_cache_key(questions, answers, categories, mode), patched)
+        return patched
+    get_recorder().record_lookup("neighbor", hit=False)
+    return None
+
+#17 Population counters: how many picked each option, plus the score histogram, kept in memory
+POPULATION_STATS_PATH = os.path.join(STATE_DIR, "population_stats.json")
+POPULATION_LOG_PATH = os.path.join(STATE_DIR, "population_deltas.log")
+STATS_FLUSH_SIZE = 100  # submissions logged before the counters are written out and the log is emptied
+STATS_FLUSH_INTERVAL = 30  # seconds, the same for a slow trickle of submissions
+
+class PopulationStats:
+    """
+    Per-question option counts and the per-category ScoreHistogram, updated in memory on every
+    submission. Each submission is first appended to a small delta log (one line with a sequence
+    number); every STATS_FLUSH_SIZE submissions or STATS_FLUSH_INTERVAL seconds the counters are
+    written to one snapshot file, which records the last sequence number it contains, and the log
+    is emptied. Loading reads the snapshot and replays the newer log lines, so a crash loses nothing
+    and never counts a submission twice.
+
+    The counters are local to the machine; rebuild() recounts them from the 'answers' table.
+    """
+
+    def __init__(self, weights, path=POPULATION_STATS_PATH, log_path=POPULATION_LOG_PATH):
+        self.weights = weights
+        self.path = path
+        self.log_path = log_path
+        self.option_counts = np.zeros(weights.tensor.shape[:2], dtype=np.int64)  # (questions, options + 1)
+        self.histogram = ScoreHistogram(weights)
+        self.seq = 0  # sequence number of the last submission counted
+        self.flushed_seq = 0
+        self.flushed_at = time.monotonic()
+        self._lock = threading.RLock()
+
+    @property
+    def total(self):
+        return int(self.option_counts[0].sum())
+
+    def _apply(self, encoded):
+        # encoded: N x questions matrix of option indices
+        questions = np.arange(encoded.shape[1])
+        np.add.at(self.option_counts, (np.broadcast_to(questions, encoded.shape), encoded), 1)
+        raw_scores = self.weights.tensor[questions, encoded].sum(axis=1)
+        self.histogram.add(raw_scores, save=False)
+
+    def record(self, answers):
+        """
+        Count one submission: logged to disk, applied in memory, flushed in batches.
+        """
+        encoded = encode_answers(answers, self.weights)
+        with self._lock:
+            self.seq += 1
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as log:
+                log.write(json.dumps([self.seq, encoded.tolist()]) + "\n")
+            self._apply(encoded[None, :])
+            if self.seq - self.flushed_seq >= STATS_FLUSH_SIZE or time.monotonic() - self.flushed_at >= STATS_FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the counters to the snapshot file and empty the delta log.
+        """
+        with self._lock:
+            data = {
+                "weights_version": self.weights.version,
+                "seq": self.seq,
+                "option_counts": self.option_counts.tolist(),
+                "score_lowest": self.histogram.lowest.tolist(),
+                "score_bin_width": SCORE_BIN_WIDTH,
+                "score_counts": self.histogram.counts.tolist(),
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary_path, self.path)
+            # the snapshot holds everything up to seq, so the log can go; replay skips older lines anyway
+            open(self.log_path, "w").close()
+            self.flushed_seq = self.seq
+            self.flushed_at = time.monotonic()
+
+    def load(self):
+        """
+        Read the snapshot (or the histogram file of older versions) and replay the delta log.
+        """
+        with self._lock:
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    data = json.load(file)
+            except FileNotFoundError:
+                data = None
+                self.histogram.load()  # counts saved before the option counters existed
+            if data is not None:
+                option_counts = np.asarray(data["option_counts"], dtype=np.int64)
+                score_counts = np.asarray(data["score_counts"], dtype=np.int64)
+                if (data.get("weights_version") != self.weights.version or option_counts.shape != self.option_counts.shape
+                        or data.get("score_lowest") != self.histogram.lowest.tolist() or data.get("score_bin_width") != SCORE_BIN_WIDTH
+                        or score_counts.shape != self.histogram.counts.shape):
+                    print("Ignoring population counters built for different score weights:", self.path)
+                else:
+                    self.option_counts = option_counts
+                    self.histogram.counts = score_counts
+                    self.histogram._refresh_percentiles()
+                    self.seq = self.flushed_seq = data["seq"]
+
+            replayed = []
+            try:
+                with open(self.log_path, encoding="utf-8") as log:
+                    for line in log:
+                        try:
+                            seq, encoded = json.loads(line)
+                        except ValueError:
+                            continue  # a line cut short by a crash
+                        if seq > self.seq:
+                            replayed.append(encoded)
+                            self.seq = seq
+            except FileNotFoundError:
+                pass
+            if replayed:
+                self._apply(np.asarray(replayed, dtype=np.intp))
+        return self
+
+    def rebuild(self, page_size=1000):
+        """
+        Recount everything from the 'answers' table (e.g. to merge what other machines counted).
+        """
+        fresh = PopulationStats(self.weights, self.path, self.log_path)
+        batch = []
+        for row in iter_rows("answers", "id, user_answer", page_size):
+            try:
+                answers = load_answers(row["user_answer"])
+            except ValueError:
+                continue
+            if len(answers) == self.option_counts.shape[0]:
+                batch.append(encode_answers(answers, self.weights))
+            if len(batch) >= page_size:
+                fresh._apply(np.asarray(batch))
+                batch = []
+        if batch:
+            fresh._apply(np.asarray(batch))
+        with self._lock:
+            self.option_counts = fresh.option_counts
+            self.histogram.counts = fresh.histogram.counts
+            self.histogram._refresh_percentiles()
+            self.flush()
+        return self
+
+    def option_shares(self):
+        """
+        Share of submissions that picked each option: a (questions, options) array, the unknown slot left out.
+        Columns follow weights.options, e.g. 'a)' to 'e)'.
+        """
+        with self._lock:
+            counts = self.option_counts[:, :-1].astype(float)
+        totals = np.maximum(self.option_counts.sum(axis=1, keepdims=True), 1)
+        return counts / totals
+
+    def answer_shares(self, answers):
+        """
+        For each of a user's answers, the share of everyone who picked the same option (0-1).
+        """
+        encoded = encode_answers(answers, self.weights)
+        with self._lock:
+            counts = self.option_counts[np.arange(len(encoded)), encoded]
+            totals = np.maximum(self.option_counts.sum(axis=1), 1)
+        return (counts / totals).tolist()
+
+@process_singleton
+def get_population_stats():
+    """
+    Process-wide population counters, loaded from disk on first use.
+    """
+    return PopulationStats(load_score_weights()).load()
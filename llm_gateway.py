@@ -0,0 +1,330 @@
+import asyncio
+import concurrent.futures
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from llm_metrics import get_recorder
+# openai and streamlit are imported where they are first needed, so importing this module is cheap
+
+
+#1 Settings for the shared LLM gateway
+MAX_CONCURRENCY = 8  # LLM calls in flight at once, over every session of the process
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30000
+MAX_RETRIES = 4  # extra attempts after a 429, a 5xx or a connection error
+RETRY_BASE_DELAY = 1.0  # seconds, doubled on every attempt and jittered, unless the server sends Retry-After
+MAX_RETRY_DELAY = 60
+DEFAULT_OUTPUT_TOKENS = 1000  # output tokens reserved for a call without max_tokens
+
+class DeadlineExceeded(TimeoutError):
+    """
+    A call didn't finish before its deadline and was cancelled.
+    """
+
+def estimate_tokens(request):
+    """
+    Rough token count reserved before a call: about 4 characters per prompt token plus the output budget.
+    It is corrected with the real usage once the reply arrives.
+    """
+    prompt = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+    return prompt // 4 + (request.get("max_tokens") or DEFAULT_OUTPUT_TOKENS)
+
+def retry_delay(error, attempt):
+    """
+    Seconds to wait before retrying: the server's Retry-After (or retry-after-ms) when it sent one,
+    jittered exponential backoff otherwise.
+    """
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return min(float(headers["retry-after-ms"]) / 1000, MAX_RETRY_DELAY)
+        if headers.get("retry-after"):
+            return min(float(headers["retry-after"]), MAX_RETRY_DELAY)
+    except ValueError:
+        pass
+    return random.uniform(0, min(RETRY_BASE_DELAY * 2 ** attempt, MAX_RETRY_DELAY))
+
+def is_retryable(error):
+    import openai  # already loaded by then: the error came from the client
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+#2 Token bucket used for both the request and the token limits
+class TokenBucket:
+    """
+    Holds up to `per_minute` units and refills continuously. The level may go negative when a call
+    used more tokens than reserved, which simply delays the following calls.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Seconds until `amount` units are available (0 if they are now). Large requests only wait for a full bucket.
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+#3 Gateway with a fair queue across sessions
+class LLMGateway:
+    """
+    Every LLM call of the process goes through here. An asyncio loop in a background thread
+    owns one AsyncOpenAI client. Calls wait in per-session queues that are served round-robin,
+    so a session firing many calls can't starve the others. A call only starts when a
+    concurrency slot is free and both token buckets (requests and tokens per minute) allow it.
+    429s, 5xx and connection errors are retried with backoff, honoring Retry-After.
+
+    Streamlit threads use the blocking complete() and stream() methods.
+    """
+
+    def __init__(self, client_factory, max_concurrency=MAX_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES):
+        self.client_factory = client_factory
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self._waiting = OrderedDict()  # session id -> deque of (future, estimated tokens)
+        self._wakeup = None  # pending loop.call_later handle while waiting for the buckets
+        self._loop = None
+        self._client = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._client = self.client_factory()
+                self._loop = loop
+        return self._loop
+
+    # -- fair queue, only touched from the loop thread --
+    def _dispatch(self):
+        self._wakeup = None
+        while self.in_flight < self.max_concurrency and self._waiting:
+            session_id, waiting = next(iter(self._waiting.items()))
+            future, estimate = waiting[0]
+            if future.cancelled():
+                waiting.popleft()
+            else:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(estimate))
+                if delay > 0:
+                    self._wakeup = self._loop.call_later(delay, self._dispatch)
+                    return
+                waiting.popleft()
+                self.requests.take(1)
+                self.tokens.take(estimate)
+                self.in_flight += 1
+                future.set_result(None)
+            # round-robin: this session goes to the back of the line
+            del self._waiting[session_id]
+            if waiting:
+                self._waiting[session_id] = waiting
+
+    async def _acquire(self, session_id, estimate):
+        future = self._loop.create_future()
+        self._waiting.setdefault(session_id, deque()).append((future, estimate))
+        if self._wakeup is None:
+            self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # cancelled (deadline, losing hedge) after _dispatch granted the slot but before we resumed:
+            # nobody else will give it back
+            if future.done() and not future.cancelled():
+                self._release(estimate, None)
+            raise
+
+    def _release(self, estimate, used_tokens):
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.take(used_tokens - estimate)  # settle the reservation with the real usage
+        if self._wakeup is None:
+            self._dispatch()
+
+    async def _with_retries(self, session_id, request, call, stage=None):
+        estimate = estimate_tokens(request)
+        started = time.perf_counter()
+        queued = 0.0  # time spent waiting for a slot and the rate limits, over all attempts
+        usage = error = None
+        cancelled = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                waiting_since = time.perf_counter()
+                await self._acquire(session_id, estimate)
+                queued += time.perf_counter() - waiting_since
+                usage = None
+                try:
+                    result, usage = await call()
+                    return result
+                except Exception as failure:
+                    if attempt == self.max_retries or not is_retryable(failure):
+                        raise
+                    delay = retry_delay(failure, attempt)
+                    print(f"LLM call failed ({type(failure).__name__}), retrying in {delay:.1f}s")
+                finally:
+                    self._release(estimate, usage.total_tokens if usage is not None else None)
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled = True  # past its deadline or a losing hedge: not a failure of the call
+            raise
+        except BaseException as failure:
+            error = failure
+            raise
+        finally:
+            get_recorder().record_call(stage, request.get("model"), time.perf_counter() - started, queued,
+                                       usage=usage, error=error, retries=attempt, cancelled=cancelled)
+
+    async def _complete(self, session_id, request, stage):
+        async def call():
+            response = await self._client.chat.completions.create(**request)
+            return response, response.usage
+        return await self._with_retries(session_id, request, call, stage)
+
+    async def _stream(self, session_id, request, chunks, stage):
+        request = dict(request, stream=True, stream_options={"include_usage": True})
+
+        async def call():
+            usage, sent = None, False
+            try:
+                stream = await self._client.chat.completions.create(**request)
+                async for chunk in stream:
+                    sent = True
+                    if chunk.usage:
+                        usage = chunk.usage
+                    chunks.put(("chunk", chunk))
+            except Exception:
+                if sent:  # part of the reply is already on screen, a retry would repeat it
+                    raise RuntimeError("The LLM stream was interrupted") from None
+                raise
+            return None, usage
+
+        await self._with_retries(session_id, request, call, stage)
+
+    async def _hedged(self, session_id, request, stage, hedge_after):
+        """
+        Send the request, and if no reply came after hedge_after seconds send a duplicate:
+        the first reply wins and the other call is cancelled.
+        """
+        calls = [asyncio.ensure_future(self._complete(session_id, request, stage))]
+        try:
+            done, _ = await asyncio.wait(calls, timeout=hedge_after)
+            if not done:
+                print(f"LLM call for {stage} is past {hedge_after:.1f}s, sending a hedged request")
+                calls.append(asyncio.ensure_future(self._complete(session_id, request, stage)))
+            pending = set(calls)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [call for call in done if call.exception() is None]
+                if succeeded:
+                    return succeeded[0].result()
+                if not pending:
+                    raise next(iter(done)).exception()
+        finally:
+            for call in calls:
+                call.cancel()
+
+    # -- blocking API for the Streamlit threads --
+    def complete(self, session_id="default", stage=None, timeout=None, hedge_after=None, **request):
+        """
+        Blocking chat completion through the gateway, e.g. complete(session_id, "qa", model=..., messages=...).
+        stage names the pipeline step in the metrics, see llm_metrics.py.
+
+        Parameters:
+        - timeout (float or None): Seconds before the call is cancelled and DeadlineExceeded is raised.
+        - hedge_after (float or None): Seconds after which a duplicate request is sent, see _hedged.
+        """
+        loop = self._ensure_loop()
+        if hedge_after is not None:
+            call = self._hedged(session_id, request, stage, hedge_after)
+        else:
+            call = self._complete(session_id, request, stage)
+        future = asyncio.run_coroutine_threadsafe(call, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # frees its slot in the queue, or its connection if it already started
+            raise DeadlineExceeded(f"The LLM call for {stage} ran past its {timeout:.1f}s deadline") from None
+
+    def stream(self, session_id="default", stage=None, timeout=None, idle_timeout=None, **request):
+        """
+        Blocking iterator over the chunks of a streamed chat completion through the gateway.
+
+        Parameters:
+        - timeout (float or None): Seconds the whole stream may take.
+        - idle_timeout (float or None): Seconds to wait for each chunk, the first one included.
+        When either runs out the call is cancelled and DeadlineExceeded is raised. So is the call
+        when the caller stops iterating early.
+        """
+        loop = self._ensure_loop()
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream(session_id, request, chunks, stage), loop)
+        future.add_done_callback(lambda _: chunks.put(("done", None)))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                waits = [wait for wait in (idle_timeout, None if deadline is None else deadline - time.monotonic()) if wait is not None]
+                try:
+                    kind, chunk = chunks.get(timeout=max(min(waits), 0) if waits else None)
+                except queue.Empty:
+                    raise DeadlineExceeded(f"The LLM stream for {stage} stalled or ran past its deadline") from None
+                if kind == "done":
+                    future.result()  # raises the call's error, if any
+                    return
+                yield chunk
+        finally:
+            future.cancel()  # no-op once the call is done, frees its slot or connection otherwise
+
+#4 Functions used by the rest of the app
+def _create_openai_client():
+    # created on the first LLM call; retries are done by the gateway, so it can honor the limits and queue order while waiting
+    import streamlit as st
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=st.secrets["OPENAI_API_KEY"], max_retries=0)
+
+_gateway = LLMGateway(_create_openai_client)
+
+def get_gateway():
+    return _gateway
+
+def configure(client_factory=None, **settings):
+    """
+    Replace the process-wide gateway, e.g. to point it at fake_openai.FakeOpenAIServer:
+    configure(lambda: AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)).
+    """
+    global _gateway
+    _gateway = LLMGateway(client_factory or _create_openai_client, **settings)
+    return _gateway
+
+def current_session_id():
+    """
+    The Streamlit session calling, so the gateway can queue sessions fairly. Outside Streamlit, the thread.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx is not None else threading.current_thread().name
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from settings import STATE_DIR
+
+
+#1 Settings for the LLM metrics
+METRICS_PATH = os.path.join(STATE_DIR, "llm_metrics.json")  # snapshot for anything outside the app to read
+WINDOW_SECONDS = 3600  # percentiles are computed over this rolling window
+MAX_RECORDS = 20000
+SNAPSHOT_INTERVAL = 10  # seconds between snapshot writes
+# US dollars per million tokens: (input, cached input, output)
+PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+def call_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    prices = next((PRICES[name] for name in sorted(PRICES, key=len, reverse=True) if (model or "").startswith(name)), None)
+    if prices is None:
+        return None
+    return ((prompt_tokens - cached_tokens) * prices[0] + cached_tokens * prices[1] + completion_tokens * prices[2]) / 1_000_000
+
+#2 Rolling recorder of LLM calls and result cache lookups
+class MetricsRecorder:
+    """
+    Keeps the LLM calls of the last WINDOW_SECONDS and summarises them per pipeline stage:
+    wall and queue time percentiles, tokens, cost and errors, plus result cache hits and misses.
+    A JSON snapshot of the summary is written to METRICS_PATH every SNAPSHOT_INTERVAL seconds.
+    """
+
+    def __init__(self, path=METRICS_PATH, window=WINDOW_SECONDS):
+        self.path = path
+        self.window = window
+        self.calls = deque(maxlen=MAX_RECORDS)
+        self.lookups = deque(maxlen=MAX_RECORDS)
+        self.stage_outcomes = deque(maxlen=MAX_RECORDS)
+        self.spent_usd = 0.0  # cost of every priced call since the process started, not only the window
+        self._last_snapshot = 0.0
+        self._lock = threading.Lock()
+
+    def record_call(self, stage, model, wall, queue, usage=None, error=None, retries=0, cancelled=False):
+        """
+        Record one LLM call (including its retries). usage is the CompletionUsage of the reply, if any.
+        A cancelled call (deadline, losing hedge) is counted apart: it is neither an error nor a latency sample.
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+        record = {
+            "time": time.time(), "stage": stage or "unknown", "model": model, "wall": wall, "queue": queue,
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cached_tokens": cached_tokens,
+            "cost": call_cost(model, prompt_tokens, cached_tokens, completion_tokens) if usage is not None else None,
+            "error": type(error).__name__ if error is not None else None, "retries": retries, "cancelled": cancelled,
+        }
+        with self._lock:
+            self.calls.append(record)
+            self.spent_usd += record["cost"] or 0.0
+        self._maybe_snapshot()
+
+    def record_lookup(self, stage, hit):
+        """
+        Record a result cache lookup for a pipeline, hit or miss.
+        """
+        with self._lock:
+            self.lookups.append({"time": time.time(), "stage": stage, "hit": bool(hit)})
+        self._maybe_snapshot()
+
+    def record_stage_outcomes(self, outcomes):
+        """
+        Record how each stage of a scheduled pipeline ended, e.g. {"analysis": "ran", "qa": "skipped"}.
+        """
+        now = time.time()
+        with self._lock:
+            self.stage_outcomes.extend({"time": now, "stage": stage, "outcome": outcome} for stage, outcome in outcomes.items())
+        self._maybe_snapshot()
+
+    def wall_percentile(self, stage, q, min_calls=1):
+        """
+        Percentile q of the wall time of the stage's successful calls in the window, or None with fewer than min_calls.
+        """
+        since = time.time() - self.window
+        with self._lock:
+            wall = [record["wall"] for record in self.calls if record["stage"] == stage and record["error"] is None and not record["cancelled"]
+                    and record["time"] >= since]
+        return float(np.percentile(wall, q)) if len(wall) >= max(min_calls, 1) else None
+
+    def summary(self):
+        """
+        Per-stage statistics over the rolling window.
+        """
+        since = time.time() - self.window
+        with self._lock:
+            calls = [record for record in self.calls if record["time"] >= since]
+            lookups = [record for record in self.lookups if record["time"] >= since]
+            outcomes = [record for record in self.stage_outcomes if record["time"] >= since]
+
+        stages = {}
+        for stage in sorted({record["stage"] for record in calls}):
+            records = [record for record in calls if record["stage"] == stage]
+            wall = np.array([record["wall"] for record in records])
+            queue = np.array([record["queue"] for record in records])
+            costs = [record["cost"] for record in records if record["cost"] is not None]
+            stages[stage] = {
+                "calls": len(records),
+                "errors": sum(record["error"] is not None for record in records),
+                "cancelled": sum(record["cancelled"] for record in records),
+                "retries": sum(record["retries"] for record in records),
+                **{f"wall_p{q}": float(np.percentile(wall, q)) for q in (50, 95, 99)},
+                **{f"queue_p{q}": float(np.percentile(queue, q)) for q in (50, 95, 99)},
+                "prompt_tokens": sum(record["prompt_tokens"] for record in records),
+                "cached_tokens": sum(record["cached_tokens"] for record in records),
+                "completion_tokens": sum(record["completion_tokens"] for record in records),
+                "cost_usd": sum(costs),
+                "models": sorted({record["model"] for record in records if record["model"]}),
+            }
+
+        cache = {}
+        for stage in sorted({record["stage"] for record in lookups}):
+            hits = sum(record["hit"] for record in lookups if record["stage"] == stage)
+            total = sum(record["stage"] == stage for record in lookups)
+            cache[stage] = {"hits": hits, "misses": total - hits, "hit_rate": hits / total}
+
+        schedule = {}
+        for record in outcomes:
+            counts = schedule.setdefault(record["stage"], {})
+            counts[record["outcome"]] = counts.get(record["outcome"], 0) + 1
+
+        return {"generated_at": time.time(), "window_seconds": self.window, "stages": stages, "cache": cache, "schedule": schedule}
+
+    def recent_calls(self, limit=500):
+        with self._lock:
+            return list(self.calls)[-limit:]
+
+    def _maybe_snapshot(self):
+        now = time.monotonic()
+        if now - self._last_snapshot < SNAPSHOT_INTERVAL:
+            return
+        self._last_snapshot = now
+        try:
+            self.write_snapshot()
+        except OSError as error:
+            print("Could not write the LLM metrics snapshot:", error)
+
+    def write_snapshot(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+        os.replace(temporary_path, self.path)
+
+_recorder = MetricsRecorder()
+
+def get_recorder():
+    return _recorder
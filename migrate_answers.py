@@ -0,0 +1,58 @@
+"""
+Rewrite the legacy JSON answers.user_answer values in the packed format of answer_codec.py.
+
+    python migrate_answers.py --page-size 500
+    python migrate_answers.py --after-id 120000    # resume after the last id it printed
+
+Reads the table page by page in id order and updates one row at a time, so memory stays flat
+and the app keeps working during the migration: load_answers reads both formats.
+Rows already packed are left alone, so running it again is harmless.
+"""
+import argparse
+import json
+import time
+
+from answer_codec import dump_answers, is_legacy, load_answers
+from database import execute_write, get_client, iter_rows
+
+
+#1 Settings for the migration
+PAGE_SIZE = 500
+
+def migrate_answers(page_size=PAGE_SIZE, after_id=0):
+    """
+    Returns:
+    - report (dict): Rows rewritten, already packed and unreadable, the last id seen and bytes saved.
+    """
+    started = time.perf_counter()
+    report = {"migrated": 0, "already_packed": 0, "unreadable": 0, "last_id": after_id, "bytes_saved": 0}
+    for row in iter_rows("answers", "id, user_answer", page_size, after_id):
+        report["last_id"] = row["id"]
+        value = row["user_answer"]
+        try:
+            answers = load_answers(value)
+            if not is_legacy(value):
+                report["already_packed"] += 1
+                continue
+            packed = dump_answers(answers)
+        except ValueError as error:
+            print(f"Leaving answers row {row['id']} as it is:", error)
+            report["unreadable"] += 1
+            continue
+        execute_write(get_client().table("answers").update({"user_answer": packed}).eq("id", row["id"]))
+        report["migrated"] += 1
+        report["bytes_saved"] += len(value if isinstance(value, str) else json.dumps(value)) - len(packed)
+        if report["migrated"] % page_size == 0:
+            print(f"{report['migrated']} rows migrated, last id {row['id']}")
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--after-id", type=int, default=0, help="skip the rows up to this id")
+    args = parser.parse_args()
+    print(json.dumps(migrate_answers(args.page_size, args.after_id), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+-- Idempotency keys for rows written by the background writer (write_behind.py).
+-- Rows are upserted on this column, so replaying the local spool never duplicates them.
+alter table users add column if not exists idempotency_key text;
+alter table answers add column if not exists idempotency_key text;
+alter table feedback add column if not exists idempotency_key text;
+
+create unique index if not exists users_idempotency_key_idx on users (idempotency_key);
+create unique index if not exists answers_idempotency_key_idx on answers (idempotency_key);
+create unique index if not exists feedback_idempotency_key_idx on feedback (idempotency_key);
@@ -0,0 +1,6 @@
+-- Fingerprint of the answer vector of every submission (functions.answer_fingerprint), so
+-- "did this user already submit these exact answers?" is one indexed lookup.
+-- Rows written before this column existed are filled in by backfill_fingerprints.py.
+alter table answers add column if not exists fingerprint text;
+
+create index if not exists answers_user_fingerprint_idx on answers (user_id, fingerprint);
@@ -0,0 +1,22 @@
+-- Version of the question catalog (functions.get_catalog), bumped by every change to the
+-- questions or their alternatives, so the app notices edited texts and not only added rows.
+create table if not exists catalog_version (
+    id int primary key check (id = 1),
+    version bigint not null default 1,
+    updated_at timestamptz not null default now()
+);
+insert into catalog_version (id) values (1) on conflict (id) do nothing;
+
+create or replace function bump_catalog_version() returns trigger language plpgsql as $$
+begin
+    update catalog_version set version = version + 1, updated_at = now() where id = 1;
+    return null;
+end;
+$$;
+
+drop trigger if exists questions_catalog_version on questions;
+create trigger questions_catalog_version after insert or update or delete or truncate on questions
+    for each statement execute function bump_catalog_version();
+drop trigger if exists possible_answers_catalog_version on possible_answers;
+create trigger possible_answers_catalog_version after insert or update or delete or truncate on possible_answers
+    for each statement execute function bump_catalog_version();
@@ -0,0 +1,48 @@
+import pandas as pd
+import streamlit as st
+from functions import get_result_cache
+from llm_metrics import get_recorder, METRICS_PATH
+
+
+#1 Page configuration and admin check
+st.set_page_config(layout="wide")
+st.title("LLM Metrics")
+
+admin_password = st.secrets.get("ADMIN_PASSWORD")
+if not admin_password:
+    st.write(":red[Set ADMIN_PASSWORD in the secrets to enable this page.]")
+    st.stop()
+if st.text_input("Admin password", type="password") != admin_password:
+    st.stop()
+
+#2 Per-stage latency, tokens, cost and errors over the rolling window
+summary = get_recorder().summary()
+st.write(f"*Last {summary['window_seconds'] // 60} minutes of this server process. A JSON snapshot is written to* `{METRICS_PATH}`.")
+
+if summary["stages"]:
+    stages = pd.DataFrame.from_dict(summary["stages"], orient="index")
+    st.write("**Latency (seconds)**")
+    st.dataframe(stages[["calls", "errors", "cancelled", "retries", "wall_p50", "wall_p95", "wall_p99", "queue_p50", "queue_p95", "queue_p99"]])
+    st.write("**Tokens and cost**")
+    st.dataframe(stages[["prompt_tokens", "cached_tokens", "completion_tokens", "cost_usd", "models"]])
+else:
+    st.write("No LLM calls yet.")
+
+#3 Result cache hits and misses
+st.write("**Result cache**")
+if summary["cache"]:
+    st.dataframe(pd.DataFrame.from_dict(summary["cache"], orient="index"))
+st.write(get_result_cache().stats())
+
+#4 How the stages of scheduled pipelines ended (ran, skipped, timed out...)
+if summary["schedule"]:
+    st.write("**Pipeline stages**")
+    st.dataframe(pd.DataFrame.from_dict(summary["schedule"], orient="index").fillna(0).astype(int))
+
+#5 Recent calls
+calls = pd.DataFrame(get_recorder().recent_calls())
+if not calls.empty:
+    calls["time"] = pd.to_datetime(calls["time"], unit="s")
+    st.write("**Wall time of recent calls (seconds)**")
+    st.line_chart(calls.pivot_table(index="time", columns="stage", values="wall"))
+    st.dataframe(calls.sort_values("time", ascending=False))
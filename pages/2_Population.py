@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from functions import get_population_stats, load_score_weights, SCORE_BIN_WIDTH, POPULATION_STATS_PATH
+
+
+#1 Page configuration and admin check
+st.set_page_config(layout="wide")
+st.title("Population")
+
+admin_password = st.secrets.get("ADMIN_PASSWORD")
+if not admin_password:
+    st.write(":red[Set ADMIN_PASSWORD in the secrets to enable this page.]")
+    st.stop()
+if st.text_input("Admin password", type="password") != admin_password:
+    st.stop()
+
+#2 Counters kept in memory by this server process, see PopulationStats in functions.py
+started = time.perf_counter()
+population = get_population_stats()
+weights = load_score_weights()
+st.write(f"*{population.total} tests counted on this machine, {population.seq - population.flushed_seq} of them not yet "
+         f"written to* `{POPULATION_STATS_PATH}`.")
+
+if st.button("Recount from the database", help="reads the whole 'answers' table, e.g. to include what other machines counted"):
+    with st.spinner("Recounting..."):
+        population.rebuild()
+
+if not population.total:
+    st.write("No tests counted yet.")
+    st.stop()
+
+#3 Share of each option, per question
+shares = pd.DataFrame(population.option_shares() * 100, columns=weights.options,
+                      index=[f"Question {number}" for number in range(1, weights.tensor.shape[0] + 1)])
+st.write("**Options picked (% of tests)**")
+st.bar_chart(shares)
+st.dataframe(shares.round(1))
+
+#4 Distribution of the raw scores, per category
+st.write("**Raw scores per category**")
+histogram = population.histogram
+columns = st.columns(2)
+for category, name in enumerate(weights.categories):
+    counts = histogram.counts[category]
+    used = np.flatnonzero(counts)
+    bins = slice(used[0], used[-1] + 1)  # leave out the empty tails
+    scores = histogram.lowest[category] + np.arange(len(counts))[bins] * SCORE_BIN_WIDTH
+    with columns[category % 2]:
+        st.write(name)
+        st.bar_chart(pd.DataFrame({"tests": counts[bins]}, index=scores))
+
+st.write(f"*Drawn in {(time.perf_counter() - started) * 1000:.0f} ms.*")
@@ -0,0 +1,194 @@
+"""
+Pre-generate the analysis of the most common answer sets, so they render without any LLM call.
+
+    python pregenerate.py --top-k 200 --concurrency 4 --max-spend 5
+    python pregenerate.py --top-k 20 --fake-openai    # against the local OpenAI stub
+
+Streams the 'answers' table, ranks the answer vectors by how often they occur and runs the
+analysis pipeline for the top K, which stores each result in the result cache the app reads.
+Progress and spend are checkpointed after every answer set, so an interrupted run resumes
+where it stopped and the spend cap holds across runs.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from answer_codec import load_answers
+from database import iter_rows
+from functions import get_catalog, get_formatted_questions_and_answers, get_cached_analysis, run_analysis, analysis_cache_key, load_score_weights, PIPELINE_MODES
+from llm_metrics import get_recorder
+from settings import STATE_DIR
+
+
+#1 Settings for the pre-generation job
+CHECKPOINT_PATH = os.path.join(STATE_DIR, "pregenerate_checkpoint.json")
+PAGE_SIZE = 1000  # answers rows read per request
+TOP_K = 100
+CONCURRENCY = 4  # answer sets analysed at once, the LLM gateway still applies its own limits
+MAX_SPEND = 5.0  # US dollars per checkpoint, over every run that resumed it
+
+#2 Function to rank the answer vectors of the 'answers' table by frequency
+def rank_answer_vectors(page_size=PAGE_SIZE, question_total=None):
+    """
+    Count every distinct answer vector, reading the table page by page so memory only grows
+    with the number of distinct vectors.
+
+    Parameters:
+    - page_size (int): Rows per request.
+    - question_total (int or None): Vectors of another length (older catalogs) are skipped.
+
+    Returns:
+    - counts (Counter): Answer vector (tuple of labels) -> number of rows with it.
+    """
+    counts = Counter()
+    for row in iter_rows("answers", "id, user_answer", page_size):
+        try:
+            answer = load_answers(row["user_answer"])
+        except ValueError:
+            continue
+        if (question_total is not None and len(answer) != question_total):
+            continue
+        counts[tuple(answer)] += 1
+    return counts
+
+#3 Checkpoint with the answer sets already done and the money spent on them
+class Checkpoint:
+    """
+    JSON file rewritten after every finished answer set. It is tied to the inputs of the cache
+    key (catalog text and pipeline mode), so a new catalog starts a fresh checkpoint.
+    """
+
+    def __init__(self, path, scope):
+        self.path = path
+        self.scope = scope
+        self.done = set()
+        self.spent_usd = 0.0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("scope") == scope:
+                self.done = set(data["done"])
+                self.spent_usd = data["spent_usd"]
+            else:
+                print("Checkpoint is for another catalog or mode, starting over.")
+
+    def mark_done(self, key, spent_usd):
+        with self._lock:
+            self.done.add(key)
+            self.spent_usd = spent_usd
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"scope": self.scope, "spent_usd": self.spent_usd, "done": sorted(self.done)}, file)
+        os.replace(temporary_path, self.path)
+
+#4 The job itself
+def pregenerate(top_k=TOP_K, concurrency=CONCURRENCY, max_spend=MAX_SPEND, mode="three_stage",
+                checkpoint_path=CHECKPOINT_PATH, page_size=PAGE_SIZE):
+    """
+    Analyse the top_k most common answer vectors that aren't cached yet, concurrency at a time,
+    and stop submitting new ones once the spend (including earlier runs of the checkpoint) plus
+    the expected cost of the calls in flight would pass max_spend.
+
+    Returns:
+    - report (dict): What was ranked, generated, skipped and spent.
+    """
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode: {mode!r}")
+    catalog = get_catalog()
+    questions = get_formatted_questions_and_answers()
+    categories = load_score_weights().categories
+
+    started = time.perf_counter()
+    counts = rank_answer_vectors(page_size, catalog.question_total)
+    ranked = counts.most_common(top_k)
+    print(f"{sum(counts.values())} answers, {len(counts)} distinct vectors, top {len(ranked)} cover "
+          f"{sum(count for _, count in ranked) / max(sum(counts.values()), 1):.1%} of them")
+
+    checkpoint = Checkpoint(checkpoint_path, {"questions": analysis_cache_key(questions, [], categories, mode), "mode": mode})
+    recorder = get_recorder()
+    spent_before = recorder.spent_usd - checkpoint.spent_usd  # so spent() continues from the checkpoint
+    report = {"answers": sum(counts.values()), "distinct_vectors": len(counts), "ranked": len(ranked),
+              "share_covered": sum(count for _, count in ranked) / max(sum(counts.values()), 1),
+              "generated": 0, "already_done": 0, "failed": 0, "stopped_by_spend_cap": False}
+
+    def spent():
+        return recorder.spent_usd - spent_before
+
+    todo = []
+    for vector, count in ranked:
+        answers = list(vector)
+        key = analysis_cache_key(questions, answers, categories, mode)
+        if key in checkpoint.done or get_cached_analysis(questions, answers, categories, mode) is not None:
+            report["already_done"] += 1
+        else:
+            todo.append((key, answers))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pregenerate") as executor:
+        in_flight = {}
+        while todo or in_flight:
+            while todo and len(in_flight) < concurrency:
+                # expected cost of one more answer set: the mean over every set of the checkpoint (earlier
+                # runs included), which errs high because the spend already includes the first stages of
+                # the sets still running. With no set done yet a single one runs first to measure it.
+                if not checkpoint.done and in_flight:
+                    break
+                per_set = spent() / len(checkpoint.done) if checkpoint.done else 0.0
+                if spent() + per_set * (len(in_flight) + 1) > max_spend:
+                    report["stopped_by_spend_cap"] = True
+                    todo = []
+                    break
+                key, answers = todo.pop(0)
+                in_flight[executor.submit(run_analysis, questions, answers, categories, mode)] = key
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = in_flight.pop(future)
+                try:
+                    future.result()
+                    report["generated"] += 1
+                    checkpoint.mark_done(key, spent())
+                except Exception as error:
+                    report["failed"] += 1
+                    print(f"Could not analyse answer set {key[:12]}:", error)
+            print(f"{report['generated']} generated, {len(in_flight)} running, {len(todo)} left, ${spent():.4f} spent")
+
+    report["spent_usd"] = spent()
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--max-spend", type=float, default=MAX_SPEND, help="US dollars, over every run of the checkpoint")
+    parser.add_argument("--mode", choices=PIPELINE_MODES, default="three_stage")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--fake-openai", action="store_true", help="send the LLM calls to fake_openai.FakeOpenAIServer")
+    args = parser.parse_args()
+
+    server = None
+    if args.fake_openai:
+        from openai import AsyncOpenAI
+        import llm_gateway
+        from fake_openai import FakeOpenAIServer
+        server = FakeOpenAIServer().start()
+        llm_gateway.configure(lambda: AsyncOpenAI(base_url=server.base_url, api_key="pregenerate", max_retries=0))
+    try:
+        report = pregenerate(args.top_k, args.concurrency, args.max_spend, args.mode, args.checkpoint)
+    finally:
+        if server is not None:
+            server.stop()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
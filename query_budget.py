@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+import threading
+import time
+
+
+#1 Usage of the database by one Streamlit rerun (or one block of code, see QueryCounter)
+class QueryBudgetExceeded(AssertionError):
+    """Raised by QueryCounter.assert_budget, with the queries per calling function in the message."""
+
+class QueryUsage:
+    """
+    Queries, rows and response bytes, in total and per calling function (e.g.
+    'functions.get_user_id_by_email', or 'app.<module>' for the script's own top-level queries).
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.functions = {}  # calling function -> {"queries", "rows", "bytes"}
+        self.started_at = time.monotonic()
+
+    def add(self, function, rows, size, seconds, failed):
+        self.queries += 1
+        self.rows += rows
+        self.bytes += size
+        self.errors += failed
+        self.seconds += seconds
+        counts = self.functions.setdefault(function, {"queries": 0, "rows": 0, "bytes": 0})
+        counts["queries"] += 1
+        counts["rows"] += rows
+        counts["bytes"] += size
+
+    def as_dict(self):
+        return {"queries": self.queries, "rows": self.rows, "bytes": self.bytes, "errors": self.errors,
+                "seconds": self.seconds, "functions": {name: dict(counts) for name, counts in self.functions.items()}}
+
+    def summary(self):
+        """
+        One line, e.g. '3 queries (12 rows, 1.4 kB, 0.08 s): functions.find_submission 1, app.<module> 2'.
+        """
+        by_function = ", ".join(f"{name} {counts['queries']}" for name, counts in
+                                sorted(self.functions.items(), key=lambda item: -item[1]["queries"]))
+        errors = f", {self.errors} failed" if self.errors else ""
+        return (f"{self.queries} queries ({self.rows} rows, {self.bytes / 1000:.1f} kB, {self.seconds:.2f} s{errors})"
+                + (f": {by_function}" if by_function else ""))
+
+#2 Attribution of each query to its caller and its Streamlit session
+_INTERNAL_FILES = ("database.py", "query_budget.py")
+_reruns = {}  # Streamlit session id -> QueryUsage of the rerun running now
+# Streamlit doesn't tell when a session ends, so a session closed mid-rerun leaves its entry behind:
+# begin_rerun drops the entries older than this, far longer than any rerun takes
+RERUN_MAX_AGE = 900
+_counters = []  # open QueryCounter blocks
+_lock = threading.Lock()
+
+def _calling_function():
+    # the first frame outside this module and database.py, named after its file: 'functions.send_feedback'
+    frame = sys._getframe(2)
+    while frame is not None and os.path.basename(frame.f_code.co_filename) in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]}.{frame.f_code.co_qualname}"
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx is not None else None
+
+def _response_size(response):
+    data = getattr(response, "data", None)
+    if data is None:
+        return 0, 0
+    rows = len(data) if isinstance(data, list) else 1
+    return rows, len(json.dumps(data, default=str))
+
+def record_query(response, seconds, failed=False):
+    """
+    Count one executed query (called by database.py for every request it sends). Queries made
+    outside a Streamlit session, e.g. by the write-behind thread, only count in QueryCounter
+    blocks opened with include_background=True.
+    """
+    if not _reruns and not _counters:
+        return
+    rows, size = _response_size(response) if not failed else (0, 0)
+    function = _calling_function()
+    session_id = _session_id()
+    with _lock:
+        usage = _reruns.get(session_id) if session_id is not None else None
+        if usage is not None:
+            usage.add(function, rows, size, seconds, failed)
+        for counter in _counters:
+            if session_id is not None or counter.include_background:
+                counter.usage.add(function, rows, size, seconds, failed)
+
+#3 Per-rerun accounting, started at the top of app.py and logged at the bottom
+def begin_rerun():
+    """
+    Start counting the queries of the current session's rerun. A rerun that never reached
+    end_rerun (st.stop, st.rerun, an exception) is logged here instead, and so are the reruns
+    of other sessions started over RERUN_MAX_AGE seconds ago, which were abandoned.
+    """
+    session_id = _session_id()
+    if session_id is None:
+        return None
+    usage = QueryUsage()
+    with _lock:
+        unfinished = [_reruns.pop(session_id)] if session_id in _reruns else []
+        unfinished += [_reruns.pop(other) for other, other_usage in list(_reruns.items())
+                       if usage.started_at - other_usage.started_at > RERUN_MAX_AGE]
+        _reruns[session_id] = usage
+    for stopped in unfinished:
+        if stopped.queries:
+            print(f"Rerun (stopped early) made {stopped.summary()}")
+    return usage
+
+def end_rerun(budget=None):
+    """
+    Stop counting, log the rerun's queries if it made any and warn when it made more than budget.
+
+    Returns:
+    - usage (QueryUsage or None): What the rerun used, None outside Streamlit or without begin_rerun.
+    """
+    session_id = _session_id()
+    with _lock:
+        usage = _reruns.pop(session_id, None) if session_id is not None else None
+    if usage is None:
+        return None
+    if usage.queries:
+        print(f"Rerun made {usage.summary()}")
+    if budget is not None and usage.queries > budget:
+        print(f"Warning: the rerun made {usage.queries} database queries, over the budget of {budget}.")
+    return usage
+
+#4 Counting block for budget checks in tests and benchmarks
+class QueryCounter:
+    """
+    Counts every query made by Streamlit sessions (and, with include_background=True, by any
+    thread) while the block is open:
+
+        with QueryCounter() as counter:
+            app.button(key="question_1_alternative_0").click().run()
+        counter.assert_budget(queries=0)
+    """
+
+    def __init__(self, include_background=False):
+        self.include_background = include_background
+        self.usage = QueryUsage()
+
+    def __enter__(self):
+        with _lock:
+            _counters.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with _lock:
+            _counters.remove(self)
+
+    def assert_budget(self, queries=None, rows=None, bytes=None, label="The block"):
+        """
+        Raise QueryBudgetExceeded if the block made more queries, read more rows or received more bytes than allowed.
+        """
+        over = [f"{name} {used} > {limit}" for name, used, limit in
+                (("queries", self.usage.queries, queries), ("rows", self.usage.rows, rows), ("bytes", self.usage.bytes, bytes))
+                if limit is not None and used > limit]
+        if over:
+            raise QueryBudgetExceeded(f"{label} is over its database budget ({', '.join(over)}): {self.usage.summary()}")
+        return self.usage
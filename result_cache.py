@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+#1 Settings for the result cache
+MEMORY_ENTRIES = 256  # results kept in the in-memory LRU tier
+LOOKUP_BATCH = 500  # keys per query of contains_many, under SQLite's limit on bound parameters
+DISK_BYTES = 64 * 1024 * 1024  # size the on-disk tier is trimmed back to
+
+CACHE_SCHEMA = """
+create table if not exists results (
+    key text primary key,
+    value text not null,
+    size integer not null,
+    last_access real not null
+);
+create index if not exists results_last_access_idx on results (last_access);
+"""
+
+def cache_key(*parts):
+    """
+    Content address of a result: sha256 of its JSON-encoded inputs.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+#2 Two-tier cache with single-flight computation
+class ResultCache:
+    """
+    Content-addressed cache for JSON-serializable results. Lookups go to a bounded in-memory
+    LRU first, then to a SQLite file that is shared by every process on the machine and
+    trimmed to DISK_BYTES by evicting the least recently used entries.
+
+    get_or_compute() coalesces concurrent misses on the same key: one caller computes,
+    the others wait for its result.
+    """
+
+    def __init__(self, path, memory_entries=MEMORY_ENTRIES, disk_bytes=DISK_BYTES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> [threading.Event, result, error]
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(CACHE_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("pragma journal_mode=wal")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def get(self, key):
+        """
+        Return the cached value, or None.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                return self._memory[key]
+        with self._connect() as connection:
+            found = connection.execute("select value from results where key = ?", (key,)).fetchone()
+            if found:
+                connection.execute("update results set last_access = ? where key = ?", (time.time(), key))
+        if found is None:
+            return None
+        value = json.loads(found[0])
+        self._remember(key, value)
+        self._count("disk_hits")
+        return value
+
+    def contains(self, key):
+        """
+        Whether key is cached, without loading the value or counting a lookup.
+        """
+        with self._lock:
+            if key in self._memory:
+                return True
+        with self._connect() as connection:
+            return connection.execute("select 1 from results where key = ?", (key,)).fetchone() is not None
+
+    def contains_many(self, keys):
+        """
+        The subset of keys that is cached, checked with one query per LOOKUP_BATCH keys over a single connection.
+        """
+        keys = set(keys)
+        with self._lock:
+            found = {key for key in keys if key in self._memory}
+        missing = sorted(keys - found)
+        if not missing:
+            return found
+        with self._connect() as connection:
+            for start in range(0, len(missing), LOOKUP_BATCH):
+                batch = missing[start:start + LOOKUP_BATCH]
+                query = f"select key from results where key in ({', '.join('?' * len(batch))})"
+                found.update(key for (key,) in connection.execute(query, batch))
+        return found
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        self._remember(key, value)
+        with self._connect() as connection:
+            connection.execute(
+                "insert or replace into results (key, value, size, last_access) values (?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode()), time.time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection):
+        total = connection.execute("select coalesce(sum(size), 0) from results").fetchone()[0]
+        if total <= self.disk_bytes:
+            return
+        # walk from the least recently used entry and drop until the total fits again
+        doomed = []
+        for key, size in connection.execute("select key, size from results order by last_access"):
+            if total <= self.disk_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        connection.executemany("delete from results where key = ?", doomed)
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Return the cached value for key, calling compute() on a miss. Only one call per key
+        runs at a time in this process, concurrent callers get the same result (or error).
+        A computed value is only stored when cacheable(value) is true, if given.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = [threading.Event(), None, None]
+            else:
+                self.metrics["coalesced"] += 1
+
+        if not leader:
+            flight[0].wait()
+            if flight[2] is not None:
+                raise flight[2]
+            return flight[1]
+
+        try:
+            # a previous leader may have stored the value between our first lookup and taking the lead
+            flight[1] = self.get(key)
+            if flight[1] is not None:
+                return flight[1]
+            self._count("misses")
+            flight[1] = compute()
+            if cacheable is None or cacheable(flight[1]):
+                self.put(key, flight[1])
+            return flight[1]
+        except Exception as error:
+            flight[2] = error
+            self._count("errors")
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight[0].set()
+
+    def stats(self):
+        """
+        Hit/miss counters plus the size of both tiers.
+        """
+        with self._lock:
+            stats = dict(self.metrics, memory_entries=len(self._memory))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"] + stats["coalesced"]) / lookups if lookups else 0.0
+        with self._connect() as connection:
+            stats["disk_entries"], stats["disk_bytes"] = connection.execute("select count(*), coalesce(sum(size), 0) from results").fetchone()
+        return stats
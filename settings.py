@@ -0,0 +1,5 @@
+import os
+
+
+#1 Folder for local state that has to survive restarts (write spool, result cache, histograms, metrics)
+STATE_DIR = os.environ.get("PERSONA_STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".state"))
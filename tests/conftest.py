@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# the result cache, spool and counters of the tests never touch the real .state folder
+os.environ.setdefault("PERSONA_STATE_DIR", tempfile.mkdtemp(prefix="persona-tests-"))
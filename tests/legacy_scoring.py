@@ -0,0 +1,1066 @@
+"""
+The scoring of answers as it was before the weights tensor (data/score_weights.json), kept
+verbatim so tests/test_scoring.py can check the tensor scores every option exactly the same.
+"""
+
+
+def generate_user_scores(answer,categories):
+    # Initialize empty dictionary to store user scores
+    user_scores = []
+    for category in categories:
+        user_scores.append(0)
+
+    # Iterate over each question and category
+    #Question 1. You unsheath your sword…
+    if answer[0]=='b)':
+        user_scores[0] += 2
+        user_scores[1] += 0
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[0]=='c)':
+        user_scores[0] += 1
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 1
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+    else:
+        user_scores[0] += -1
+        user_scores[1] += 0.5
+        user_scores[2] += -1
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += -1
+    #Question 2. Your little sibling is suddenly recognized by the whole world as the new Savior, but he/she has to sacrifice himself/herself…
+    if answer[1]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 2
+        user_scores[3] += 1
+        user_scores[4] += 1
+        user_scores[5] += -0.5
+        user_scores[6] += -1
+        user_scores[7] += 1
+
+    elif answer[1]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 2
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += -2
+        user_scores[7] += 0
+
+    elif answer[1]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += -2
+        user_scores[2] += -1
+        user_scores[3] += -0.5
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 2
+        user_scores[7] += 1
+
+    elif answer[1]=='d)':
+        user_scores[0] += -2
+        user_scores[1] += -2
+        user_scores[2] += -1
+        user_scores[3] += 2
+        user_scores[4] += -1
+        user_scores[5] += -1
+        user_scores[6] += 2
+        user_scores[7] += -1
+
+    else: #e)
+        user_scores[0] += 1
+        user_scores[1] += -1
+        user_scores[2] += 0
+        user_scores[3] += 1
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += 0
+    #Question 3. You go back in time to the most vulnerable moment of the world's greatest villain's infancy for a brief moment…
+    if answer[2]=='a)':
+        user_scores[0] += 1
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 1
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[2]=='b)':
+        user_scores[0] += -1
+        user_scores[1] += 2
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += -1
+        user_scores[7] += -1
+
+    elif answer[2]=='c)':
+        user_scores[0] += 2
+        user_scores[1] += -1
+        user_scores[2] += 1
+        user_scores[3] += -2
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 1
+
+    else: #d)
+        user_scores[0] += 1
+        user_scores[1] += -0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -2
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0.5
+        user_scores[7] += 0
+    #Question 4. You become the owner of half of the world's money and military power, your priority, the first thing you do is...
+    if answer[3]=='a)':
+        user_scores[0] += 1
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += -1
+
+    elif answer[3]=='b)':
+        user_scores[0] += 1
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[3]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[3]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 1
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -0.5
+        user_scores[6] += 1
+        user_scores[7] += 1
+
+    elif answer[3]=='e)':
+        user_scores[0] += -1
+        user_scores[1] += -2
+        user_scores[2] += -1
+        user_scores[3] += 2
+        user_scores[4] += -1
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    else: #f)
+        user_scores[0] += -1
+        user_scores[1] += -1
+        user_scores[2] += -2
+        user_scores[3] += 1
+        user_scores[4] += -1
+        user_scores[5] += 0
+        user_scores[6] += 2
+        user_scores[7] += 0
+
+    #Question 5. The love of your life, the one you hoped to spend an eternity with, is found to be a villain...
+    if answer[4]=='a)':
+        user_scores[0] += -1
+        user_scores[1] += 1
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += -1
+        user_scores[5] += -0.5
+        user_scores[6] += -0.5
+        user_scores[7] += 1
+
+    elif answer[4]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += 1
+        user_scores[6] += 0.5
+        user_scores[7] += -0.5
+
+    elif answer[4]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 2
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    elif answer[4]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 0.5
+        user_scores[7] += 1
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0.5
+        user_scores[3] += 0.5
+        user_scores[4] += -1
+        user_scores[5] += 0
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    #Question 6. You are a leader in a democratic country on the brink of civil war. You have the power to prevent it, but it would require using harsh and undemocratic methods.
+
+    if answer[5]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 2
+        user_scores[2] += 0.5
+        user_scores[3] += 0.5
+        user_scores[4] += -1
+        user_scores[5] += 0.5
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[5]=='b)':
+        user_scores[0] += -0.5
+        user_scores[1] += 1
+        user_scores[2] += -1
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 1
+        user_scores[7] += -0.5
+
+    elif answer[5]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += -1
+        user_scores[7] += 1
+
+    elif answer[5]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 1
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    #Question 7. You live with a spouse and two small children on a house you worked hard to afford. You notice someone breaking through your door at night...
+
+    if answer[6]=='a)':
+        user_scores[0] += -1
+        user_scores[1] += 0.5
+        user_scores[2] += -1
+        user_scores[3] += 0.5
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += -1
+
+    elif answer[6]=='b)':
+        user_scores[0] += 1
+        user_scores[1] += 0
+        user_scores[2] += 0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0.5
+
+    elif answer[6]=='c)':
+        user_scores[0] += 1
+        user_scores[1] += -1
+        user_scores[2] += 1
+        user_scores[3] += -2
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += -0.5
+        user_scores[7] += 0
+
+    elif answer[6]=='d)':
+        user_scores[0] += 1
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #e)
+        user_scores[0] += -1
+        user_scores[1] += 0.5
+        user_scores[2] += -1
+        user_scores[3] += 0
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 0.5
+        user_scores[7] += 0
+
+    #Question 8. You find out that a beloved public figure has committed a serious crime...
+
+    if answer[7]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 1
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[7]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 1
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += -0.5
+        user_scores[7] += -0.5
+
+    elif answer[7]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += -1
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[7]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 1
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += -1
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += -1
+
+    #Question 9. You have the opportunity to gain immense knowledge and wisdom, but it will isolate you from human contact for a decade or more.
+
+    if answer[8]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 1
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 1
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[8]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += -0.5
+        user_scores[3] += 0
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[8]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 1
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    else: # d)
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += -0.5
+        user_scores[3] += 0.5
+        user_scores[4] += -1
+        user_scores[5] += -1
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    #Question 10. Think about your religion for a moment...
+
+    if answer[9]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += -0.5
+        user_scores[3] += 0
+        user_scores[4] += 1
+        user_scores[5] += 0
+        user_scores[6] += 0.5
+        user_scores[7] += 1
+
+    elif answer[9]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += 1
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0.5
+
+    elif answer[9]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0.5
+
+    elif answer[9]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += -0.5
+        user_scores[7] += -1
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -0.5
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += -1
+
+    #Question 11. How much is a life worth?
+
+    if answer[10]=='a)':
+        user_scores[0] += 1
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[10]=='b)':
+        user_scores[0] += 1
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[10]=='c)':
+        user_scores[0] += -1
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += -0.5
+
+    elif answer[10]=='d)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #e)
+        user_scores[0] += -1
+        user_scores[1] += -0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += -0.5
+
+    #Question 12. What is your life worth?
+
+    if answer[11]=='a)':
+        user_scores[0] += -0.5
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 1
+        user_scores[4] += -0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += -0.5
+
+    elif answer[11]=='b)':
+        user_scores[0] += 1
+        user_scores[1] += -1
+        user_scores[2] += -1
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += -0.5
+        user_scores[6] += 1
+        user_scores[7] += -1
+
+    elif answer[11]=='c)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0.5
+        user_scores[2] += -0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0.5
+        user_scores[7] += -1
+
+    elif answer[11]=='d)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += -0.5
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += -0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0.5
+        user_scores[7] += -0.5
+
+    #Question 13. Knowing that the average statistical value of a life worldwide is about 1 million dollars, how much is your life worth?
+
+    if answer[12]=='a)':
+        user_scores[0] += -1
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 1
+        user_scores[4] += -0.5
+        user_scores[5] += 0
+        user_scores[6] += -0.5
+        user_scores[7] += -0.5
+
+    elif answer[12]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[12]=='c)':
+        user_scores[0] += 1
+        user_scores[1] += -0.5
+        user_scores[2] += -1
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    elif answer[12]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += -0.5
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += -0.5
+        user_scores[7] += -0.5
+
+    else: #e)
+        user_scores[0] += 1
+        user_scores[1] += -1
+        user_scores[2] += -1
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    #Question 14. For you, what is more important: individual freedom or the greater good of the collective?
+
+    if answer[13]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += -1
+        user_scores[7] += 0
+
+    elif answer[13]=='b)':
+        user_scores[0] += -0.5
+        user_scores[1] += -0.5
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 1.5
+        user_scores[7] += 0
+
+    elif answer[13]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += -0.5
+        user_scores[6] += 1
+        user_scores[7] += 0
+
+    elif answer[13]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 1
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #e)
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += -1.5
+        user_scores[5] += 1
+        user_scores[6] += -1.5
+        user_scores[7] += 0
+
+    #Question 15. How important is filial piety to you? How much thicker is blood compared to water?
+
+    if answer[14]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 1
+        user_scores[3] += -0.5
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[14]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[14]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[14]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[14]=='e)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += -0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[14]=='f)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #g)
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += -1
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    #Question 16. What is love to you?
+
+    if answer[15]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += -1.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[15]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += -0.5
+        user_scores[5] += 1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[15]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[15]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += -0.5
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[15]=='e)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[15]=='f)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #g)
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    #Question 17. What is ignorance to you?
+
+    if answer[16]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[16]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += -0.5
+        user_scores[3] += 1
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[16]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[16]=='d)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += -0.5
+        user_scores[3] += 0
+        user_scores[4] += -0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[16]=='e)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += -1
+        user_scores[3] += 1
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[16]=='f)':
+        user_scores[0] += 0
+        user_scores[1] += -1
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    else: #g)
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    #Question 18. Jarvis accidentally killed his friend Kloe when he hid her medicine as a prank. At what age, if any, would you consider him to be innocent?
+
+    if answer[17]=='a)':
+        user_scores[0] += 1
+        user_scores[1] += -1
+        user_scores[2] += -0.5
+        user_scores[3] += 1
+        user_scores[4] += 1
+        user_scores[5] += -0.5
+        user_scores[6] += 0
+        user_scores[7] += 1.5
+
+    elif answer[17]=='b)':
+        user_scores[0] += 0.5
+        user_scores[1] += -1
+        user_scores[2] += -1
+        user_scores[3] += -1
+        user_scores[4] += 0
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 1
+
+    elif answer[17]=='c)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0
+        user_scores[2] += -0.5
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 1
+
+    elif answer[17]=='d)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0.5
+        user_scores[2] += 0
+        user_scores[3] += 0.5
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0.5
+
+    elif answer[17]=='e)':
+        user_scores[0] += 0.5
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[17]=='f)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 1
+        user_scores[3] += -0.5
+        user_scores[4] += 0.5
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += -0.5
+
+    else: #g)
+        user_scores[0] += -0.5
+        user_scores[1] += -1
+        user_scores[2] += 1.5
+        user_scores[3] += -1
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0.5
+        user_scores[7] += -1
+
+    #Question 19. How much do you trust others?
+
+    if answer[18]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += -0.5
+        user_scores[3] += 1
+        user_scores[4] += -0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[18]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0.5
+        user_scores[2] += 0.5
+        user_scores[3] += -1
+        user_scores[4] += 0.5
+        user_scores[5] += 0.5
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[18]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += -0.5
+        user_scores[2] += 1
+        user_scores[3] += 0.5
+        user_scores[4] += 1
+        user_scores[5] += -1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[18]=='d)':
+        user_scores[0] += 0.5
+        user_scores[1] += 1
+        user_scores[2] += 0
+        user_scores[3] += -0.5
+        user_scores[4] += -1
+        user_scores[5] += 1
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    #Question 20. To what extent should culture influence morality? If you aren't sure, ask yourself whether you think killing is wrong regardless of someone's morals and culture (if yes, you are an universalist).
+
+    if answer[19]=='a)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 2
+
+    elif answer[19]=='b)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += 0
+
+    elif answer[19]=='c)':
+        user_scores[0] += 0
+        user_scores[1] += 0
+        user_scores[2] += 0
+        user_scores[3] += 0
+        user_scores[4] += 0
+        user_scores[5] += 0
+        user_scores[6] += 0
+        user_scores[7] += -2
+
+    return user_scores
+
@@ -0,0 +1,77 @@
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from stand_ins import stand_ins  # noqa: E402
+
+import functions  # noqa: E402
+from answer_codec import alternative_label, dump_answers  # noqa: E402
+from functions import analysis_cache_key, get_catalog, get_formatted_questions_and_answers, load_score_weights  # noqa: E402
+
+
+@pytest.fixture
+def refresh(monkeypatch, tmp_path):
+    """
+    refresh_answer_index against the stand-ins, with an empty result cache, index and pending set.
+    """
+    monkeypatch.setattr(functions, "RESULT_CACHE_PATH", str(tmp_path / "result_cache.sqlite3"))
+    monkeypatch.setattr(functions, "_index_refresh", dict(functions._index_refresh, pending=functions.OrderedDict()))
+    functions.get_result_cache.cache_clear()
+    functions.get_answer_index.cache_clear()
+    with stand_ins() as (fake, _), redirect_stdout(sys.stderr):
+        questions, categories = get_formatted_questions_and_answers(), load_score_weights().categories
+
+        def run():
+            return functions.refresh_answer_index(questions, categories, force=True)
+        yield fake, run, lambda answer: analysis_cache_key(questions, answer, categories)
+    functions.get_result_cache.cache_clear()
+    functions.get_answer_index.cache_clear()
+
+def submit(fake, count):
+    question_total = get_catalog().question_total
+    answers = []
+    for number in range(count):
+        answer = tuple(alternative_label((number >> question) & 1) for question in range(question_total))
+        fake.tables["answers"].append({"id": len(fake.tables["answers"]) + 1, "user_id": 1, "user_answer": dump_answers(answer)})
+        answers.append(answer)
+    return answers
+
+def test_rows_with_a_stored_analysis_are_indexed(refresh):
+    fake, run, key = refresh
+    answers = submit(fake, 3)
+    functions.get_result_cache().put(key(answers[0]), {"qa": "stored"})
+
+    index = run()
+
+    assert set(index.rows) == {answers[0]}
+    assert list(functions._index_refresh["pending"]) == answers[1:]
+
+def test_pending_row_is_indexed_once_its_analysis_is_stored(refresh):
+    fake, run, key = refresh
+    answers = submit(fake, 2)
+    run()
+    functions.get_result_cache().put(key(answers[1]), {"qa": "stored"})
+
+    index = run()
+
+    assert set(index.rows) == {answers[1]}
+    assert list(functions._index_refresh["pending"]) == answers[:1]
+
+def test_pending_keeps_only_the_newest_rows(refresh, monkeypatch):
+    monkeypatch.setattr(functions, "ANSWER_INDEX_PENDING_MAX", 5)
+    fake, run, _ = refresh
+    answers = submit(fake, 12)
+    lookups = []
+    contains_many = functions.get_result_cache().contains_many
+    monkeypatch.setattr(functions.get_result_cache(), "contains_many", lambda keys: lookups.append(1) or contains_many(keys))
+
+    run()
+    run()
+
+    assert list(functions._index_refresh["pending"]) == answers[-5:]
+    assert len(lookups) == 2  # one batched lookup per refresh
@@ -0,0 +1,134 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+import database
+from database import CircuitBreaker, ConnectionManager, DatabaseUnavailable, is_transient
+from fake_supabase import FakeSupabase
+
+
+def api_error(code):
+    return APIError({"message": "error", "code": code, "hint": None, "details": None})
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(database, "RETRY_BASE_DELAY", 0)
+
+def make_manager(fake, **settings):
+    return ConnectionManager(client_factory=lambda: fake, **settings)
+
+#1 Which errors are retried
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"),
+    httpx.ReadTimeout("slow"),
+    api_error("PGRST000"),
+    api_error("PGRST003"),
+    api_error("57014"),
+    api_error("08006"),
+    api_error("40P01"),
+    api_error(503),
+])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+@pytest.mark.parametrize("error", [
+    api_error("23505"),  # unique violation
+    api_error("42P01"),  # undefined table
+    api_error("PGRST116"),
+    api_error("53100"),  # disk full: a class 5 SQLSTATE that a retry won't fix
+    api_error(400),
+    ValueError("not a database error"),
+])
+def test_permanent_errors(error):
+    assert not is_transient(error)
+
+#2 Retries of reads, never of writes
+def test_read_retries_transient_errors():
+    fake = FakeSupabase({"questions": [{"id": 1}]})
+    manager = make_manager(fake, retries=3)
+    fake.fail_next(api_error("PGRST000"), times=2)
+    assert manager.read(fake.table("questions").select("id")).data == [{"id": 1}]
+    assert [operation for _, operation in fake.calls] == ["failed", "failed", "select"]
+
+def test_read_gives_up_after_retries():
+    fake = FakeSupabase({"questions": [{"id": 1}]})
+    manager = make_manager(fake, retries=2)
+    fake.fail_next(api_error("57014"), times=5)
+    with pytest.raises(APIError):
+        manager.read(fake.table("questions").select("id"))
+    assert len(fake.calls) == 3
+
+def test_read_does_not_retry_permanent_errors():
+    fake = FakeSupabase({"questions": []})
+    manager = make_manager(fake)
+    fake.fail_next(api_error("42P01"))
+    with pytest.raises(APIError):
+        manager.read(fake.table("questions").select("id"))
+    assert len(fake.calls) == 1
+
+def test_write_is_not_retried():
+    fake = FakeSupabase({"users": []})
+    manager = make_manager(fake)
+    fake.fail_next(httpx.ConnectError("refused"))
+    with pytest.raises(httpx.ConnectError):
+        manager.write(fake.table("users").insert({"name": "a"}))
+    assert fake.tables["users"] == []
+
+#3 Circuit breaker
+def test_breaker_opens_after_threshold_and_fails_fast():
+    fake = FakeSupabase({"questions": []}, down=True)
+    manager = make_manager(fake, retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            manager.read(fake.table("questions").select("id"))
+    assert manager.breaker.state == "open"
+    fake.down = False
+    with pytest.raises(DatabaseUnavailable):
+        manager.read(fake.table("questions").select("id"))
+    assert fake.calls == []  # the open breaker never reached the database
+
+def test_breaker_half_open_trial_closes_or_reopens(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: clock[0])
+    fake = FakeSupabase({"questions": []}, down=True)
+    manager = make_manager(fake, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    with pytest.raises(httpx.ConnectError):
+        manager.read(fake.table("questions").select("id"))
+    assert manager.breaker.state == "open"
+
+    clock[0] += 30
+    assert manager.breaker.state == "half-open"
+    with pytest.raises(httpx.ConnectError):  # the trial fails: open again for another reset_timeout
+        manager.read(fake.table("questions").select("id"))
+    assert manager.breaker.state == "open"
+
+    clock[0] += 30
+    fake.down = False
+    manager.read(fake.table("questions").select("id"))
+    assert manager.breaker.state == "closed"
+
+def test_permanent_errors_do_not_open_the_breaker():
+    fake = FakeSupabase({"questions": []})
+    manager = make_manager(fake, breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(3):
+        fake.fail_next(api_error("23505"))
+        with pytest.raises(APIError):
+            manager.write(fake.table("questions").insert({"id": 1}))
+    assert manager.breaker.state == "closed"
+
+#4 Health probe
+def test_health_check_is_cached_for_its_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: clock[0])
+    fake = FakeSupabase({"questions": []})
+    manager = make_manager(fake, health_ttl=5)
+    assert manager.health_check()
+    fake.down = True
+    clock[0] += 4
+    assert manager.health_check()  # still the cached result
+    assert len(fake.calls) == 1
+    clock[0] += 1
+    assert not manager.health_check()
+    fake.down = False
+    clock[0] += 5
+    assert manager.health_check()
@@ -0,0 +1,50 @@
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from stand_ins import stand_ins  # noqa: E402
+
+from answer_codec import dump_answers  # noqa: E402
+from export import export_tables  # noqa: E402
+from functions import get_catalog  # noqa: E402
+
+
+@pytest.fixture
+def fake():
+    with stand_ins() as (fake, _), redirect_stdout(sys.stderr):
+        question_total = get_catalog().question_total
+        for number in range(1, 7):
+            # the first page (ids 1-3) predates the fingerprint and idempotency key columns being filled
+            filled = number > 3
+            fake.tables["users"].append({"id": number, "name": f"User {number}", "email": f"user{number}@example.com",
+                                         "idempotency_key": f"key-{number}" if filled else None})
+            fake.tables["answers"].append({"id": number, "user_id": number, "user_answer": dump_answers(["a)"] * question_total),
+                                           "fingerprint": f"fingerprint-{number}" if filled else None,
+                                           "idempotency_key": f"key-{number}" if filled else None})
+        yield fake
+
+@pytest.mark.parametrize("file_format", ["parquet", "csv"])
+def test_pages_with_an_all_empty_column_read_back_as_one_dataset(fake, tmp_path, file_format):
+    report = export_tables(str(tmp_path), tables=("users", "answers"), file_format=file_format, page_size=3)
+    assert report["answers"]["files"] == 2
+
+    if file_format == "parquet":
+        answers = pd.read_parquet(tmp_path / "answers")
+    else:
+        answers = pd.concat(pd.read_csv(tmp_path / "answers" / name) for name in sorted(os.listdir(tmp_path / "answers")))
+    assert sorted(answers["id"]) == [1, 2, 3, 4, 5, 6]
+    assert answers["fingerprint"].isna().sum() == 3
+    assert "user_answer" not in answers and "q1" in answers
+
+def test_column_types_dont_depend_on_the_page(fake, tmp_path):
+    export_tables(str(tmp_path), tables=("users",), page_size=3)
+    first, second = (pd.read_parquet(tmp_path / "users" / name) for name in sorted(os.listdir(tmp_path / "users")))
+    assert first.dtypes.to_dict() == second.dtypes.to_dict()
+    assert str(first["idempotency_key"].dtype) == "string"
+    assert str(first["id"].dtype) == "Int64"
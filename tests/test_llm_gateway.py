@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+import llm_gateway
+from fake_openai import FakeOpenAIServer
+from llm_gateway import DeadlineExceeded, LLMGateway
+from llm_metrics import MetricsRecorder
+
+
+def test_slot_granted_to_a_cancelled_call_is_released():
+    # a deadline or a losing hedge can cancel a call after _dispatch gave it the slot but before it resumed
+    async def scenario():
+        gateway = LLMGateway(lambda: None, max_concurrency=1)
+        gateway._loop = asyncio.get_running_loop()
+        await gateway._acquire("first", 1)
+        waiting = asyncio.ensure_future(gateway._acquire("second", 1))
+        await asyncio.sleep(0)
+        gateway._release(1, None)  # grants the slot to the waiting call
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        return gateway.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+def run_gateway(server, **settings):
+    from openai import AsyncOpenAI
+    return LLMGateway(lambda: AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0), **settings)
+
+def settle(gateway, seconds=2.0):
+    # cancellation is delivered on the gateway's loop thread, give it a moment to release the slot
+    deadline = time.monotonic() + seconds
+    while gateway.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return gateway.in_flight
+
+@pytest.fixture
+def recorder(monkeypatch, tmp_path):
+    recorder = MetricsRecorder(path=str(tmp_path / "llm_metrics.json"))
+    monkeypatch.setattr(llm_gateway, "get_recorder", lambda: recorder)
+    return recorder
+
+def test_429_is_retried_after_the_retry_after_delay(recorder):
+    with FakeOpenAIServer() as server:
+        server.fail_next(status=429, retry_after=1)
+        gateway = run_gateway(server)
+        started = time.monotonic()
+        reply = gateway.complete("session", "qa", model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+        elapsed = time.monotonic() - started
+    assert reply.choices[0].message.content
+    assert len(server.requests) == 2
+    assert 1.0 <= elapsed < 1.0 + llm_gateway.RETRY_BASE_DELAY * 2
+    assert settle(gateway) == 0
+    [call] = recorder.recent_calls()
+    assert (call["retries"], call["error"], call["cancelled"]) == (1, None, False)
+
+def test_gives_up_after_max_retries(recorder):
+    with FakeOpenAIServer() as server:
+        server.fail_next(count=3, status=429, retry_after=0)
+        gateway = run_gateway(server, max_retries=2)
+        with pytest.raises(openai.RateLimitError):
+            gateway.complete("session", "qa", model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+    assert len(server.requests) == 3
+    assert settle(gateway) == 0
+    assert recorder.summary()["stages"]["qa"]["errors"] == 1
+
+def test_deadline_cancels_the_call(recorder):
+    with FakeOpenAIServer(latency=2.0) as server:
+        gateway = run_gateway(server)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            gateway.complete("session", "qa", timeout=0.2, model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+        assert time.monotonic() - started < 1.0
+        assert settle(gateway) == 0
+    stage = recorder.summary()["stages"]["qa"]
+    assert (stage["errors"], stage["cancelled"]) == (0, 1)
+    assert recorder.wall_percentile("qa", 50) is None
+
+def test_losing_hedge_is_not_an_error(recorder):
+    with FakeOpenAIServer(latency=0.5) as server:
+        gateway = run_gateway(server)
+        reply = gateway.complete("session", "qa", hedge_after=0.1, model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+        assert reply.choices[0].message.content
+        assert settle(gateway) == 0
+    stage = recorder.summary()["stages"]["qa"]
+    assert (stage["calls"], stage["errors"], stage["cancelled"]) == (2, 0, 1)
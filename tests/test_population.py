@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from core import SCORE_BIN_WIDTH, ScoreHistogram, ScoreWeights, load_score_weights, stardardize_scores
+import functions
+from functions import PopulationStats
+
+WEIGHTS = load_score_weights()
+
+
+def make_histogram(tmp_path, weights=WEIGHTS):
+    return ScoreHistogram(weights, str(tmp_path / "histogram.json"))
+
+#1 Score histogram (user-003)
+def test_empty_histogram_puts_everyone_in_the_middle(tmp_path):
+    histogram = make_histogram(tmp_path)
+    assert histogram.percentiles(histogram.lowest + 3).tolist() == [0.5] * len(WEIGHTS.categories)
+
+def test_percentiles_of_a_known_distribution(tmp_path):
+    histogram = make_histogram(tmp_path)
+    # every category gets 1 score in the lowest bin, 2 one bin up and 1 two bins up
+    for step in (0, 1, 1, 2):
+        histogram.add(histogram.lowest + step * SCORE_BIN_WIDTH, save=False)
+    for step, expected in ((0, 0.5 / 4), (1, 2 / 4), (2, 3.5 / 4), (3, 1.0)):
+        assert histogram.percentiles(histogram.lowest + step * SCORE_BIN_WIDTH) == pytest.approx([expected] * len(WEIGHTS.categories))
+
+def test_scores_outside_the_bins_are_clipped(tmp_path):
+    histogram = make_histogram(tmp_path)
+    histogram.add(histogram.lowest, save=False)
+    assert histogram.percentiles(histogram.lowest - 100).tolist() == [0.5] * len(WEIGHTS.categories)
+
+def test_population_standardization_uses_the_percentiles(tmp_path):
+    histogram = make_histogram(tmp_path)
+    histogram.add(np.stack([histogram.lowest, histogram.lowest + 1]), save=False)
+    scores = (histogram.lowest + 1).tolist()
+    assert stardardize_scores(scores, "population", histogram) == pytest.approx([0.75 * 4.5 + 0.5] * len(scores))
+    with pytest.raises(ValueError):
+        stardardize_scores(scores, "population")
+
+def test_saved_histogram_loads_back(tmp_path):
+    histogram = make_histogram(tmp_path)
+    histogram.add(histogram.lowest + 2)
+    loaded = make_histogram(tmp_path).load()
+    assert (loaded.counts == histogram.counts).all()
+    assert not (tmp_path / "histogram.json.tmp").exists()
+
+def test_histogram_for_other_weights_is_ignored(tmp_path):
+    make_histogram(tmp_path).add(WEIGHTS.tensor.min(axis=1).sum(axis=0))
+    other = ScoreWeights(WEIGHTS.version + 1, WEIGHTS.categories, WEIGHTS.options, WEIGHTS.tensor)
+    assert make_histogram(tmp_path, other).load().counts.sum() == 0
+
+#2 Population counters with their delta log and snapshot (user-020)
+@pytest.fixture
+def make_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(functions, "STATS_FLUSH_SIZE", 1000)
+    monkeypatch.setattr(functions, "STATS_FLUSH_INTERVAL", 3600)
+    return lambda: PopulationStats(WEIGHTS, str(tmp_path / "stats.json"), str(tmp_path / "deltas.log")).load()
+
+ANSWERS = [["a)"] * 20, ["b)"] * 20, ["a)", "c)"] * 10, ["e)", "z)"] * 10]
+
+def same_counts(first, second):
+    return (first.option_counts == second.option_counts).all() and (first.histogram.counts == second.histogram.counts).all()
+
+def test_restart_replays_the_delta_log(make_stats, tmp_path):
+    stats = make_stats()
+    for answers in ANSWERS:
+        stats.record(answers)
+    assert not (tmp_path / "stats.json").exists()  # nothing flushed yet, only logged
+    restarted = make_stats()
+    assert restarted.total == len(ANSWERS)
+    assert same_counts(restarted, stats)
+    assert restarted.answer_shares(ANSWERS[0])[0] == pytest.approx(2 / 4)
+
+def test_snapshot_plus_newer_log_lines_give_the_same_counts(make_stats, tmp_path):
+    stats = make_stats()
+    for answers in ANSWERS[:3]:
+        stats.record(answers)
+    logged = (tmp_path / "deltas.log").read_text()
+    stats.flush()
+    assert (tmp_path / "deltas.log").read_text() == ""
+    assert not (tmp_path / "stats.json.tmp").exists()
+    # a crash between writing the snapshot and emptying the log leaves lines the snapshot already holds
+    (tmp_path / "deltas.log").write_text(logged)
+    stats.record(ANSWERS[3])
+    restarted = make_stats()
+    assert restarted.total == len(ANSWERS)
+    assert restarted.seq == stats.seq
+    assert same_counts(restarted, stats)
+
+def test_a_line_cut_short_by_a_crash_is_skipped(make_stats, tmp_path):
+    stats = make_stats()
+    stats.record(ANSWERS[0])
+    with open(tmp_path / "deltas.log", "a", encoding="utf-8") as log:
+        log.write('[2, [0, 1')
+    assert make_stats().total == 1
+
+def test_counters_flush_every_stats_flush_size(make_stats, tmp_path, monkeypatch):
+    monkeypatch.setattr(functions, "STATS_FLUSH_SIZE", 2)
+    stats = make_stats()
+    for answers in ANSWERS[:3]:
+        stats.record(answers)
+    assert stats.flushed_seq == 2
+    assert len((tmp_path / "deltas.log").read_text().splitlines()) == 1
+    assert same_counts(make_stats(), stats)
@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from stand_ins import stand_ins  # noqa: E402
+
+import functions  # noqa: E402
+from answer_codec import dump_answers  # noqa: E402
+from functions import analysis_cache_key, get_catalog, get_formatted_questions_and_answers, load_score_weights  # noqa: E402
+from pregenerate import pregenerate, rank_answer_vectors  # noqa: E402
+
+
+@pytest.fixture
+def stubs(monkeypatch, tmp_path):
+    """
+    The stand-ins with an empty result cache of the test's own, so no answer set is cached by another test.
+    """
+    monkeypatch.setattr(functions, "RESULT_CACHE_PATH", str(tmp_path / "result_cache.sqlite3"))
+    functions.get_result_cache.cache_clear()
+    with stand_ins() as (fake, server), redirect_stdout(sys.stderr):
+        yield fake, server
+    functions.get_result_cache.cache_clear()
+
+def seed_answers(fake, frequencies):
+    """
+    frequencies: answer label repeated over every question -> number of rows with that vector.
+    """
+    question_total = get_catalog().question_total
+    vectors = {}
+    for label, count in frequencies.items():
+        vectors[label] = [label] * question_total
+        for _ in range(count):
+            fake.tables["answers"].append({"id": len(fake.tables["answers"]) + 1, "user_id": 1, "user_answer": dump_answers(vectors[label])})
+    return vectors
+
+def cache_key(answers, mode="three_stage"):
+    return analysis_cache_key(get_formatted_questions_and_answers(), answers, load_score_weights().categories, mode)
+
+def test_ranks_the_answer_vectors_by_frequency(stubs):
+    fake, _ = stubs
+    vectors = seed_answers(fake, {"a)": 1, "b)": 5, "c)": 3})
+    fake.tables["answers"].append({"id": 100, "user_id": 1, "user_answer": dump_answers(["a)", "b)"])})  # an older catalog
+
+    counts = rank_answer_vectors(page_size=2, question_total=get_catalog().question_total)
+
+    assert counts.most_common() == [(tuple(vectors["b)"]), 5), (tuple(vectors["c)"]), 3), (tuple(vectors["a)"]), 1)]
+
+def test_generates_the_top_k_and_records_them_in_the_checkpoint(stubs, tmp_path):
+    fake, server = stubs
+    vectors = seed_answers(fake, {"a)": 1, "b)": 5, "c)": 3})
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    report = pregenerate(top_k=2, concurrency=2, max_spend=10.0, checkpoint_path=str(checkpoint_path))
+
+    assert (report["ranked"], report["generated"], report["already_done"], report["failed"]) == (2, 2, 0, 0)
+    assert not report["stopped_by_spend_cap"]
+    assert set(json.loads(checkpoint_path.read_text())["done"]) == {cache_key(vectors["b)"]), cache_key(vectors["c)"])}
+    assert functions.get_result_cache().contains(cache_key(vectors["b)"]))
+    assert not functions.get_result_cache().contains(cache_key(vectors["a)"]))
+
+def test_resume_skips_the_sets_already_done(stubs, tmp_path):
+    fake, server = stubs
+    vectors = seed_answers(fake, {"a)": 1, "b)": 5, "c)": 3})
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    pregenerate(top_k=2, concurrency=2, max_spend=10.0, checkpoint_path=checkpoint_path)
+    requests_before = len(server.requests)
+
+    report = pregenerate(top_k=3, concurrency=2, max_spend=10.0, checkpoint_path=checkpoint_path)
+
+    assert (report["generated"], report["already_done"]) == (1, 2)
+    assert len(server.requests) - requests_before == 3  # analysis, QA and radar of the new set only
+    assert cache_key(vectors["a)"]) in json.loads(open(checkpoint_path).read())["done"]
+
+def test_stops_at_the_spend_cap(stubs, tmp_path):
+    fake, _ = stubs
+    seed_answers(fake, {"a)": 1, "b)": 5, "c)": 3})
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    # the first set runs alone to measure the cost of one, the next would pass the cap
+    report = pregenerate(top_k=3, concurrency=2, max_spend=0.0001, checkpoint_path=checkpoint_path)
+
+    assert report["stopped_by_spend_cap"]
+    assert report["generated"] == 1
+    assert 0 < report["spent_usd"]
+    # the cap holds across runs: a resumed run with the same cap starts nothing
+    again = pregenerate(top_k=3, concurrency=2, max_spend=0.0001, checkpoint_path=checkpoint_path)
+    assert again["stopped_by_spend_cap"]
+    assert (again["generated"], again["already_done"]) == (0, 1)
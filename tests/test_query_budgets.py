@@ -0,0 +1,74 @@
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from stand_ins import stand_ins  # noqa: E402
+from query_budgets import BUDGETS, RETURN_BUDGETS, run_steps  # noqa: E402
+
+from functions import get_user_id_by_email, get_write_queue, insert_user  # noqa: E402
+import query_budget  # noqa: E402
+from query_budget import QueryCounter, begin_rerun, end_rerun  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def steps():
+    """
+    The steps of a new test-taker, then of the same person coming back in a new session, against the local stand-ins.
+    """
+    with stand_ins() as (fake, server), redirect_stdout(sys.stderr):
+        steps = run_steps("budget@example.com", {"STREAM_ANALYSIS": False})
+        get_write_queue().flush()
+        steps += run_steps("budget@example.com", {"STREAM_ANALYSIS": False}, prefix="return_")
+    return steps
+
+def counters(steps, name):
+    found = [counter for step, counter in steps if step == name]
+    assert found, f"step {name} never ran"
+    return found
+
+@pytest.mark.parametrize("prefix, budgets", [("", BUDGETS), ("return_", RETURN_BUDGETS)])
+def test_every_step_is_within_its_budget(steps, prefix, budgets):
+    for name, budget in budgets.items():
+        for counter in counters(steps, prefix + name):
+            counter.assert_budget(queries=budget, label=f"Step '{prefix + name}'")
+
+def test_answer_clicks_make_no_queries(steps):
+    for counter in counters(steps, "answer") + counters(steps, "return_answer"):
+        counter.assert_budget(queries=0, label="An answer click")
+
+def test_submit_makes_at_most_three_queries(steps):
+    for counter in counters(steps, "submit") + counters(steps, "return_submit"):
+        counter.assert_budget(queries=3, label="The submission")
+
+def test_feedback_goes_to_the_typed_email():
+    with stand_ins() as (fake, server), redirect_stdout(sys.stderr):
+        insert_user("First", "first@example.com")
+        insert_user("Last", "last@example.com")
+        get_write_queue().flush()
+        ids = {row["email"]: row["id"] for row in fake.tables["users"]}
+        with QueryCounter(include_background=True) as counter:
+            assert get_user_id_by_email("first@example.com") == ids["first@example.com"]
+        counter.assert_budget(queries=1)
+        assert get_user_id_by_email("nobody@example.com") is None
+
+def test_reruns_of_abandoned_sessions_are_dropped(monkeypatch):
+    session = {"id": "closed"}
+    monkeypatch.setattr(query_budget, "_session_id", lambda: session["id"])
+    monkeypatch.setattr(query_budget, "_reruns", {})
+    begin_rerun()  # the tab is closed before end_rerun
+    session["id"] = "stopped"
+    begin_rerun()  # st.stop: the same session's next rerun takes over
+    begin_rerun()
+    assert set(query_budget._reruns) == {"closed", "stopped"}
+
+    query_budget._reruns["closed"].started_at -= query_budget.RERUN_MAX_AGE + 1
+    session["id"] = "other"
+    begin_rerun()
+    assert set(query_budget._reruns) == {"stopped", "other"}
+    assert end_rerun() is not None
+    assert set(query_budget._reruns) == {"stopped"}
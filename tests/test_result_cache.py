@@ -0,0 +1,68 @@
+import threading
+
+from result_cache import ResultCache
+
+
+def make_cache(tmp_path):
+    return ResultCache(str(tmp_path / "results.sqlite3"))
+
+def test_get_or_compute_caches(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+    assert cache.get_or_compute("key", lambda: calls.append(1) or {"text": "a"}) == {"text": "a"}
+    assert cache.get_or_compute("key", lambda: calls.append(1) or {"text": "b"}) == {"text": "a"}
+    assert len(calls) == 1
+
+def test_concurrent_misses_compute_once(tmp_path):
+    cache = make_cache(tmp_path)
+    release, calls = threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"text": "a"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"text": "a"}] * 4
+
+def test_late_leader_reuses_the_stored_value(tmp_path, monkeypatch):
+    # a caller that missed just before the previous leader stored the value and left must not compute again
+    cache = make_cache(tmp_path)
+    cache.get_or_compute("key", lambda: {"text": "a"})
+    real_get, lookups = cache.get, []
+
+    def get(key):
+        lookups.append(key)
+        return None if len(lookups) == 1 else real_get(key)
+
+    monkeypatch.setattr(cache, "get", get)
+    assert cache.get_or_compute("key", lambda: {"text": "recomputed"}) == {"text": "a"}
+
+def test_uncacheable_values_are_not_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.get_or_compute("key", lambda: {"complete": False}, cacheable=lambda value: value["complete"])
+    assert cache.get("key") is None
+
+def test_contains_many_checks_both_tiers_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr("result_cache.LOOKUP_BATCH", 3)
+    cache = ResultCache(str(tmp_path / "results.sqlite3"), memory_entries=2)
+    for number in range(8):
+        cache.put(f"key-{number}", {"number": number})  # only the last two stay in memory
+    connections = []
+    connect = cache._connect
+    monkeypatch.setattr(cache, "_connect", lambda: connections.append(1) or connect())
+
+    wanted = [f"key-{number}" for number in range(10)]
+    assert cache.contains_many(wanted) == {f"key-{number}" for number in range(8)}
+    assert len(connections) == 1
+    assert cache.contains_many(["key-6", "key-7"]) == {"key-6", "key-7"}
+    assert len(connections) == 1  # answered from memory
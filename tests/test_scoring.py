@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from core import (encode_answer_matrix, generate_user_scores, load_score_weights, score_answers_batch,
+                  stardardize_scores, stardardize_scores_batch)
+from legacy_scoring import generate_user_scores as legacy_generate_user_scores
+
+WEIGHTS = load_score_weights()
+CATEGORIES = list(WEIGHTS.categories)
+QUESTION_TOTAL = WEIGHTS.tensor.shape[0]
+# every option the tensor knows, plus labels that only the old 'else' branches (or nothing) matched
+LABELS = list(WEIGHTS.options) + ["g)", "z)", "", None]
+
+
+@pytest.mark.parametrize("question", range(QUESTION_TOTAL))
+@pytest.mark.parametrize("label", LABELS)
+def test_every_option_scores_like_the_old_chain(question, label):
+    for filler in WEIGHTS.options:
+        answer = [filler] * QUESTION_TOTAL
+        answer[question] = label
+        assert generate_user_scores(answer, CATEGORIES) == legacy_generate_user_scores(answer, CATEGORIES)
+
+def test_random_answer_sets_score_like_the_old_chain():
+    rng = random.Random(0)
+    for _ in range(500):
+        answer = [rng.choice(LABELS) for _ in range(QUESTION_TOTAL)]
+        assert generate_user_scores(answer, CATEGORIES) == legacy_generate_user_scores(answer, CATEGORIES)
+
+def test_batch_scoring_matches_the_per_row_functions():
+    rng = random.Random(1)
+    answers = [[rng.choice(LABELS) for _ in range(QUESTION_TOTAL)] for _ in range(200)]
+    raw_scores, sd_scores = score_answers_batch(encode_answer_matrix(answers, WEIGHTS), WEIGHTS)
+    for answer, raw, sd in zip(answers, raw_scores, sd_scores):
+        expected = generate_user_scores(answer, CATEGORIES)
+        assert raw.tolist() == expected
+        assert sd.tolist() == pytest.approx(stardardize_scores(expected))
+
+def test_batch_standardization_gives_nan_for_a_row_without_spread():
+    sd_scores = stardardize_scores_batch(np.array([[1.0] * len(CATEGORIES), list(range(len(CATEGORIES)))]))
+    assert np.isnan(sd_scores[0]).all()
+    assert sd_scores[1].tolist() == pytest.approx(stardardize_scores(list(range(len(CATEGORIES)))))
+    with pytest.raises(ZeroDivisionError):  # the per-row function can't rescale it at all
+        stardardize_scores([1.0] * len(CATEGORIES))
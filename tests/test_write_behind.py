@@ -0,0 +1,52 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from database import ConnectionManager
+from fake_supabase import FakeSupabase
+from write_behind import WriteBehindQueue
+
+
+def api_error(code):
+    return APIError({"message": "error", "code": code, "hint": None, "details": None})
+
+@pytest.fixture
+def fake():
+    return FakeSupabase({"users": [], "answers": []})
+
+def make_queue(tmp_path, fake, **settings):
+    manager = ConnectionManager(client_factory=lambda: fake)
+    return WriteBehindQueue(str(tmp_path / "spool.sqlite3"), manager=manager, **settings)
+
+def test_rows_referencing_a_spooled_row_get_its_id(tmp_path, fake):
+    queue = make_queue(tmp_path, fake)
+    user_key = queue.enqueue("users", {"email": "a@example.com"})
+    queue.enqueue("answers", {"user_answer": "x"}, refs={"user_id": user_key})
+    queue.flush()
+    assert fake.tables["answers"][0]["user_id"] == fake.tables["users"][0]["id"]
+    assert queue.pending() == 0
+
+def test_duplicate_user_takes_the_id_of_the_existing_one(tmp_path, fake):
+    queue = make_queue(tmp_path, fake, natural_keys={"users": ("email",)})
+    queue.enqueue("users", {"email": "same@example.com"})
+    queue.flush()
+    existing_id = fake.tables["users"][0]["id"]
+
+    # a second session spooled the same email before the first was written
+    second_key = queue.enqueue("users", {"email": "same@example.com"})
+    queue.enqueue("answers", {"user_answer": "x"}, refs={"user_id": second_key})
+    fake.fail_next(api_error("23505"))
+    queue.flush()
+    assert queue.resolve(second_key) == existing_id
+    assert fake.tables["answers"][0]["user_id"] == existing_id
+    with queue._connect() as connection:
+        assert connection.execute("select count(*) from dead").fetchone()[0] == 0
+
+def test_other_rejected_rows_are_buried_with_the_rows_referencing_them(tmp_path, fake):
+    queue = make_queue(tmp_path, fake, natural_keys={"users": ("email",)})
+    user_key = queue.enqueue("users", {"email": "bad@example.com"})
+    queue.enqueue("answers", {"user_answer": "x"}, refs={"user_id": user_key})
+    fake.fail_next(api_error("23502"))  # not null violation: no existing row to take over
+    queue.flush()
+    assert fake.tables["answers"] == []
+    with queue._connect() as connection:
+        assert connection.execute("select count(*) from dead").fetchone()[0] == 2
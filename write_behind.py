@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from database import get_manager, is_transient
+
+
+#1 Settings for the background writer
+FLUSH_SIZE = 50  # pending rows that trigger a flush straight away
+FLUSH_INTERVAL = 0.5  # seconds between flushes when fewer rows are pending
+MAX_BACKOFF = 30  # seconds between attempts while the database keeps failing
+RESOLVED_KEEP = 24 * 3600  # seconds the id of a flushed row is remembered for later references
+UNIQUE_VIOLATION = "23505"  # SQLSTATE of a duplicate value in a unique column
+
+SPOOL_SCHEMA = """
+create table if not exists spool (
+    seq integer primary key autoincrement,
+    table_name text not null,
+    idempotency_key text not null unique,
+    payload text not null,
+    refs text not null,
+    created_at real not null
+);
+create table if not exists resolved (
+    idempotency_key text primary key,
+    table_name text not null,
+    row_id integer not null,
+    resolved_at real not null
+);
+create table if not exists dead (
+    seq integer primary key,
+    table_name text not null,
+    idempotency_key text not null,
+    payload text not null,
+    refs text not null,
+    error text not null,
+    failed_at real not null
+);
+"""
+
+#2 Background writer with a durable SQLite spool
+class WriteBehindQueue:
+    """
+    Inserts are written to a local SQLite spool and acknowledged as soon as they are on disk.
+    A background thread sends them to Supabase in order, in bulk, every FLUSH_INTERVAL seconds
+    or as soon as FLUSH_SIZE rows are waiting. Nothing is lost while the database is down:
+    the spool is replayed in order once it answers again.
+
+    Every row carries an idempotency key (stored in its 'idempotency_key' column, unique in the
+    database, see migrations/001_idempotency_keys.sql) and is sent as an upsert on that key,
+    so replaying a batch that was already written never duplicates rows.
+
+    A row can reference another spooled row that has no database id yet, e.g. the answers of a
+    user who was just created: enqueue(..., refs={"user_id": user_key}) fills in the id at flush time.
+
+    natural_keys maps a table to the unique columns that identify a row besides its id, e.g.
+    {"users": ("email",)}: a row that hits a unique violation on them (two sessions spooled the
+    same email before either was written) takes the id of the row already there, so the rows
+    referencing it are still written instead of being dropped with it.
+    """
+
+    def __init__(self, spool_path, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL, manager=None, natural_keys=None):
+        self.spool_path = spool_path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.natural_keys = natural_keys or {}
+        self._manager = manager
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SPOOL_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.spool_path, timeout=30)
+        try:
+            connection.execute("pragma journal_mode=wal")
+            connection.execute("pragma synchronous=full")  # an acknowledged row must survive a crash
+            with connection:  # commits, or rolls back on error
+                yield connection
+        finally:
+            connection.close()
+
+    @property
+    def manager(self):
+        return self._manager or get_manager()
+
+    def enqueue(self, table_name, row, refs=None, key=None):
+        """
+        Durably spool one row for insertion.
+
+        Parameters:
+        - table_name (str): Destination table.
+        - row (dict): Column values, without 'idempotency_key'.
+        - refs (dict or None): Column name -> idempotency key of a spooled row whose id goes in that column.
+        - key (str or None): Idempotency key, a random one is generated if not given.
+
+        Returns:
+        - key (str): The row's idempotency key, usable in the refs of later rows.
+        """
+        key = key or uuid.uuid4().hex
+        with self._connect() as connection:
+            connection.execute(
+                "insert or ignore into spool (table_name, idempotency_key, payload, refs, created_at) values (?, ?, ?, ?, ?)",
+                (table_name, key, json.dumps(row), json.dumps(refs or {}), time.time()),
+            )
+            pending = connection.execute("select count(*) from spool").fetchone()[0]
+        self._start()
+        if pending >= self.flush_size:
+            self._wake.set()
+        return key
+
+    def resolve(self, key):
+        """
+        Return the database id of a flushed row, or None while it is still spooled.
+        """
+        with self._connect() as connection:
+            found = connection.execute("select row_id from resolved where idempotency_key = ?", (key,)).fetchone()
+        return found[0] if found else None
+
+    def pending(self):
+        with self._connect() as connection:
+            return connection.execute("select count(*) from spool").fetchone()[0]
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            self._wake.wait(backoff)
+            self._wake.clear()
+            try:
+                self.flush()
+                backoff = self.flush_interval
+            except Exception as error:  # the rows stay in the spool and are replayed on the next attempt
+                print("Write-behind flush failed, retrying later:", error)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def flush(self):
+        """
+        Send everything in the spool, in order, one bulk upsert per run of rows for the same table.
+        Raises if the database fails with a transient error, leaving the rest of the spool in place.
+        """
+        with self._flush_lock:
+            while True:
+                with self._connect() as connection:
+                    rows = connection.execute(
+                        "select seq, table_name, idempotency_key, payload, refs from spool order by seq limit ?",
+                        (self.flush_size,),
+                    ).fetchall()
+                if not rows:
+                    self._prune_resolved()
+                    return
+                # a batch is the leading run of rows going to the same table, so the order is kept
+                batch = rows[:next((index for index, row in enumerate(rows) if row[1] != rows[0][1]), len(rows))]
+                self._send(batch)
+
+    def _send(self, batch):
+        table_name = batch[0][1]
+        payloads = []
+        for row in batch:
+            seq, _, key, payload, refs = row
+            payload = json.loads(payload)
+            for column, ref_key in json.loads(refs).items():
+                payload[column] = self.resolve(ref_key)
+                if payload[column] is None:  # the referenced row was rejected, this one can't be written either
+                    self._bury([row], f"unresolved reference {ref_key} in column {column}")
+                    return
+            payload["idempotency_key"] = key
+            payloads.append(payload)
+
+        from postgrest.exceptions import APIError  # loaded with the client by then
+        query = self.manager.client.table(table_name).upsert(payloads, on_conflict="idempotency_key")
+        try:
+            response = self.manager.write(query)
+        except APIError as error:
+            if is_transient(error):
+                raise
+            if len(batch) > 1:  # find the row the database rejects by sending them one at a time
+                for row in batch:
+                    self._send([row])
+                return
+            existing_id = self._existing_id(table_name, payloads[0], error)
+            if existing_id is not None:
+                print(f"Write-behind: {table_name} row {batch[0][2]} already exists as id {existing_id}, using that one")
+                self._done(batch, {batch[0][2]: existing_id})
+                return
+            self._bury(batch, str(error))
+            return
+
+        self._done(batch, {row["idempotency_key"]: row.get("id") for row in response.data or []})
+
+    def _existing_id(self, table_name, payload, error):
+        # the id of the row a unique violation on the table's natural key collided with, if any
+        columns = self.natural_keys.get(table_name)
+        if not columns or str(error.code) != UNIQUE_VIOLATION:
+            return None
+        query = self.manager.client.table(table_name).select("id")
+        for column in columns:
+            query = query.eq(column, payload.get(column))
+        found = self.manager.read(query.limit(1)).data
+        return found[0]["id"] if found else None
+
+    def _done(self, batch, ids):
+        # remember the database ids for the rows referencing these, and take them off the spool
+        table_name = batch[0][1]
+        with self._connect() as connection:
+            connection.executemany(
+                "insert or replace into resolved (idempotency_key, table_name, row_id, resolved_at) values (?, ?, ?, ?)",
+                [(key, table_name, ids[key], time.time()) for _, _, key, _, _ in batch if ids.get(key) is not None],
+            )
+            connection.executemany("delete from spool where seq = ?", [(seq,) for seq, *_ in batch])
+
+    def _bury(self, batch, error):
+        # rows the database rejects for good would block the queue forever, so they are set aside
+        print(f"Write-behind dropped {len(batch)} row(s) into the dead letter table:", error)
+        with self._connect() as connection:
+            connection.executemany(
+                "insert or replace into dead (seq, table_name, idempotency_key, payload, refs, error, failed_at) values (?, ?, ?, ?, ?, ?, ?)",
+                [(seq, table_name, key, payload, refs, error, time.time()) for seq, table_name, key, payload, refs in batch],
+            )
+            connection.executemany("delete from spool where seq = ?", [(seq,) for seq, *_ in batch])
+
+    def _prune_resolved(self):
+        with self._connect() as connection:
+            connection.execute("delete from resolved where resolved_at < ?", (time.time() - RESOLVED_KEEP,))